@@ -0,0 +1,163 @@
+"""
+Minimal in-process ASGI load generator.
+
+Drives a FastAPI app directly through its ASGI callable (no sockets, no HTTP
+client dependency) so the numbers reflect application cost only. Used by
+run_benchmarks.py.
+"""
+
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List
+from urllib.parse import urlencode
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    ordered = sorted(latencies)
+    n = len(ordered)
+    return {
+        "n": n,
+        "mean_ms": (sum(ordered) / n) * 1000 if n else 0.0,
+        "min_ms": ordered[0] * 1000 if n else 0.0,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+    }
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Runs the app's startup/shutdown handlers around the block."""
+    started = asyncio.Event()
+    stop = asyncio.Event()
+    sent_startup = False
+
+    async def receive():
+        nonlocal sent_startup
+        if not sent_startup:
+            sent_startup = True
+            return {"type": "lifespan.startup"}
+        await stop.wait()
+        return {"type": "lifespan.shutdown"}
+
+    async def send(message):
+        if message["type"] == "lifespan.startup.failed":
+            raise RuntimeError(message.get("message", "startup failed"))
+        if message["type"] == "lifespan.startup.complete":
+            started.set()
+
+    scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+    task = asyncio.ensure_future(app(scope, receive, send))
+    await started.wait()
+    try:
+        yield
+    finally:
+        stop.set()
+        await task
+
+
+def _encode(spec: dict):
+    headers = [(b"host", b"bench")]
+    body = b""
+    if spec.get("json") is not None:
+        body = json.dumps(spec["json"]).encode()
+        headers.append((b"content-type", b"application/json"))
+    elif spec.get("form") is not None:
+        body = urlencode(spec["form"]).encode()
+        headers.append((b"content-type", b"application/x-www-form-urlencoded"))
+    headers.append((b"content-length", str(len(body)).encode()))
+    query = urlencode(spec.get("params") or {}).encode()
+    return query, body, headers
+
+
+async def call(app, spec: dict) -> int:
+    """Issues one request against the ASGI app and returns the status code."""
+    query, body, headers = _encode(spec)
+    path = spec["path"]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": spec.get("method", "GET").upper(),
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query,
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    done = asyncio.Event()
+    status = {"code": 0}
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+        elif message["type"] == "http.response.body" and not message.get(
+            "more_body", False
+        ):
+            done.set()
+
+    await app(scope, receive, send)
+    done.set()
+    return status["code"]
+
+
+async def run_load(
+    app, spec: dict, total: int = 200, concurrency: int = 16, warmup: int = 5
+) -> dict:
+    """
+    Sends `total` requests using `concurrency` workers and reports throughput
+    and latency percentiles.
+    """
+    for _ in range(warmup):
+        await call(app, spec)
+
+    latencies: List[float] = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            code = await call(app, spec)
+            latencies.append(time.perf_counter() - start)
+            if code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    result = summarize(latencies)
+    result.update(
+        {
+            "concurrency": concurrency,
+            "errors": errors,
+            "elapsed_s": elapsed,
+            "rps": len(latencies) / elapsed if elapsed else 0.0,
+        }
+    )
+    return result
@@ -0,0 +1,71 @@
+"""
+Compares two benchmark result files produced by run_benchmarks.py.
+
+Prints the relative change of every micro-benchmark (p50) and load test
+(p95 latency and throughput) and exits non-zero if anything regressed by more
+than the threshold.
+
+Usage:
+    python benchmarks/compare.py results/<old>.json results/<new>.json --threshold 0.15
+"""
+
+import argparse
+import json
+import sys
+
+
+def _rows(report):
+    for service, result in report.get("services", {}).items():
+        for name, by_scale in result.get("micro", {}).items():
+            for scale, stats in by_scale.items():
+                yield (service, "micro", name, scale, "p50_ms"), stats["p50_ms"]
+        for name, by_scale in result.get("load", {}).items():
+            for scale, stats in by_scale.items():
+                yield (service, "load", name, scale, "p95_ms"), stats["p95_ms"]
+                yield (service, "load", name, scale, "rps"), stats["rps"]
+
+
+def compare(old, new, threshold):
+    old_rows = dict(_rows(old))
+    regressions = []
+    print(f"{'benchmark':<70} {'old':>10} {'new':>10} {'change':>8}")
+    for key, new_value in _rows(new):
+        if key not in old_rows:
+            continue
+        old_value = old_rows[key]
+        if not old_value:
+            continue
+        change = (new_value - old_value) / old_value
+        # Higher is better for throughput, lower is better for latency
+        worse = -change if key[-1] == "rps" else change
+        flag = " !" if worse > threshold else ""
+        label = " ".join(key)
+        print(
+            f"{label:<70} {old_value:>10.2f} {new_value:>10.2f} {change:>+7.1%}{flag}"
+        )
+        if worse > threshold:
+            regressions.append(label)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark runs.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"{old['meta']['commit']} -> {new['meta']['commit']}")
+    regressions = compare(old, new, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
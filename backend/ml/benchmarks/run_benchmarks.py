@@ -0,0 +1,425 @@
+"""
+Micro-benchmarks and in-process load tests for the ML services.
+
+Each service is benchmarked in its own subprocess (they all ship a top-level
+`main` module, and yoga/mental both ship an `api` package). For every scale
+factor the service's trained artifacts are replicated N times with jittered
+numeric columns, then:
+
+  (a) core functions are timed directly (ranker, extractor, recommenders), and
+  (b) every endpoint is driven through the ASGI app by asgi_load.py, reporting
+      throughput and p50/p95/p99 latency.
+
+Artifacts must exist (run each service's training script first).
+
+Usage (from backend/ml):
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --services hospitals hotels --scales 1 10
+    python benchmarks/compare.py benchmarks/results/<old>.json benchmarks/results/<new>.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ML_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+SERVICE_DIRS = {
+    "hospitals": "hospitals",
+    "hotels": "hotels",
+    "flights": "flights",
+    "yoga": "ml-yoga",
+    "mental": "ml-mental",
+    "visa": os.path.join("visa", "backend"),
+}
+
+SAMPLE_REPORT = (
+    "Patient presented with chest pain and shortness of breath. "
+    "ECG showed ST elevation. Troponin levels elevated. "
+    "Final assessment consistent with myocardial infarction. "
+)
+
+
+def replicate(df, matrix, factor, jitter_cols=(), seed=0):
+    """Stacks `factor` copies of a frame and its row-aligned TF-IDF matrix."""
+    if factor == 1:
+        return df.copy(), matrix
+    big = pd.concat([df] * factor, ignore_index=True)
+    rng = np.random.default_rng(seed)
+    for col in jitter_cols:
+        big[col] = big[col].astype(float) * rng.uniform(0.9, 1.1, len(big))
+    big_matrix = (
+        sp.vstack([matrix] * factor, format="csr") if matrix is not None else None
+    )
+    return big, big_matrix
+
+
+def time_call(fn, repeat):
+    fn()  # warmup
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+# --- Per-service setup -------------------------------------------------------
+# Each setup returns (app, prepare(scale) -> rows, micro cases, load specs).
+# prepare() is called after app startup so it can override loaded artifacts.
+
+
+def setup_hospitals():
+    import main
+
+    ranker = main.ranker
+    base_df, base_matrix = ranker.df, ranker.tfidf_matrix
+
+    def prepare(scale):
+        df, matrix = replicate(
+            base_df, base_matrix, scale, ("Rating_5_Scale", "Review_Count"), seed=scale
+        )
+        df["Rating_5_Scale"] = df["Rating_5_Scale"].clip(upper=5.0)
+        ranker.set_data(df, matrix)
+        return len(df)
+
+    def micro(scale):
+        report = SAMPLE_REPORT * scale
+        return {
+            "HospitalRanker.get_top_hospitals": lambda: ranker.get_top_hospitals(
+                "heart attack", "Cardiology"
+            ),
+            "DiseaseExtractor.extract_disease": lambda: main.extractor.extract_disease(
+                report
+            ),
+            "map_disease_to_specialty": lambda: main.map_disease_to_specialty(
+                "myocardial infraction"
+            ),
+        }
+
+    load = {
+        "GET /top-hospitals": {
+            "path": "/top-hospitals",
+            "params": {"disease": "heart attack"},
+        },
+        "POST /predict-all": {
+            "method": "POST",
+            "path": "/predict-all",
+            "form": {"text": "Diagnosis: lung cancer"},
+        },
+        "GET /hospitals-by-city": {
+            "path": "/hospitals-by-city",
+            "params": {"city": "bangalore"},
+        },
+    }
+    return main.app, prepare, micro, load
+
+
+def setup_hotels():
+    import main
+
+    base_df, base_matrix = main.df, main.tfidf_matrix
+
+    def prepare(scale):
+        df, matrix = replicate(
+            base_df, base_matrix, scale, ("Hotel_Price", "Hotel_Rating"), seed=scale
+        )
+        main.df, main.tfidf_matrix = df, matrix
+        main.records = main.RecordTable(df, na="")
+        main.amenity_bits = main.amenity_masks(df)
+        return len(df)
+
+    def micro(scale):
+        return {
+            "recommend_hotels(query)": lambda: main.recommend_hotels(
+                location="goa",
+                budget=None,
+                stars=None,
+                query="pool spa",
+                must_have=None,
+            ),
+            "recommend_hotels(filters)": lambda: main.recommend_hotels(
+                location="mumbai", budget=8000, stars=4, query=None, must_have=None
+            ),
+            "recommend_hotels(must_have)": lambda: main.recommend_hotels(
+                location="mumbai",
+                budget=None,
+                stars=None,
+                query="pool spa",
+                must_have=["pool,spa"],
+            ),
+        }
+
+    load = {
+        "GET /recommend": {
+            "path": "/recommend",
+            "params": {"location": "goa", "query": "pool spa"},
+        },
+        "POST /predict-price": {
+            "method": "POST",
+            "path": "/predict-price",
+            "json": {"hotel_rating": 4.2, "amenities_count": 5, "city": "goa"},
+        },
+    }
+    return main.app, prepare, micro, load
+
+
+def setup_flights():
+    import main
+
+    base_df = main.df
+
+    def prepare(scale):
+        main.df, _ = replicate(base_df, None, scale)
+        return len(main.df)
+
+    def micro(scale):
+        return {
+            "recommend_flights": lambda: main.recommend_flights("Delhi", "Dubai"),
+        }
+
+    load = {
+        "GET /recommend-flights": {
+            "path": "/recommend-flights",
+            "params": {"origin": "Delhi", "destination": "Dubai"},
+        },
+    }
+    return main.app, prepare, micro, load
+
+
+def _setup_wellness(key, price_col, rec_fn, rec_params, predict, cluster):
+    import main
+    from api import routes
+
+    def prepare(scale):
+        engine = routes.engine
+        engine.load()
+        df, matrix = replicate(
+            engine.df, engine.matrix, scale, (price_col,), seed=scale
+        )
+        engine.set_catalog(df, matrix)
+        return len(df)
+
+    def micro(scale):
+        fn = getattr(routes, rec_fn)
+        return {rec_fn: lambda: fn(**rec_params)}
+
+    load = {
+        f"GET /api/sessions/{key}": {"path": f"/api/sessions/{key}"},
+        f"GET /api/recommend/{key}": {
+            "path": f"/api/recommend/{key}",
+            "params": rec_params,
+        },
+        f"POST /api/predict-price/{key}": {
+            "method": "POST",
+            "path": f"/api/predict-price/{key}",
+            "json": predict,
+        },
+        f"GET /api/cluster-info/{key}": {
+            "path": f"/api/cluster-info/{key}",
+            "params": {"session_title": cluster},
+        },
+    }
+    return main.app, prepare, micro, load
+
+
+def setup_yoga():
+    return _setup_wellness(
+        "yoga",
+        "Price",
+        "rec_yoga",
+        {"city": "Pune", "focus": "Meditation", "budget": 1500},
+        {"city": "Pune", "yoga_style": "Hatha", "amenities_count": 3},
+        "ganga",
+    )
+
+
+def setup_mental():
+    return _setup_wellness(
+        "mental",
+        "Fee",
+        "rec_mental",
+        {"city": "Surat", "type": "Workshop", "budget": 2000},
+        {
+            "city": "Surat",
+            "session_type": "Workshop",
+            "amenities_count": 2,
+            "topics_count": 2,
+        },
+        "positive",
+    )
+
+
+def setup_visa():
+    import db
+    import main
+
+    def prepare(scale):
+        # Visa data is a fixed per-country table; scale does not apply.
+        return len(db._VISA_DATA_CACHE)
+
+    def micro(scale):
+        from models import VisaQuery
+
+        query = VisaQuery(country="Albania")
+        return {"process_visa_query": lambda: main.process_visa_query(query)}
+
+    load = {
+        "POST /visa-requirements": {
+            "method": "POST",
+            "path": "/visa-requirements",
+            "json": {"country": "Albania"},
+        },
+        "POST /visa-requirements/bulk": {
+            "method": "POST",
+            "path": "/visa-requirements/bulk",
+            "json": {"countries": ["Albania", "UK", "USA", "Phillipines", "Japan"]},
+        },
+    }
+    return main.app, prepare, micro, load
+
+
+SETUPS = {
+    "hospitals": setup_hospitals,
+    "hotels": setup_hotels,
+    "flights": setup_flights,
+    "yoga": setup_yoga,
+    "mental": setup_mental,
+    "visa": setup_visa,
+}
+
+
+async def _bench_service(service, scales, repeat, requests, concurrency):
+    from asgi_load import lifespan, run_load, summarize
+
+    app, prepare, micro, load = SETUPS[service]()
+    result = {"micro": {}, "load": {}}
+    async with lifespan(app):
+        for scale in scales:
+            rows = prepare(scale)
+            label = f"{scale}x"
+            print(f"[{service}] scale {label} ({rows} rows)", file=sys.stderr)
+
+            for name, fn in micro(scale).items():
+                stats = summarize(time_call(fn, repeat))
+                stats["rows"] = rows
+                result["micro"].setdefault(name, {})[label] = stats
+
+            for name, spec in load.items():
+                stats = await run_load(
+                    app, spec, total=requests, concurrency=concurrency
+                )
+                stats["rows"] = rows
+                result["load"].setdefault(name, {})[label] = stats
+    return result
+
+
+def run_worker(args):
+    service_dir = os.path.join(ML_DIR, SERVICE_DIRS[args.worker])
+    sys.path.insert(0, BENCH_DIR)
+    sys.path.insert(0, service_dir)
+    os.chdir(service_dir)
+    result = asyncio.run(
+        _bench_service(
+            args.worker, args.scales, args.repeat, args.requests, args.concurrency
+        )
+    )
+    with open(args.out, "w") as f:
+        json.dump(result, f)
+
+
+def git_commit():
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=ML_DIR, text=True
+            ).strip()
+            or "unknown"
+        )
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--services", nargs="+", default=list(SETUPS))
+    parser.add_argument("--scales", nargs="+", type=int, default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=30, help="micro-benchmark runs")
+    parser.add_argument(
+        "--requests", type=int, default=200, help="requests per endpoint"
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--out", help="output JSON (default results/<commit>.json)")
+    parser.add_argument("--worker", choices=list(SETUPS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scales": args.scales,
+            "repeat": args.repeat,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "services": {},
+    }
+
+    for service in args.services:
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+            tmp_path = tmp.name
+        cmd = [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--worker",
+            service,
+            "--out",
+            tmp_path,
+            "--repeat",
+            str(args.repeat),
+            "--requests",
+            str(args.requests),
+            "--concurrency",
+            str(args.concurrency),
+            "--scales",
+            *[str(s) for s in args.scales],
+        ]
+        proc = subprocess.run(cmd, stdout=subprocess.DEVNULL)
+        if proc.returncode != 0:
+            print(f"[{service}] benchmark failed (exit {proc.returncode})")
+            report["services"][service] = {"error": proc.returncode}
+        else:
+            with open(tmp_path) as f:
+                report["services"][service] = json.load(f)
+        os.remove(tmp_path)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Dynamic micro-batching of per-request model calls.
+
+A price endpoint predicts one row per request, and a forest's `predict` has a
+large fixed cost per call (input validation, dispatch over every tree), so
+under load most of the time goes to overhead. `MicroBatcher` queues rows from
+concurrent requests and runs them through one vectorized call:
+
+    batcher = MicroBatcher("yoga_price", model.predict)
+    price = batcher(row)          # blocks until the row's batch has run
+
+The first queued caller becomes the leader. It waits until max_batch rows are
+queued or max_wait has passed, takes the queue, runs the batch and hands each
+caller its result; the next waiting caller leads the next batch. A caller
+that finds the batcher idle runs at once, so light traffic pays no wait.
+
+  HEALTRIP_BATCH_MAX       rows per batch (default 64, 1 disables batching)
+  HEALTRIP_BATCH_WAIT_MS   longest a batch waits to fill in ms (default 2)
+
+Like `common/singleflight.py`, waiting uses threading primitives because the
+sync endpoints run in FastAPI's thread pool.
+
+Batching only applies to price models served as forests. When a price table
+matches the model (common/price_table.py, written by training by default),
+lookups bypass the batcher: they cost microseconds per row, so there is no
+per-call overhead to amortize. `healtrip_predict_batch_size` then stays empty.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, List, Sequence
+
+from common.metrics import Histogram
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_WAIT_MS = 2.0
+
+BATCH_SIZE = Histogram(
+    "healtrip_predict_batch_size",
+    "Rows per batched model call.",
+    ("batcher",),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+BATCH_WAIT = Histogram(
+    "healtrip_predict_batch_wait_seconds",
+    "Time rows spend queued before their batch runs in seconds.",
+    ("batcher",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05),
+)
+
+
+class _Item:
+    __slots__ = ("row", "queued", "taken", "done", "result", "error")
+
+    def __init__(self, row):
+        self.row = row
+        self.queued = time.perf_counter()
+        self.taken = False  # picked up by a leader's batch
+        self.done = False
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[List], Sequence],
+        max_batch: int = None,
+        max_wait: float = None,
+    ):
+        """
+        `fn(rows)` returns one result per row, in order. `max_wait` is in
+        seconds; both limits default to the environment settings.
+        """
+        self.name = name
+        self.fn = fn
+        self.max_batch = max(
+            1, max_batch or int(os.getenv("HEALTRIP_BATCH_MAX", DEFAULT_MAX_BATCH))
+        )
+        if max_wait is None:
+            max_wait = (
+                float(os.getenv("HEALTRIP_BATCH_WAIT_MS", DEFAULT_WAIT_MS)) / 1000
+            )
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._pending: List[_Item] = []
+        self._leading = False
+        self._running = 0
+
+    def __call__(self, row):
+        item = _Item(row)
+        with self._cond:
+            self._pending.append(item)
+            # Wake a leader waiting for its batch to fill
+            self._cond.notify_all()
+            while not item.done:
+                # Lead only while the row is still queued; once another
+                # leader took it, just wait for that batch
+                if self._leading or item.taken:
+                    self._cond.wait()
+                else:
+                    self._lead()
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _lead(self):
+        """Collects and runs one batch. Called, and returns, holding the lock."""
+        self._leading = True
+        # Only wait for company when other requests are around. While a batch
+        # is running, keep collecting until it finishes (or this one is full):
+        # rows arrive slowly while predict holds the GIL.
+        if len(self._pending) > 1 or self._running:
+            deadline = time.perf_counter() + self.max_wait
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 and not self._running:
+                    break
+                self._cond.wait(remaining if remaining > 0 else None)
+        batch = self._pending[: self.max_batch]
+        del self._pending[: self.max_batch]
+        self._leading = False
+        if not batch:
+            self._cond.notify_all()
+            return
+        for item in batch:
+            item.taken = True
+        self._running += 1
+        # Later arrivals can start collecting the next batch meanwhile
+        self._cond.notify_all()
+        self._cond.release()
+        try:
+            self._run(batch)
+        finally:
+            self._cond.acquire()
+            self._running -= 1
+            for item in batch:
+                item.done = True
+            self._cond.notify_all()
+
+    def _run(self, batch: List[_Item]):
+        started = time.perf_counter()
+        for item in batch:
+            BATCH_WAIT.labels(self.name).observe(started - item.queued)
+        BATCH_SIZE.labels(self.name).observe(len(batch))
+        try:
+            results = self.fn([item.row for item in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].error = e
+                return
+            # One bad row must not fail the others: retry them one by one
+            for item in batch:
+                try:
+                    item.result = self.fn([item.row])[0]
+                except Exception as error:
+                    item.error = error
+            return
+        for item, result in zip(batch, results):
+            item.result = result
@@ -0,0 +1,74 @@
+"""
+Load-time indexes for filtering a catalog before scoring it.
+
+Built once per artifact load: a price-sorted row order (so "price <= budget"
+is a binary search) and, for each categorical column, a map from normalized
+value to the sorted row ids holding it. Request handlers intersect those to get
+the surviving rows and only compute similarity for them.
+"""
+
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def normalize(value) -> str:
+    return str(value).lower().strip()
+
+
+class CatalogIndex:
+    def __init__(self, df: pd.DataFrame, price_col: str, category_cols: Iterable[str]):
+        self.size = len(df)
+        self.prices = pd.to_numeric(df[price_col], errors="coerce").to_numpy(float)
+        self._price_order = np.argsort(self.prices, kind="stable")
+        self._sorted_prices = self.prices[self._price_order]
+        self._categories: Dict[str, Dict[str, np.ndarray]] = {}
+        for col in category_cols:
+            codes, uniques = pd.factorize(df[col].map(normalize))
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self._categories[col] = {
+                value: order[bounds[i] : bounds[i + 1]]
+                for i, value in enumerate(uniques)
+            }
+
+    def rows_with(self, col: str, value) -> np.ndarray:
+        return self._categories[col].get(normalize(value), np.empty(0, dtype=np.intp))
+
+    def rows_under(self, max_price: float) -> np.ndarray:
+        cut = np.searchsorted(self._sorted_prices, max_price, side="right")
+        return np.sort(self._price_order[:cut])
+
+    def candidates(self, max_price: Optional[float] = None, **equals) -> np.ndarray:
+        """
+        Sorted row ids passing every given predicate. Predicates set to None
+        are ignored; with no predicates all rows are returned.
+        """
+        rows = None
+        for col, value in equals.items():
+            if value is None:
+                continue
+            matched = self.rows_with(col, value)
+            rows = matched if rows is None else np.intersect1d(rows, matched, True)
+        if max_price is not None:
+            under = self.rows_under(max_price)
+            rows = under if rows is None else np.intersect1d(rows, under, True)
+        return np.arange(self.size) if rows is None else rows
+
+    def select(self, matrix, rows: np.ndarray):
+        """Row subset of a row-aligned matrix, without copying when all rows pass."""
+        return matrix if len(rows) == self.size else matrix[rows]
+
+    def top_k(self, rows: np.ndarray, scores: np.ndarray, k: int):
+        """
+        Rows ordered by score descending, then price ascending, then row id,
+        i.e. the same order as a stable `sort_values([score, price])`.
+        """
+        if len(rows) > k:
+            # Keep everything tied with the k-th best score so ties resolve exactly
+            threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+            keep = np.flatnonzero(scores >= threshold)
+            rows, scores = rows[keep], scores[keep]
+        order = np.lexsort((rows, self.prices[rows], -scores))[:k]
+        return rows[order], scores[order]
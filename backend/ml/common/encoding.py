@@ -0,0 +1,90 @@
+"""
+Label encodings as plain dictionaries.
+
+Training scripts fit sklearn LabelEncoders and export each one with
+`save_label_maps` as a JSON object of normalized label -> integer code. The
+services load those into `LabelMap`s, so encoding a request value is one dict
+lookup instead of a `classes_` scan plus `LabelEncoder.transform`.
+
+Every label is normalized the same way on both sides (`normalize_label`:
+lowercased, surrounding whitespace stripped). Unknown labels map to the
+map's `unknown` code, which is 0 (the first class, i.e. what the services
+already fell back to) unless the artifact says otherwise.
+"""
+
+import json
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+from common.metrics import Counter
+
+UNKNOWN_LABELS = Counter(
+    "healtrip_unknown_labels",
+    "Request values not seen by a label encoder at training time.",
+    ("encoder",),
+)
+
+DEFAULT_UNKNOWN = 0
+
+
+def normalize_label(value) -> str:
+    return str(value).lower().strip()
+
+
+class LabelMap:
+    def __init__(
+        self, name: str, codes: Dict[str, int], unknown: int = DEFAULT_UNKNOWN
+    ):
+        self.name = name
+        self.codes = {normalize_label(k): int(v) for k, v in codes.items()}
+        self.unknown = int(unknown)
+        self._categories = pd.Index(list(self.codes.keys()))
+        self._code_array = np.asarray(list(self.codes.values()), dtype=np.int64)
+
+    @classmethod
+    def from_encoder(cls, name: str, encoder, unknown: int = DEFAULT_UNKNOWN):
+        codes = {}
+        for code, label in enumerate(encoder.classes_):
+            # Labels differing only in case/whitespace keep the first code
+            codes.setdefault(normalize_label(label), code)
+        return cls(name, codes, unknown)
+
+    def to_dict(self) -> dict:
+        return {"codes": self.codes, "unknown": self.unknown}
+
+    def encode(self, value) -> int:
+        code = self.codes.get(normalize_label(value))
+        if code is None:
+            UNKNOWN_LABELS.labels(self.name).inc()
+            return self.unknown
+        return code
+
+    def encode_many(self, values: Iterable) -> np.ndarray:
+        """Vectorized `encode` for a batch, via categorical codes."""
+        normalized = pd.Series(list(values), dtype=object).astype(str)
+        normalized = normalized.str.lower().str.strip()
+        positions = pd.Categorical(normalized, categories=self._categories).codes
+        unknown = positions < 0
+        if unknown.any():
+            UNKNOWN_LABELS.labels(self.name).inc(int(unknown.sum()))
+        return np.where(unknown, self.unknown, self._code_array[positions])
+
+
+def save_label_maps(path: str, encoders: Dict[str, object]):
+    """Exports fitted LabelEncoders as {name: {"codes": {...}, "unknown": 0}} JSON."""
+    maps = {
+        name: LabelMap.from_encoder(name, le).to_dict() for name, le in encoders.items()
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(maps, f, indent=2, ensure_ascii=False, sort_keys=True)
+
+
+def load_label_maps(path: str) -> Dict[str, LabelMap]:
+    with open(path, encoding="utf-8") as f:
+        maps = json.load(f)
+    return {
+        name: LabelMap(name, spec["codes"], spec.get("unknown", DEFAULT_UNKNOWN))
+        for name, spec in maps.items()
+    }
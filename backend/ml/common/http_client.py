@@ -0,0 +1,57 @@
+"""
+Pooled HTTP clients for calling the ML services from Python.
+
+Use one long-lived client per backend for the life of the process (create it
+at startup, `await client.aclose()` at shutdown) instead of a client per
+request, so connections are kept alive and reused:
+
+    from common.http_client import pooled_client
+
+    hotels = pooled_client("hotels", "http://127.0.0.1:8000", timeout=3.0)
+    response = await hotels.get("/recommend", params={"location": "Pune"})
+
+If the backend was started with HEALTRIP_SOCKET_DIR (see common/serving.py)
+and its socket exists, the client talks to it over the Unix domain socket;
+`base_url` is then only used for the Host header and relative URLs.
+
+Pool sizes and idle expiry can be tuned with HEALTRIP_POOL_SIZE,
+HEALTRIP_POOL_KEEPALIVE and HEALTRIP_POOL_EXPIRY. The expiry must stay below
+the servers' keep-alive timeout (HEALTRIP_KEEPALIVE, 75s by default).
+"""
+
+import os
+
+import httpx
+
+from common.serving import socket_path
+
+DEFAULT_POOL_SIZE = 100
+DEFAULT_POOL_KEEPALIVE = 50
+DEFAULT_POOL_EXPIRY = 30.0
+
+
+def pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(os.getenv("HEALTRIP_POOL_SIZE", DEFAULT_POOL_SIZE)),
+        max_keepalive_connections=int(
+            os.getenv("HEALTRIP_POOL_KEEPALIVE", DEFAULT_POOL_KEEPALIVE)
+        ),
+        keepalive_expiry=float(os.getenv("HEALTRIP_POOL_EXPIRY", DEFAULT_POOL_EXPIRY)),
+    )
+
+
+def pooled_client(
+    service: str, base_url: str, timeout: float = 5.0, transport=None
+) -> httpx.AsyncClient:
+    """
+    A keep-alive AsyncClient for one backend service. Pass `transport` to
+    override the connection (e.g. httpx.ASGITransport for an in-process app).
+    """
+    limits = pool_limits()
+    if transport is None:
+        uds = socket_path(service)
+        if uds and os.path.exists(uds):
+            transport = httpx.AsyncHTTPTransport(uds=uds, limits=limits)
+    return httpx.AsyncClient(
+        base_url=base_url, transport=transport, limits=limits, timeout=timeout
+    )
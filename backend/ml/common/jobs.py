@@ -0,0 +1,347 @@
+"""
+Persistent background job queue for long-running requests.
+
+`JobQueue` takes work off the request path: `submit` stores the job's input
+file and a queue entry in a local SQLite database and returns an id right
+away; a bounded pool of worker threads claims queued jobs and runs the
+handler, and clients poll `get` (or follow `events`, e.g. as Server-Sent
+Events) for the status and result.
+
+The queue lives on disk, so jobs survive restarts, and every worker process of
+a pre-forked service shares it: a job is claimed by exactly one thread across
+all processes. Jobs left "running" by a process that died, or running for
+longer than the lease, are queued again.
+
+  HEALTRIP_JOB_DIR        directory for the queue database and inputs
+                          (default: a `jobs` directory next to the service)
+  HEALTRIP_JOB_WORKERS    worker threads per process (default 2)
+  HEALTRIP_JOB_QUEUE_MAX  queued jobs accepted before submit refuses (1000)
+  HEALTRIP_JOB_TTL        seconds finished jobs are kept (default 86400)
+  HEALTRIP_JOB_LEASE      seconds after which a running job is considered
+                          abandoned, e.g. when its process id was reused
+                          after a restart (default 600)
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import AsyncIterator, Callable, Optional
+
+from common.metrics import Counter, Gauge, Histogram
+
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_MAX = 1000
+DEFAULT_TTL = 24 * 3600
+DEFAULT_LEASE = 600
+# Seconds between queue polls when idle (jobs submitted by other processes)
+POLL_INTERVAL = 1.0
+# Seconds between requeue/expiry passes
+MAINTENANCE_INTERVAL = 60.0
+FINISHED = ("done", "failed")
+
+QUEUE_DEPTH = Gauge(
+    "healtrip_job_queue_depth",
+    "Jobs waiting to be processed.",
+    ("queue",),
+)
+JOBS = Counter(
+    "healtrip_jobs",
+    "Jobs by queue and outcome (submitted, rejected, done, failed).",
+    ("queue", "status"),
+)
+JOB_LATENCY = Histogram(
+    "healtrip_job_duration_seconds",
+    "Time from submission to completion of a job in seconds.",
+    ("queue",),
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, float("inf")),
+)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    def __init__(
+        self,
+        name: str,
+        directory: str,
+        handler: Callable[[str, str], dict],
+        workers: int = None,
+        max_queued: int = None,
+        ttl: float = None,
+    ):
+        """
+        `handler(kind, input_path)` runs a job and returns its JSON-serializable
+        result; an exception marks the job failed with its message.
+        """
+        self.name = name
+        self.handler = handler
+        self.workers = workers or int(
+            os.getenv("HEALTRIP_JOB_WORKERS", DEFAULT_WORKERS)
+        )
+        self.max_queued = max_queued or int(
+            os.getenv("HEALTRIP_JOB_QUEUE_MAX", DEFAULT_QUEUE_MAX)
+        )
+        self.ttl = ttl or float(os.getenv("HEALTRIP_JOB_TTL", DEFAULT_TTL))
+        self.lease = float(os.getenv("HEALTRIP_JOB_LEASE", DEFAULT_LEASE))
+        self.inputs = os.path.join(directory, "inputs")
+        os.makedirs(self.inputs, exist_ok=True)
+        self.path = os.path.join(directory, f"{name}.sqlite")
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._maintained = -MAINTENANCE_INTERVAL
+        self._maintenance_lock = threading.Lock()
+        db = self._connect()
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+            "owner INTEGER, created REAL NOT NULL, started REAL, finished REAL, "
+            "result TEXT, error TEXT)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+    @classmethod
+    def for_service(cls, service_dir: str, name: str, handler) -> "JobQueue":
+        directory = os.getenv("HEALTRIP_JOB_DIR") or os.path.join(service_dir, "jobs")
+        return cls(name, directory, handler)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Per thread and process, as in common/result_cache.py
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def _input_path(self, job_id: str) -> str:
+        return os.path.join(self.inputs, job_id)
+
+    # Submitting and reading jobs
+
+    def depth(self) -> int:
+        (count,) = (
+            self._connect()
+            .execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'")
+            .fetchone()
+        )
+        QUEUE_DEPTH.labels(self.name).set(count)
+        return count
+
+    def submit(self, kind: str, source) -> str:
+        """
+        Queues a job whose input is `source` (bytes or a binary file, copied to
+        the queue directory). Raises QueueFull when the queue is at capacity.
+        """
+        if self.depth() >= self.max_queued:
+            JOBS.labels(self.name, "rejected").inc()
+            raise QueueFull(f"{self.name} queue is full")
+        job_id = uuid.uuid4().hex
+        with open(self._input_path(job_id), "wb") as f:
+            if isinstance(source, (bytes, bytearray)):
+                f.write(source)
+            else:
+                source.seek(0)
+                shutil.copyfileobj(source, f)
+        self._connect().execute(
+            "INSERT INTO jobs (id, kind, status, created) VALUES (?, ?, 'queued', ?)",
+            (job_id, kind, time.time()),
+        )
+        JOBS.labels(self.name, "submitted").inc()
+        QUEUE_DEPTH.labels(self.name).inc()
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT status, created, started, finished, result, error "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        status, created, started, finished, result, error = row
+        job = {"id": job_id, "status": status, "created": created}
+        if started is not None:
+            job["started"] = started
+        if finished is not None:
+            job["finished"] = finished
+        if status == "done":
+            job["result"] = json.loads(result)
+        elif status == "failed":
+            job["error"] = error
+        return job
+
+    async def events(self, job_id: str, interval: float = 0.5) -> AsyncIterator[dict]:
+        """Yields the job each time its status changes, until it finishes."""
+        last = None
+        while True:
+            job = await asyncio.to_thread(self.get, job_id)
+            if job is None:
+                return
+            if job["status"] != last:
+                last = job["status"]
+                yield job
+            if last in FINISHED:
+                return
+            await asyncio.sleep(interval)
+
+    # Processing
+
+    def start(self):
+        """Requeues orphaned jobs and starts the worker threads."""
+        self._maintain()
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"{self.name}-job-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 30.0):
+        """Stops claiming new jobs and waits for running ones to finish."""
+        self._stopping.set()
+        self._wakeup.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def _maintain(self):
+        """Requeues abandoned jobs and drops expired ones, at most once a minute."""
+        with self._maintenance_lock:
+            if time.monotonic() - self._maintained < MAINTENANCE_INTERVAL:
+                return
+            self._maintained = time.monotonic()
+        self._requeue_orphans()
+        self._prune()
+
+    def _requeue_orphans(self):
+        db = self._connect()
+        requeued = []
+        # Every worker process runs this; one write transaction per pass keeps
+        # them from interleaving their scans and updates
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            expired = time.time() - self.lease
+            for job_id, owner, started in db.execute(
+                "SELECT id, owner, started FROM jobs WHERE status = 'running'"
+            ).fetchall():
+                if not _alive(owner) or started < expired:
+                    db.execute(
+                        "UPDATE jobs SET status = 'queued', owner = NULL, "
+                        "started = NULL WHERE id = ?",
+                        (job_id,),
+                    )
+                    requeued.append((job_id, owner))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        for job_id, owner in requeued:
+            print(f"{self.name}: requeued abandoned job {job_id} (process {owner})")
+
+    def _prune(self):
+        db = self._connect()
+        expired = db.execute(
+            "SELECT id FROM jobs WHERE status IN ('done', 'failed') AND finished < ?",
+            (time.time() - self.ttl,),
+        ).fetchall()
+        for (job_id,) in expired:
+            db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            _remove(self._input_path(job_id))
+
+    def _claim(self) -> Optional[tuple]:
+        db = self._connect()
+        # IMMEDIATE takes the write lock up front, so two threads (or processes)
+        # cannot both select the same queued job
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT id, kind, created FROM jobs WHERE status = 'queued' "
+                "ORDER BY created LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                # `started` also identifies this claim, see _run
+                row += (time.time(),)
+                db.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, started = ? "
+                    "WHERE id = ?",
+                    (os.getpid(), row[3], row[0]),
+                )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return row
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                print(f"{self.name}: claiming a job failed: {e}")
+                job = None
+            if job is None:
+                self._maintain()
+                self.depth()
+                self._wakeup.wait(POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            QUEUE_DEPTH.labels(self.name).dec()
+            self._run(*job)
+
+    def _run(self, job_id: str, kind: str, created: float, started: float):
+        path = self._input_path(job_id)
+        try:
+            result = json.dumps(self.handler(kind, path))
+            status, error = "done", None
+        except Exception as e:
+            result, status, error = None, "failed", f"{type(e).__name__}: {e}"
+            print(f"{self.name}: job {job_id} failed: {error}")
+        finished = time.time()
+        updated = self._connect().execute(
+            "UPDATE jobs SET status = ?, finished = ?, result = ?, error = ? "
+            "WHERE id = ? AND started = ?",
+            (status, finished, result, error, job_id, started),
+        )
+        if updated.rowcount == 0:
+            # Requeued after the lease ran out; the newer claim reports instead
+            return
+        _remove(path)
+        JOBS.labels(self.name, status).inc()
+        JOB_LATENCY.labels(self.name).observe(finished - created)
+
+
+def _alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,319 @@
+"""
+Lightweight Prometheus instrumentation shared by all ML services.
+
+Each service calls `install_metrics(app, "<service>")` once after creating its
+FastAPI app. That adds an ASGI middleware recording per-route request counts,
+latency histograms and in-flight gauges, and exposes everything on `/metrics`
+in the Prometheus text exposition format.
+
+HTTP metrics are labelled with the service of the app that served the request.
+Every other series gets the `service` of the first app installed in the
+process, so backends co-hosted by the quote service (quotes/orchestrator.py)
+keep their own HTTP series while shared metrics are reported as `quotes`.
+
+Hot paths wrap their expensive steps in `stage_timer("<stage>")` so we can see
+where time goes inside a request (PDF parsing, TF-IDF transform, similarity,
+sorting, model predict, ...).
+
+Services are started from their own directory, so entry points add
+`backend/ml` to `sys.path` before importing from `common`.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple
+
+from starlette.responses import Response
+from starlette.routing import Match
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds. Covers sub-millisecond dict lookups up to multi-second PDF parses.
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+        (registry or REGISTRY).register(self)
+
+    def labels(self, *values):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> List[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        """Returns (suffix, extra label names, all label values, value) tuples."""
+        raise NotImplementedError
+
+
+class _ValueChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = float(value)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def samples(self):
+        return [
+            ("_total", (), key, child.value)
+            for key, child in list(self._children.items())
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def samples(self):
+        return [
+            ("", (), key, child.value) for key, child in list(self._children.items())
+        ]
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[idx] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def samples(self):
+        out = []
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                out.append(
+                    ("_bucket", ("le",), key + (_format_value(bound),), cumulative)
+                )
+            out.append(("_sum", (), key, total))
+            out.append(("_count", (), key, cumulative))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self.const_labels: Dict[str, str] = {}
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            # A metric's own label takes precedence over a constant one
+            const = [
+                (n, v)
+                for n, v in self.const_labels.items()
+                if n not in metric.labelnames
+            ]
+            const_names = tuple(n for n, _ in const)
+            const_values = tuple(v for _, v in const)
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, extra_names, values, value in metric.samples():
+                labels = _format_labels(
+                    const_names + metric.labelnames + extra_names,
+                    const_values + values,
+                )
+                lines.append(f"{metric.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS_TOTAL = Counter(
+    "healtrip_http_requests",
+    "Total HTTP requests handled.",
+    ("service", "method", "route", "status"),
+)
+REQUEST_LATENCY = Histogram(
+    "healtrip_http_request_duration_seconds",
+    "HTTP request latency in seconds.",
+    ("service", "method", "route"),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "healtrip_http_requests_in_flight",
+    "HTTP requests currently being processed.",
+    ("service", "method", "route"),
+)
+STAGE_LATENCY = Histogram(
+    "healtrip_stage_duration_seconds",
+    "Time spent in individual hot-path stages in seconds.",
+    ("stage",),
+)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Records the wall time of the wrapped block under the given stage name."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(stage).observe(time.perf_counter() - start)
+
+
+def _resolve_route(router, scope) -> str:
+    # Use the route template, not the raw path, to keep label cardinality bounded
+    partial = None
+    for route in router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", scope["path"])
+        if match == Match.PARTIAL and partial is None:
+            partial = getattr(route, "path", None)
+    return partial or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware so streaming responses and lifespan pass through untouched."""
+
+    def __init__(self, app, router=None, service: str = ""):
+        self.app = app
+        self.router = router
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.router is None:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = _resolve_route(self.router, scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(self.service, method, route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_LATENCY.labels(self.service, method, route).observe(
+                time.perf_counter() - start
+            )
+            REQUESTS_TOTAL.labels(self.service, method, route, status["code"]).inc()
+            in_flight.dec()
+
+
+def metrics_endpoint():
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE_LATEST)
+
+
+def install_metrics(app, service: str):
+    """Adds the metrics middleware and the `/metrics` route to a FastAPI app."""
+    # Apps co-hosted later in the same process keep the first service here
+    REGISTRY.const_labels.setdefault("service", service)
+    app.add_middleware(MetricsMiddleware, router=app.router, service=service)
+    app.add_api_route("/metrics", metrics_endpoint, include_in_schema=False)
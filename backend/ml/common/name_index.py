@@ -0,0 +1,75 @@
+"""
+Load-time name lookup for catalog entries.
+
+Replaces per-request `str.contains` scans over every name with:
+  - an exact map of lowercased names to their first row, and
+  - a character trigram inverted index for substring/prefix queries, where the
+    query's trigram posting lists are intersected and only those candidates
+    are checked.
+"""
+
+from collections import defaultdict
+from typing import Iterable, Optional
+
+import numpy as np
+
+GRAM = 3
+
+
+def _normalize(name) -> str:
+    return name.lower() if isinstance(name, str) else ""
+
+
+def _grams(text: str):
+    return {text[i : i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class NameIndex:
+    def __init__(self, names: Iterable):
+        self.names = [_normalize(n) for n in names]
+        self.exact = {}
+        postings = defaultdict(list)
+        for row, name in enumerate(self.names):
+            self.exact.setdefault(name.strip(), row)
+            for gram in _grams(name):
+                postings[gram].append(row)
+        # Rows are appended in order, so every posting list is already sorted
+        self.postings = {g: np.asarray(r, dtype=np.int64) for g, r in postings.items()}
+
+    def _candidates(self, query: str) -> np.ndarray:
+        grams = _grams(query)
+        if not grams:
+            # Too short to index; fall back to checking every row
+            return np.arange(len(self.names))
+        lists = []
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is None:
+                return np.empty(0, dtype=np.int64)
+            lists.append(posting)
+        lists.sort(key=len)
+        rows = lists[0]
+        for posting in lists[1:]:
+            rows = np.intersect1d(rows, posting, assume_unique=True)
+            if len(rows) == 0:
+                break
+        return rows
+
+    def find_all(self, query: str) -> np.ndarray:
+        """Rows whose name contains `query` (case-insensitive), in row order."""
+        query = _normalize(query)
+        return np.asarray(
+            [r for r in self._candidates(query).tolist() if query in self.names[r]],
+            dtype=np.int64,
+        )
+
+    def find_first(self, query: str) -> Optional[int]:
+        """Exact name match if there is one, else the first row containing it."""
+        query = _normalize(query)
+        row = self.exact.get(query.strip())
+        if row is not None:
+            return row
+        for r in self._candidates(query).tolist():
+            if query in self.names[r]:
+                return r
+        return None
@@ -0,0 +1,150 @@
+"""
+Price models compiled into lookup tables.
+
+The price regressors are tree ensembles over a few low-cardinality features
+(city and style codes, amenity counts, a star rating). A tree ensemble is
+constant between consecutive split thresholds of each feature, so training
+can enumerate every combination of those intervals, run one batched
+`predict` over a representative point of each, and store the results as a
+dense array. Serving then only needs a `searchsorted` per feature and one
+array index instead of walking every tree, and does not load the forest:
+
+    table = PriceTable.from_model(model)   # training
+    table.save(path, model_path)
+    table = PriceTable.load(path, model_path)   # serving, None if stale
+    table.predict([[city, style, amenities]])
+
+Lookups return exactly what the model returns for the same input, also for
+values never seen in training (e.g. a rating of 3.85), because every split
+decision is taken the same way. The table records a hash of the model file it
+was built from; a table that does not match the model on disk is ignored.
+"""
+
+import hashlib
+import os
+import pickle
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from common.metrics import Counter
+
+# Larger grids keep serving from the model
+MAX_CELLS = 5_000_000
+# Rows per predict call while building a table
+_BUILD_BATCH = 500_000
+
+PRICE_PREDICTIONS = Counter(
+    "healtrip_price_predictions",
+    "Price predictions by model and source (table or model).",
+    ("model", "source"),
+)
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _split_thresholds(model, n_features: int) -> List[np.ndarray]:
+    """Sorted distinct thresholds each feature is split on, across all trees."""
+    thresholds = [[] for _ in range(n_features)]
+    for estimator in getattr(model, "estimators_", [model]):
+        tree = estimator.tree_
+        split = tree.feature >= 0  # leaves have feature -2
+        for feature, threshold in zip(tree.feature[split], tree.threshold[split]):
+            thresholds[feature].append(threshold)
+    return [np.unique(np.asarray(t, dtype=np.float64)) for t in thresholds]
+
+
+def _representatives(thresholds: np.ndarray) -> np.ndarray:
+    """
+    One float32 value inside each interval (t[i-1], t[i]] and above the last
+    threshold. Trees compare float32 inputs against float64 thresholds and go
+    left on `x <= t`. An interval holding no float32 value (two thresholds
+    within one float32 step) can never be looked up, so its value is unused.
+    """
+    below = thresholds.astype(np.float32)
+    # Largest float32 not above the threshold
+    over = below.astype(np.float64) > thresholds
+    below[over] = np.nextafter(below[over], np.float32(-np.inf))
+    if len(thresholds):
+        last = np.float32(thresholds[-1])
+        if last <= thresholds[-1]:
+            last = np.nextafter(last, np.float32(np.inf))
+    else:
+        last = np.float32(0)
+    return np.append(below, last)
+
+
+class PriceTable:
+    def __init__(self, thresholds: List[np.ndarray], values: np.ndarray, model=""):
+        self.thresholds = thresholds
+        self.values = values
+        self.model = model  # digest of the model file the table was built from
+
+    @property
+    def cells(self) -> int:
+        return self.values.size
+
+    @classmethod
+    def from_model(cls, model, max_cells: int = MAX_CELLS) -> Optional["PriceTable"]:
+        """Tabulates a fitted tree ensemble; None if the grid exceeds max_cells."""
+        thresholds = _split_thresholds(model, model.n_features_in_)
+        shape = tuple(len(t) + 1 for t in thresholds)
+        if np.prod(shape, dtype=np.float64) > max_cells:
+            return None
+        axes = [_representatives(t) for t in thresholds]
+        columns = getattr(model, "feature_names_in_", None)
+        values = np.empty(int(np.prod(shape)), dtype=np.float64)
+        # Grid rows in C order of the table, built and predicted in batches
+        for start in range(0, len(values), _BUILD_BATCH):
+            flat = np.arange(start, min(len(values), start + _BUILD_BATCH))
+            index = np.unravel_index(flat, shape)
+            grid = np.column_stack([axis[i] for axis, i in zip(axes, index)])
+            if columns is not None:
+                grid = pd.DataFrame(grid, columns=columns)
+            values[flat] = model.predict(grid)
+        return cls(thresholds, values.reshape(shape))
+
+    def predict(self, features) -> np.ndarray:
+        """Same as model.predict(features), for a 2D array-like of rows."""
+        # Trees see float32 inputs, so locate the intervals the same way
+        x = np.asarray(features, dtype=np.float32).astype(np.float64)
+        if x.ndim != 2 or x.shape[1] != len(self.thresholds):
+            raise ValueError(
+                f"Expected rows of {len(self.thresholds)} features, got shape {x.shape}"
+            )
+        index = tuple(
+            np.searchsorted(t, x[:, i], side="left")
+            for i, t in enumerate(self.thresholds)
+        )
+        return self.values[index]
+
+    def save(self, path: str, model_path: str):
+        """Writes the table, tagged with the model file it was built from."""
+        with open(path, "wb") as f:
+            pickle.dump(
+                {
+                    "thresholds": self.thresholds,
+                    "values": self.values,
+                    "model": file_digest(model_path),
+                },
+                f,
+            )
+
+    @classmethod
+    def load(cls, path: str, model_path: str) -> Optional["PriceTable"]:
+        """The table at `path`, or None if missing or built from another model."""
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            saved = pickle.load(f)
+        if os.path.exists(model_path) and file_digest(model_path) != saved["model"]:
+            print(f"Ignoring stale price table {os.path.basename(path)}")
+            return None
+        return cls(saved["thresholds"], saved["values"], saved["model"])
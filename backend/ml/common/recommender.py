@@ -0,0 +1,260 @@
+"""
+Content-based recommender engine shared by the wellness catalogs.
+
+The yoga and mental-health services have the same shape: a catalog DataFrame,
+a TF-IDF vectorizer and matrix, a price regressor with label encoders and a
+KMeans tier model. `RecommenderEngine` owns all of that for one catalog,
+described by a `CatalogSchema`, and the routers in each service are thin
+adapters that map request fields onto it.
+
+Engines are kept in a per-process registry (`get_engine`), so a deployment
+that mounts several catalogs in one app loads each set of artifacts once.
+"""
+
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import cosine_similarity
+
+from common.batching import MicroBatcher
+from common.catalog_index import CatalogIndex
+from common.encoding import LabelMap, load_label_maps
+from common.metrics import Counter, stage_timer
+from common.name_index import NameIndex
+from common.price_table import PRICE_PREDICTIONS, PriceTable
+from common.records import RecordTable
+from common.responses import StaticJSON
+from common.singleflight import SingleFlight
+from common.tiers import TierAssigner
+
+CACHE_LOOKUPS = Counter(
+    "healtrip_recommender_cache_lookups",
+    "Recommendation cache lookups by catalog and outcome.",
+    ("catalog", "result"),
+)
+
+
+class CatalogSchema:
+    """Column layout of one catalog and the prefix of its artifact files."""
+
+    def __init__(
+        self,
+        key: str,
+        label: str,
+        name_col: str,
+        price_col: str,
+        filter_cols: Iterable[str],
+    ):
+        self.key = key
+        self.label = label
+        self.name_col = name_col
+        self.price_col = price_col
+        self.filter_cols = tuple(filter_cols)
+
+
+class _LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class RecommenderEngine:
+    def __init__(
+        self,
+        schema: CatalogSchema,
+        models_dir: str,
+        listing_size: int = 50,
+        cache_size: int = 1024,
+    ):
+        self.schema = schema
+        self.models_dir = models_dir
+        self.listing_size = listing_size
+        self.cache = _LRUCache(cache_size)
+        self.flights = SingleFlight(f"{schema.key}_recommend")
+        self.price_batcher = MicroBatcher(f"{schema.key}_price", self.predict_price)
+        self.vectorizer = None
+        self.price_model = None
+        self.price_table = None
+        self.label_maps = None
+        self.tiers = None
+        self.df = None
+        self.matrix = None
+        self.names = None
+        self.index = None
+        self.records = None
+        self.listing = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.df is not None
+
+    def _artifact(self, name: str):
+        path = os.path.join(self.models_dir, f"{name}.pkl")
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def load(self):
+        key = self.schema.key
+        print(f"Loading {self.schema.label} Models...")
+        try:
+            self.vectorizer = self._artifact(f"{key}_vectorizer")
+            matrix = self._artifact(f"{key}_tfidf_matrix")
+            self.price_table, self.price_model = self._load_price_model()
+            self.label_maps = self._load_label_maps()
+            self.tiers = TierAssigner(self._artifact(f"{key}_clustering_model"))
+            df = pd.read_pickle(os.path.join(self.models_dir, f"{key}_df.pkl"))
+            self.set_catalog(df, matrix)
+            print(f"{self.schema.label} Models loaded.")
+        except Exception as e:
+            print(f"Error loading {key} models: {e}")
+
+    def _load_price_model(self):
+        """The price lookup table if one matches the model, otherwise the model."""
+        key = self.schema.key
+        table = PriceTable.load(
+            os.path.join(self.models_dir, f"{key}_price_table.pkl"),
+            os.path.join(self.models_dir, f"{key}_price_model.pkl"),
+        )
+        if table is not None:
+            return table, None
+        return None, self._artifact(f"{key}_price_model")
+
+    def _load_label_maps(self):
+        key = self.schema.key
+        path = os.path.join(self.models_dir, f"{key}_label_maps.json")
+        if os.path.exists(path):
+            return load_label_maps(path)
+        # Artifacts trained before label maps were exported only have the encoders
+        encoders = self._artifact("encoders")[f"{key}_encoders"]
+        return {
+            field: LabelMap.from_encoder(field, le) for field, le in encoders.items()
+        }
+
+    def set_catalog(self, df: pd.DataFrame, matrix):
+        """Swaps in a catalog and its row-aligned TF-IDF matrix, rebuilding indexes."""
+        schema = self.schema
+        names = NameIndex(df[schema.name_col])
+        index = CatalogIndex(df, schema.price_col, schema.filter_cols)
+        records = RecordTable(df)
+        # The listing only changes when artifacts change, so render it once
+        listing = StaticJSON(records.take(range(min(self.listing_size, len(df)))))
+        self.matrix = matrix
+        self.names = names
+        self.index = index
+        self.records = records
+        self.listing = listing
+        self.df = df
+        self.cache.clear()
+
+    def encode(self, field: str, value) -> int:
+        return self.label_maps[field].encode(value)
+
+    def encode_many(self, field: str, values) -> np.ndarray:
+        return self.label_maps[field].encode_many(values)
+
+    def recommend(
+        self, text: str, max_price: Optional[float] = None, k: int = 10, **equals
+    ) -> List[dict]:
+        """
+        Top-k catalog rows by TF-IDF similarity to `text`, among rows priced at
+        most `max_price` and matching every `column=value` filter given.
+        """
+        cache_key = (text, max_price, k, tuple(sorted(equals.items())))
+        records = self.cache.get(cache_key)
+        if records is not None:
+            CACHE_LOOKUPS.labels(self.schema.key, "hit").inc()
+            return records
+        CACHE_LOOKUPS.labels(self.schema.key, "miss").inc()
+        # Concurrent misses for the same query (e.g. right after a reload) compute once
+        return self.flights.do(
+            cache_key, self._recommend_and_cache, cache_key, text, max_price, k, equals
+        )
+
+    def _recommend_and_cache(self, cache_key, text, max_price, k, equals):
+        records = self._recommend(text, max_price, k, equals)
+        self.cache.put(cache_key, records)
+        return records
+
+    def _recommend(self, text, max_price, k, equals) -> List[dict]:
+        index = self.index
+        # Filter first so similarity is only computed for rows that can be returned
+        rows = index.candidates(max_price=max_price, **equals)
+        if len(rows) == 0:
+            return []
+        with stage_timer("vectorizer_transform"):
+            vec = self.vectorizer.transform([text])
+        with stage_timer("cosine_similarity"):
+            sim = cosine_similarity(vec, index.select(self.matrix, rows)).flatten()
+        with stage_timer("sort_values"):
+            top_rows, top_sim = index.top_k(rows, sim, k)
+        return self.records.take(top_rows, sim=top_sim)
+
+    def predict_price(self, features) -> np.ndarray:
+        with stage_timer("predict"):
+            if self.price_table is not None:
+                PRICE_PREDICTIONS.labels(self.schema.key, "table").inc()
+                return self.price_table.predict(features)
+            PRICE_PREDICTIONS.labels(self.schema.key, "model").inc()
+            return self.price_model.predict(features)
+
+    def predict_price_row(self, row) -> float:
+        """
+        Price for one feature row. Table lookups run directly; model calls
+        from concurrent requests are batched into one predict.
+        """
+        if self.price_table is not None:
+            return self.predict_price([row])[0]
+        return self.price_batcher(row)
+
+    def cluster_of(self, titles: Iterable[str]) -> List[Optional[Dict[str, str]]]:
+        """Name and tier of the best name match for each title (None if absent)."""
+        names = self.df[self.schema.name_col].to_numpy()
+        clusters = self.df["Cluster_Name"].to_numpy()
+        results = []
+        for title in titles:
+            row = self.names.find_first(title)
+            if row is None:
+                results.append(None)
+            else:
+                results.append({"name": names[row], "cluster": clusters[row]})
+        return results
+
+    def assign_tiers(self, features) -> list:
+        return self.tiers.assign(features)
+
+
+_ENGINES: Dict[str, RecommenderEngine] = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_engine(schema: CatalogSchema, models_dir: str) -> RecommenderEngine:
+    """The process-wide engine for a catalog, created on first use."""
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(schema.key)
+        if engine is None:
+            engine = _ENGINES[schema.key] = RecommenderEngine(schema, models_dir)
+        return engine
@@ -0,0 +1,60 @@
+"""
+Response records prepared once at artifact load.
+
+Turning result rows into JSON-ready dicts per request (`iterrows`,
+`fillna`/`replace` then `to_dict(orient="records")`) costs about as much as
+scoring them. `RecordTable` converts every row of a catalog to a tuple of
+plain Python values when artifacts are loaded, with missing values already
+replaced, so a response only zips the top-k tuples with the column names.
+"""
+
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def _missing(value) -> bool:
+    return value is None or (np.ndim(value) == 0 and bool(pd.isna(value)))
+
+
+class RecordTable:
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        columns: Optional[Sequence[str]] = None,
+        keys: Optional[Sequence[str]] = None,
+        na=None,
+    ):
+        """
+        `columns` picks and orders the DataFrame columns (all by default),
+        `keys` renames them in the output, and `na` replaces missing values.
+        """
+        columns = list(df.columns if columns is None else columns)
+        self.keys = tuple(columns if keys is None else keys)
+        values = []
+        for col in columns:
+            # tolist() yields native Python scalars, which serialize directly
+            column = df[col].tolist()
+            if df[col].hasnans:
+                column = [na if _missing(v) else v for v in column]
+            values.append(column)
+        self.rows = list(zip(*values)) if values else [()] * len(df)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def take(self, rows: Iterable[int], **extra) -> List[dict]:
+        """
+        Dicts for the given row positions, in order. Each keyword adds a
+        column from a sequence aligned with `rows` (e.g. scores).
+        """
+        rows = np.asarray(rows, dtype=np.intp).tolist()
+        keys, table = self.keys, self.rows
+        records = [dict(zip(keys, table[r])) for r in rows]
+        for name, column in extra.items():
+            if isinstance(column, np.ndarray):
+                column = column.tolist()
+            for record, value in zip(records, column):
+                record[name] = value
+        return records
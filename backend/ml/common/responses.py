@@ -0,0 +1,72 @@
+"""
+Fast JSON responses shared by the ML services.
+
+`FastJSONResponse` renders with orjson when it is installed (falling back to
+the standard library), and endpoints that return it directly also skip
+FastAPI's `jsonable_encoder` pass.
+
+`StaticJSON` holds a response body rendered once at artifact load time, with
+a content-hash ETag, for listings that only change when artifacts are
+reloaded. Clients that send a matching If-None-Match get an empty 304.
+"""
+
+import hashlib
+import json
+from typing import Any
+
+import numpy as np
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # optional speed-up, see requirements.txt
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class StaticJSON:
+    """A JSON body serialized once, served with an ETag."""
+
+    def __init__(self, content: Any):
+        self.body = dumps(content)
+        self.etag = '"' + hashlib.blake2b(self.body, digest_size=16).hexdigest() + '"'
+
+    def matches(self, if_none_match: str) -> bool:
+        if not if_none_match:
+            return False
+        tags = [t.strip() for t in if_none_match.split(",")]
+        tags = [t[2:] if t.startswith("W/") else t for t in tags]
+        return "*" in tags or self.etag in tags
+
+    def response(self, request: Request = None) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if request is not None and self.matches(
+            request.headers.get("if-none-match", "")
+        ):
+            return Response(status_code=304, headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
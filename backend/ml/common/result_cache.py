@@ -0,0 +1,161 @@
+"""
+Persistent cache of per-document results, keyed by a hash of the content.
+
+The same report is often submitted again (retries, several family members,
+quote revisions). `ResultCache` stores what was derived from a document in a
+local SQLite database, keyed by the SHA-256 of its bytes, so a repeat skips
+parsing and inference altogether. SQLite in WAL mode lets every worker process
+of a service read and write the same file, and entries survive restarts.
+
+Each entry is tagged with an artifact version (see `artifact_version`). An
+entry written under other artifacts counts as stale and is recomputed, so
+retraining never serves old results.
+
+`get` and `put` do blocking disk I/O, also on a hit. Call them from sync
+endpoints or through `run_in_threadpool`, never directly on the event loop.
+
+  HEALTRIP_CACHE_DIR    directory for the cache databases (default: a
+                        `cache` directory next to the service)
+  HEALTRIP_CACHE_SIZE   maximum number of entries per cache (default 100000);
+                        the oldest entries are dropped beyond that. 0 disables
+                        the cache.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional
+
+from common.metrics import Counter
+
+DEFAULT_SIZE = 100_000
+# Inserts between two checks of the entry limit
+_PRUNE_EVERY = 500
+
+CACHE_LOOKUPS = Counter(
+    "healtrip_result_cache_lookups",
+    "Persistent result cache lookups by cache and outcome.",
+    ("cache", "result"),
+)
+
+
+def content_key(kind: str, content) -> str:
+    """
+    Cache key for a document given as bytes or a binary file (read in chunks
+    and rewound). `kind` separates e.g. PDF from plain text.
+    """
+    digest = hashlib.sha256()
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        digest.update(content)
+    else:
+        content.seek(0)
+        for chunk in iter(lambda: content.read(1 << 20), b""):
+            digest.update(chunk)
+        content.seek(0)
+    return f"{kind}:{digest.hexdigest()}"
+
+
+def artifact_version(paths: Iterable[str], extra: str = "") -> str:
+    """
+    A short fingerprint of artifact files (name, size, modification time) and
+    of `extra`, e.g. settings that change results.
+    """
+    digest = hashlib.sha256(extra.encode())
+    for path in sorted(paths):
+        try:
+            stat = os.stat(path)
+            digest.update(f"{os.path.basename(path)}:{stat.st_size}:".encode())
+            digest.update(str(stat.st_mtime_ns).encode())
+        except FileNotFoundError:
+            digest.update(f"{os.path.basename(path)}:missing".encode())
+    return digest.hexdigest()[:16]
+
+
+class ResultCache:
+    def __init__(self, name: str, path: str, version: str, max_entries: int = None):
+        self.name = name
+        self.path = path
+        self.version = version
+        if max_entries is None:
+            max_entries = int(os.getenv("HEALTRIP_CACHE_SIZE", DEFAULT_SIZE))
+        self.max_entries = max_entries
+        self.enabled = max_entries > 0
+        self._local = threading.local()
+        self._inserts = 0
+        if self.enabled:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with self._connect() as db:
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "key TEXT PRIMARY KEY, version TEXT NOT NULL, "
+                    "value TEXT NOT NULL, created REAL NOT NULL)"
+                )
+                db.execute(
+                    "CREATE INDEX IF NOT EXISTS results_created ON results (created)"
+                )
+
+    @classmethod
+    def for_service(cls, service_dir: str, name: str, version: str) -> "ResultCache":
+        cache_dir = os.getenv("HEALTRIP_CACHE_DIR") or os.path.join(
+            service_dir, "cache"
+        )
+        return cls(name, os.path.join(cache_dir, f"{name}.sqlite"), version)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread and process: sqlite3 connections must not
+        # cross threads, and must not be inherited over fork (pre-fork mode).
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def get(self, key: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        try:
+            row = (
+                self._connect()
+                .execute("SELECT version, value FROM results WHERE key = ?", (key,))
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            print(f"Result cache {self.name} read failed: {e}")
+            row = None
+        if row is None:
+            CACHE_LOOKUPS.labels(self.name, "miss").inc()
+            return None
+        if row[0] != self.version:
+            CACHE_LOOKUPS.labels(self.name, "stale").inc()
+            return None
+        CACHE_LOOKUPS.labels(self.name, "hit").inc()
+        return json.loads(row[1])
+
+    def put(self, key: str, value: dict):
+        """Stores a JSON-serializable value. Failures only skip caching."""
+        if not self.enabled:
+            return
+        try:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (key, self.version, json.dumps(value), time.time()),
+            )
+            self._inserts += 1
+            if self._inserts % _PRUNE_EVERY == 0:
+                self._prune(db)
+        except sqlite3.Error as e:
+            print(f"Result cache {self.name} write failed: {e}")
+
+    def _prune(self, db: sqlite3.Connection):
+        db.execute(
+            "DELETE FROM results WHERE key IN (SELECT key FROM results "
+            "ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
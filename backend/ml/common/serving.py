@@ -0,0 +1,289 @@
+"""
+Server settings shared by the ML service entry points.
+
+Every service's `__main__` block calls `serve("main:app", "<service>", port)`
+instead of `uvicorn.run` directly, so connection handling is tuned the same
+way everywhere and can be changed through the environment:
+
+  HEALTRIP_KEEPALIVE    seconds an idle keep-alive connection is held open
+                        (default 75). Keep this above the callers' idle pool
+                        expiry, otherwise the server may close a connection
+                        just as a client reuses it.
+  HEALTRIP_BACKLOG      listen backlog for connection bursts (default 2048).
+  HEALTRIP_SOCKET_DIR   if set, listen on the Unix domain socket
+                        <dir>/<service>.sock instead of TCP. Co-located callers
+                        (e.g. the trip quote service) skip TCP setup entirely;
+                        see common/http_client.py.
+  HEALTRIP_RELOAD       "0"/"1" to force auto-reload off/on.
+  HEALTRIP_WORKERS      number of worker processes (default 1). See below.
+
+With HEALTRIP_WORKERS > 1 the service runs pre-forked: the parent process
+imports the app and runs its `preload` hook (so every artifact is loaded
+once), freezes the garbage collector, binds the listening socket and forks
+the workers. The NumPy arrays, sparse matrices and DataFrames are then shared
+copy-on-write; `gc.freeze()` keeps collections in the workers from writing to
+the pages holding those objects. The parent supervises the workers:
+
+  SIGHUP            recycle the workers one at a time (each old worker
+                    finishes its in-flight requests before exiting). New
+                    workers are forked from the already loaded parent, so
+                    this does not pick up new code or artifacts.
+  SIGTERM / SIGINT  graceful shutdown of all workers
+  worker exit       the worker is replaced, after an exponential backoff if
+                    it failed or exited soon after starting. When the same
+                    worker fails MAX_FAILURES times in a row (e.g. a startup
+                    hook raises), the parent stops with an error.
+
+Auto-reload is always off in this mode. New artifacts or code need a restart
+of the parent.
+
+uvicorn only speaks HTTP/1.1, so connection reuse comes from keep-alive and
+the client pool rather than HTTP/2 multiplexing.
+"""
+
+import gc
+import importlib
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Callable, Optional
+
+import uvicorn
+
+from common.metrics import REGISTRY
+
+DEFAULT_KEEPALIVE = 75
+DEFAULT_BACKLOG = 2048
+# Seconds a stopping worker gets to finish in-flight requests
+GRACEFUL_TIMEOUT = 30
+# A worker exiting sooner than this after its start counts as failed
+MIN_UPTIME = 10.0
+# Respawn delay after a failure, doubling up to RESTART_BACKOFF_MAX seconds
+RESTART_BACKOFF = 0.5
+RESTART_BACKOFF_MAX = 30.0
+# Consecutive failures of one worker after which the parent gives up
+MAX_FAILURES = 5
+# Worker exit status when uvicorn did not start (as uvicorn's own)
+STARTUP_FAILURE = 3
+
+
+def socket_path(service: str) -> Optional[str]:
+    """The Unix socket a service listens on, or None when serving over TCP."""
+    socket_dir = os.getenv("HEALTRIP_SOCKET_DIR")
+    if not socket_dir:
+        return None
+    return os.path.join(socket_dir, f"{service}.sock")
+
+
+def server_options(service: str, host: str, port: int) -> dict:
+    options = {
+        "timeout_keep_alive": int(os.getenv("HEALTRIP_KEEPALIVE", DEFAULT_KEEPALIVE)),
+        "backlog": int(os.getenv("HEALTRIP_BACKLOG", DEFAULT_BACKLOG)),
+    }
+    uds = socket_path(service)
+    if uds:
+        os.makedirs(os.path.dirname(uds), exist_ok=True)
+        if os.path.exists(uds):
+            # Left behind by a previous run that did not shut down cleanly
+            os.remove(uds)
+        options["uds"] = uds
+    else:
+        options["host"] = host
+        options["port"] = port
+    return options
+
+
+def serve(
+    app: str,
+    service: str,
+    port: int,
+    host: str = "0.0.0.0",
+    reload=False,
+    preload: Callable = None,
+):
+    """
+    Runs `app` (an import string such as "main:app"). `preload` is called once
+    before serving; in pre-fork mode it runs in the parent, before forking.
+    """
+    workers = int(os.getenv("HEALTRIP_WORKERS", "1"))
+    if workers > 1:
+        Prefork(app, service, port, host, workers, preload).run()
+        return
+    reload = os.getenv("HEALTRIP_RELOAD", "1" if reload else "0") == "1"
+    if preload is not None and not reload:
+        preload()
+    uvicorn.run(app, reload=reload, **server_options(service, host, port))
+
+
+def _import_app(target: str):
+    module_name, attr = target.split(":")
+    main = sys.modules.get("__main__")
+    main_file = os.path.basename(getattr(main, "__file__", "") or "")
+    if os.path.splitext(main_file)[0] == module_name:
+        # Started as `python main.py`: the app is already built in __main__,
+        # importing "main" again would load every artifact a second time.
+        return getattr(main, attr)
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _listen(options: dict) -> socket.socket:
+    if "uds" in options:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(options["uds"])
+    else:
+        family = socket.AF_INET6 if ":" in options["host"] else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((options["host"], options["port"]))
+    sock.listen(options["backlog"])
+    sock.set_inheritable(True)
+    return sock
+
+
+class Prefork:
+    def __init__(self, app, service, port, host, workers, preload=None):
+        self.target = app
+        self.service = service
+        self.workers = workers
+        self.preload = preload
+        self.options = server_options(service, host, port)
+        self.children = {}  # pid -> worker slot
+        self.spawned = {}  # slot -> monotonic time of its last spawn
+        self.failures = {}  # slot -> consecutive failures
+        self.respawn = {}  # slot -> monotonic time to respawn a failed worker
+        self.stopping = False
+        self.failed = None
+        self.restart_requested = False
+
+    def run(self):
+        app = _import_app(self.target)
+        if self.preload is not None:
+            self.preload()
+        self.sock = _listen(self.options)
+        # Everything loaded so far is long-lived: keep the collector off it
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_hup)
+        where = self.options.get("uds") or "{host}:{port}".format(**self.options)
+        print(f"{self.service}: serving on {where} with {self.workers} workers")
+        for slot in range(self.workers):
+            self._spawn(app, slot)
+
+        while not self.stopping:
+            if self.restart_requested:
+                self.restart_requested = False
+                self._rolling_restart(app)
+            self._reap(app)
+            self._respawn_due(app)
+            time.sleep(0.5)
+        self._shutdown()
+        if self.failed:
+            raise SystemExit(self.failed)
+
+    def _on_stop(self, signum, frame):
+        self.stopping = True
+
+    def _on_hup(self, signum, frame):
+        self.restart_requested = True
+
+    def _spawn(self, app, slot: int) -> int:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = slot
+            self.spawned[slot] = time.monotonic()
+            return pid
+        # Worker: uvicorn installs its own SIGTERM/SIGINT handling
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sig, signal.SIG_DFL)
+        REGISTRY.const_labels["worker"] = str(slot)
+        # The socket is already bound; only connection settings still apply
+        options = {
+            "timeout_keep_alive": self.options["timeout_keep_alive"],
+            "timeout_graceful_shutdown": GRACEFUL_TIMEOUT,
+        }
+        config = uvicorn.Config(app, **options)
+        code = 1
+        try:
+            server = uvicorn.Server(config)
+            server.run(sockets=[self.sock])
+            # uvicorn returns without raising when a startup hook fails
+            code = 0 if server.started else STARTUP_FAILURE
+        finally:
+            os._exit(code)
+
+    def _reap(self, app):
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            slot = self.children.pop(pid, None)
+            if slot is None or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            uptime = time.monotonic() - self.spawned[slot]
+            if code == 0 and uptime >= MIN_UPTIME:
+                self.failures[slot] = 0
+                print(f"{self.service}: worker {pid} exited, replacing it")
+                self._spawn(app, slot)
+                continue
+            failures = self.failures.get(slot, 0) + 1
+            self.failures[slot] = failures
+            if failures >= MAX_FAILURES:
+                self.failed = (
+                    f"{self.service}: worker {slot} failed {failures} times in a "
+                    f"row (last exit status {code}), giving up"
+                )
+                self.stopping = True
+                return
+            delay = min(RESTART_BACKOFF * 2 ** (failures - 1), RESTART_BACKOFF_MAX)
+            print(
+                f"{self.service}: worker {pid} failed (exit status {code} after "
+                f"{uptime:.1f}s), replacing it in {delay:g}s"
+            )
+            self.respawn[slot] = time.monotonic() + delay
+
+    def _respawn_due(self, app):
+        now = time.monotonic()
+        for slot, when in list(self.respawn.items()):
+            if when <= now and not self.stopping:
+                del self.respawn[slot]
+                self._spawn(app, slot)
+
+    def _rolling_restart(self, app):
+        for pid, slot in list(self.children.items()):
+            self._spawn(app, slot)
+            # The new worker shares the socket, so the old one can drain and exit
+            self.children.pop(pid, None)
+            self._stop_worker(pid)
+
+    def _stop_worker(self, pid: int):
+        try:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+        except (ChildProcessError, ProcessLookupError):
+            pass
+
+    def _shutdown(self):
+        print(f"{self.service}: stopping {len(self.children)} workers")
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT + 5
+        while self.children and time.monotonic() < deadline:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid:
+                self.children.pop(pid, None)
+            else:
+                time.sleep(0.1)
+        for pid in self.children:
+            os.kill(pid, signal.SIGKILL)
+        self.sock.close()
+        if "uds" in self.options and os.path.exists(self.options["uds"]):
+            os.remove(self.options["uds"])
@@ -0,0 +1,81 @@
+"""
+Request coalescing ("single-flight") for identical concurrent computations.
+
+When many requests with the same parameters arrive together, only the first
+(the leader) runs the computation; the others wait for it and get the same
+result object, or the same exception. Once the leader finishes the key is
+forgotten, so this removes thundering herds without caching anything itself.
+
+Sync endpoints run in FastAPI's thread pool, so waiting is done with
+threading primitives. Results are shared between callers and must be treated
+as read-only.
+"""
+
+import functools
+import threading
+from typing import Callable, Dict, Hashable
+
+from common.metrics import Counter
+
+COALESCED = Counter(
+    "healtrip_singleflight_calls",
+    "Coalesced computations by group and role (leader ran it, follower waited).",
+    ("group", "role"),
+)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, group: str):
+        self.group = group
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            COALESCED.labels(self.group, "follower").inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        COALESCED.labels(self.group, "leader").inc()
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+def single_flight(group: str):
+    """Decorator coalescing concurrent calls with equal (hashable) arguments."""
+    flights = SingleFlight(group)
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            return flights.do(key, fn, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
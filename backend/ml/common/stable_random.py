@@ -0,0 +1,77 @@
+"""
+Deterministic, vectorized per-key random draws.
+
+Python's built-in `hash()` is salted per process, so anything seeded from it
+changes between runs. Here each key (e.g. a centre name) is hashed with a keyed
+BLAKE2b digest into a 64-bit seed, and any number of uniform draws per key are
+derived from that seed with the SplitMix64 mixer in pure NumPy. The result
+depends only on the key text, never on row order, process or platform.
+"""
+
+import hashlib
+from typing import Iterable
+
+import numpy as np
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def stable_seeds(keys: Iterable[str], salt: bytes = b"healtrip") -> np.ndarray:
+    """Keyed 64-bit BLAKE2b digest of every key, as a uint64 array."""
+    # Copying a keyed state is cheaper than re-keying for every value
+    base = hashlib.blake2b(digest_size=8, key=salt)
+
+    def digest(key):
+        h = base.copy()
+        h.update(str(key).encode("utf-8"))
+        return h.digest()
+
+    digests = b"".join(map(digest, keys))
+    return np.frombuffer(digests, dtype="<u8").astype(np.uint64)
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    z = x.copy()
+    z ^= z >> np.uint64(30)
+    z *= _MIX1
+    z ^= z >> np.uint64(27)
+    z *= _MIX2
+    z ^= z >> np.uint64(31)
+    return z
+
+
+def stable_uniforms(keys: Iterable[str], n_draws: int, salt: bytes = b"healtrip"):
+    """Returns an (n_keys, n_draws) array of uniforms in [0, 1)."""
+    seeds = stable_seeds(keys, salt)
+    counters = np.arange(1, n_draws + 1, dtype=np.uint64) * _GOLDEN
+    with np.errstate(over="ignore"):
+        mixed = _splitmix64(seeds[:, None] + counters[None, :])
+    # Top 53 bits -> double in [0, 1)
+    return (mixed >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def choice_index(u: np.ndarray, n_options: int) -> np.ndarray:
+    """Maps uniforms to integer indices in [0, n_options)."""
+    return np.minimum((u * n_options).astype(np.int64), n_options - 1)
+
+
+def sample_without_replacement(u: np.ndarray, options, counts: np.ndarray):
+    """
+    Picks counts[i] distinct options for row i, using one uniform per option
+    (u has shape (n_rows, len(options))). Returns comma-joined strings.
+    """
+    n_options = len(options)
+    width = int(counts.max()) if len(counts) else 0
+    picked = np.argsort(u, axis=1)[:, :width]
+    # Encode each ordered pick as one integer (sentinel n_options = unused slot)
+    # so the string join only runs once per distinct combination.
+    digits = np.where(np.arange(width) < counts[:, None], picked, n_options)
+    codes = digits @ ((n_options + 1) ** np.arange(width, dtype=np.int64))
+    _, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+    labels = np.array(
+        [",".join(options[d] for d in digits[i] if d < n_options) for i in first],
+        dtype=object,
+    )
+    return labels[inverse.ravel()]
@@ -0,0 +1,197 @@
+"""
+Synthetic dataset scaler for capacity testing.
+
+Generates arbitrarily large CSVs that keep the schema and the rough shape of
+the shipped datasets, so the training scripts and services can be exercised
+at catalog sizes we don't have yet. Rows are produced chunk by chunk and
+appended to the output file, so memory stays bounded by `--chunk-size`
+regardless of how many rows are requested.
+
+Each row bootstraps a real source row (keeping correlated columns such as
+City/State, hotel amenities/price or flight route/codes together), then
+re-samples independent categoricals from their empirical distribution,
+jitters numeric columns within the observed range and assigns unique ids.
+
+Usage (from backend/ml):
+    python common/synthetic_data.py hotels --rows 1000000
+    python common/synthetic_data.py hospitals --rows 500000 --out /tmp/h.csv
+    python hospitals/train_model.py --data /tmp/h.csv
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SOURCES = {
+    "hospitals": os.path.join("hospitals", "data", "hospitals_1000.csv"),
+    "hotels": os.path.join("hotels", "data", "google_hotel_data_clean_v2.csv"),
+    "flights": os.path.join(
+        "flights", "data", "international_flights_india_1000 (1).csv"
+    ),
+    "yoga": os.path.join("ml-yoga", "data", "yoga_wellness_india_500.csv"),
+    "mental": os.path.join("ml-mental", "data", "mental_health_sessions_india_500.csv"),
+}
+
+TIME_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def load_source(dataset: str) -> pd.DataFrame:
+    df = pd.read_csv(os.path.join(ML_DIR, SOURCES[dataset]))
+    # hospitals_1000.csv carries trailing empty columns; they are not part of the schema
+    return df.loc[:, ~df.columns.str.startswith("Unnamed")]
+
+
+def _bootstrap(src: pd.DataFrame, rng: np.random.Generator, n: int) -> pd.DataFrame:
+    return src.iloc[rng.integers(0, len(src), n)].reset_index(drop=True)
+
+
+def _resample(values: pd.Series, rng: np.random.Generator, n: int) -> np.ndarray:
+    """Draws from the empirical distribution of a categorical column."""
+    freq = values.value_counts(normalize=True)
+    return rng.choice(freq.index.to_numpy(), size=n, p=freq.to_numpy())
+
+
+def _jitter_additive(values, rng, scale, lo, hi, decimals):
+    noisy = np.asarray(values, dtype=float) + rng.normal(0.0, scale, len(values))
+    return np.clip(noisy, lo, hi).round(decimals)
+
+
+def _jitter_relative(values, rng, sigma, lo, hi):
+    noisy = np.asarray(values, dtype=float) * rng.lognormal(0.0, sigma, len(values))
+    return np.clip(noisy, lo, hi).round()
+
+
+def _renumber(names: pd.Series, start: int) -> pd.Series:
+    """'Ganga Wellness Ashram #1' -> 'Ganga Wellness Ashram #<start+i+1>'."""
+    base = names.str.replace(r"\s*#\d+$", "", regex=True)
+    ids = pd.Series(np.arange(start + 1, start + len(names) + 1), dtype=str)
+    return base + " #" + ids
+
+
+def _hospitals_chunk(src, rng, start, n):
+    df = _bootstrap(src, rng, n)
+    df["ID"] = np.arange(start + 1, start + n + 1)
+    df["Specialty"] = _resample(src["Specialty"], rng, n)
+    df["Review_Summary"] = _resample(src["Review_Summary"], rng, n)
+    ratings = src["Rating_5_Scale"]
+    df["Rating_5_Scale"] = _jitter_additive(
+        df["Rating_5_Scale"], rng, 0.2, ratings.min(), ratings.max(), 1
+    )
+    return df
+
+
+def _hotels_chunk(src, rng, start, n):
+    df = _bootstrap(src, rng, n)
+    df["Hotel_Name"] = _renumber(df["Hotel_Name"], start)
+    ratings = src["Hotel_Rating"]
+    df["Hotel_Rating"] = _jitter_additive(
+        df["Hotel_Rating"], rng, 0.1, ratings.min(), ratings.max(), 1
+    )
+    prices = src["Hotel_Price"]
+    df["Hotel_Price"] = _jitter_relative(
+        df["Hotel_Price"], rng, 0.2, prices.min(), prices.max()
+    )
+    return df
+
+
+def _flights_chunk(src, rng, start, n):
+    df = _bootstrap(src, rng, n)
+    df["Flight_Number"] = df["Airline_Code"] + pd.Series(
+        rng.integers(1000, 10000, n), dtype=str
+    )
+
+    # Keep each row's time of day, spread dates over the observed window
+    departures = pd.to_datetime(df["Departure_Time"], format=TIME_FORMAT)
+    observed = pd.to_datetime(src["Departure_Time"], format=TIME_FORMAT)
+    first_day = observed.min().normalize()
+    span_days = max(1, (observed.max().normalize() - first_day).days + 1)
+    departures = (
+        first_day
+        + pd.to_timedelta(rng.integers(0, span_days, n), unit="D")
+        + (departures - departures.dt.normalize())
+    )
+
+    durations = src["Duration_Minutes"]
+    df["Duration_Minutes"] = _jitter_relative(
+        df["Duration_Minutes"], rng, 0.05, durations.min(), durations.max()
+    ).astype(int)
+    arrivals = departures + pd.to_timedelta(df["Duration_Minutes"], unit="m")
+    df["Departure_Time"] = departures.dt.strftime(TIME_FORMAT)
+    df["Arrival_Time"] = arrivals.dt.strftime(TIME_FORMAT)
+
+    economy = src["Economy_Price_INR"]
+    business_ratio = df["Business_Price_INR"] / df["Economy_Price_INR"]
+    df["Economy_Price_INR"] = _jitter_relative(
+        df["Economy_Price_INR"], rng, 0.15, economy.min(), economy.max()
+    ).astype(int)
+    df["Business_Price_INR"] = (df["Economy_Price_INR"] * business_ratio).round()
+    df["Business_Price_INR"] = df["Business_Price_INR"].astype(int)
+    return df
+
+
+def _wellness_chunk(name_col):
+    def chunk(src, rng, start, n):
+        df = _bootstrap(src, rng, n)
+        df[name_col] = _renumber(df[name_col], start)
+        df["Category"] = _resample(src["Category"], rng, n)
+        return df
+
+    return chunk
+
+
+GENERATORS = {
+    "hospitals": _hospitals_chunk,
+    "hotels": _hotels_chunk,
+    "flights": _flights_chunk,
+    "yoga": _wellness_chunk("Center_Name"),
+    "mental": _wellness_chunk("Session_Name"),
+}
+
+
+def iter_chunks(dataset: str, rows: int, seed: int = 42, chunk_size: int = 100_000):
+    """Yields DataFrames of at most `chunk_size` rows, `rows` in total."""
+    src = load_source(dataset)
+    rng = np.random.default_rng(seed)
+    make_chunk = GENERATORS[dataset]
+    for start in range(0, rows, chunk_size):
+        n = min(chunk_size, rows - start)
+        yield make_chunk(src, rng, start, n)[src.columns]
+
+
+def generate(
+    dataset: str, rows: int, out: str, seed: int = 42, chunk_size: int = 100_000
+) -> str:
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", newline="", encoding="utf-8") as f:
+        for i, chunk in enumerate(iter_chunks(dataset, rows, seed, chunk_size)):
+            chunk.to_csv(f, header=i == 0, index=False)
+    return out
+
+
+def default_output(dataset: str, rows: int) -> str:
+    source = os.path.join(ML_DIR, SOURCES[dataset])
+    stem = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(os.path.dirname(source), "synthetic", f"{stem}_x{rows}.csv")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate scaled synthetic datasets")
+    parser.add_argument("dataset", choices=list(GENERATORS))
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--out", help="output CSV (default <service>/data/synthetic/)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    out = args.out or default_output(args.dataset, args.rows)
+    print(f"Generating {args.rows} {args.dataset} rows -> {out}")
+    generate(args.dataset, args.rows, out, args.seed, args.chunk_size)
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Vectorized price-tier assignment from the saved KMeans clustering artifacts.
+
+The training scripts save {"model": KMeans, "scaler": StandardScaler,
+"names": {cluster_id: tier name}}. Instead of calling scaler.transform +
+kmeans.predict per request, the scaler parameters and centroids are extracted
+once and assignment is a single nearest-centroid computation over a batch.
+"""
+
+import numpy as np
+
+
+class TierAssigner:
+    def __init__(self, clustering: dict):
+        scaler = clustering["scaler"]
+        self.mean = np.asarray(scaler.mean_, dtype=float)
+        self.scale = np.asarray(scaler.scale_, dtype=float)
+        self.centers = np.asarray(clustering["model"].cluster_centers_, dtype=float)
+        self.center_sq = (self.centers**2).sum(axis=1)
+        names = clustering["names"]
+        self.tiers = np.asarray(
+            [names[i] for i in range(len(self.centers))], dtype=object
+        )
+
+    def assign_ids(self, features) -> np.ndarray:
+        """Cluster id for every row of an (n, n_features) array."""
+        z = (np.asarray(features, dtype=float) - self.mean) / self.scale
+        # argmin ||z - c||^2 == argmin (||c||^2 - 2 z.c); ||z||^2 is constant per row
+        return np.argmin(self.center_sq - 2.0 * z @ self.centers.T, axis=1)
+
+    def assign(self, features) -> list:
+        return self.tiers[self.assign_ids(features)].tolist()
@@ -0,0 +1,134 @@
+"""
+Bounded handling of report uploads.
+
+Starlette already spools multipart file parts to a temporary file (in memory
+up to 1 MB, on disk beyond that). The routes should then work from that file
+(`UploadFile.file`) instead of `await file.read()`, which copies the whole
+upload into memory. `UploadLimitMiddleware` bounds the rest, per worker:
+
+  HEALTRIP_MAX_UPLOAD_MB        largest accepted request body on upload routes
+                                (default 50). A declared Content-Length above
+                                it is rejected with 413 before anything is
+                                read; chunked bodies are cut off when they pass
+                                the limit.
+  HEALTRIP_UPLOAD_CONCURRENCY   uploads received at the same time (default 8).
+  HEALTRIP_UPLOAD_WAIT          seconds a further upload waits for a slot
+                                before it is rejected with 503 (default 10).
+
+`check_content_type` rejects file parts of an unexpected type with 415.
+"""
+
+import asyncio
+import os
+from typing import Iterable
+
+from fastapi import HTTPException, UploadFile
+from starlette.responses import JSONResponse
+
+from common.metrics import Counter, Gauge
+
+DEFAULT_MAX_UPLOAD_MB = 50
+DEFAULT_CONCURRENCY = 8
+DEFAULT_WAIT = 10.0
+
+UPLOADS_IN_FLIGHT = Gauge(
+    "healtrip_uploads_in_flight",
+    "Upload requests currently being received or processed.",
+)
+UPLOADS_REJECTED = Counter(
+    "healtrip_upload_rejections",
+    "Rejected uploads by reason.",
+    ("reason",),
+)
+
+
+class UploadTooLarge(HTTPException):
+    def __init__(self, limit: int):
+        super().__init__(
+            status_code=413, detail=f"Upload exceeds {limit // (1 << 20)} MB"
+        )
+
+
+def check_content_type(file: UploadFile, allowed: Iterable[str]):
+    """Raises 415 unless the part's type is allowed ("text/*" style allowed)."""
+    content_type = (file.content_type or "").split(";")[0].strip().lower()
+    for pattern in allowed:
+        if content_type == pattern or (
+            pattern.endswith("/*") and content_type.startswith(pattern[:-1])
+        ):
+            return
+    UPLOADS_REJECTED.labels("content_type").inc()
+    raise HTTPException(
+        status_code=415, detail=f"Unsupported file type: {content_type or 'unknown'}"
+    )
+
+
+class UploadLimitMiddleware:
+    """Pure ASGI middleware limiting body size and concurrency of upload routes."""
+
+    def __init__(self, app, paths, max_bytes: int, concurrency: int, wait: float):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_bytes = max_bytes
+        self.wait = wait
+        self.concurrency = concurrency
+        self._slots = None  # created on first use, inside the serving loop
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            UPLOADS_REJECTED.labels("size").inc()
+            error = UploadTooLarge(self.max_bytes)
+            await JSONResponse({"detail": error.detail}, 413)(scope, receive, send)
+            return
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.wait)
+        except asyncio.TimeoutError:
+            UPLOADS_REJECTED.labels("busy").inc()
+            response = JSONResponse(
+                {"detail": "Too many uploads in progress, retry shortly"},
+                503,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    UPLOADS_REJECTED.labels("size").inc()
+                    raise UploadTooLarge(self.max_bytes)
+            return message
+
+        UPLOADS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, limited_receive, send)
+        finally:
+            UPLOADS_IN_FLIGHT.dec()
+            self._slots.release()
+
+
+def install_upload_limits(app, paths: Iterable[str]):
+    """Adds `UploadLimitMiddleware` for the given routes, configured from env."""
+    app.add_middleware(
+        UploadLimitMiddleware,
+        paths=paths,
+        max_bytes=int(
+            float(os.getenv("HEALTRIP_MAX_UPLOAD_MB", DEFAULT_MAX_UPLOAD_MB))
+            * (1 << 20)
+        ),
+        concurrency=int(os.getenv("HEALTRIP_UPLOAD_CONCURRENCY", DEFAULT_CONCURRENCY)),
+        wait=float(os.getenv("HEALTRIP_UPLOAD_WAIT", DEFAULT_WAIT)),
+    )
@@ -1,9 +1,16 @@
-import uvicorn
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import pandas as pd
 import numpy as np
 import os
+import sys
+
+# Shared helpers (metrics, ...) live one level up in backend/ml/common
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.metrics import install_metrics
+from common.responses import FastJSONResponse
+from common.serving import serve
 
 app = FastAPI()
 
@@ -14,6 +21,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+install_metrics(app, "flights")
 
 # Load data
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -200,8 +208,8 @@ def recommend_flights(origin: str, destination: str):
             print(f"Row error: {e}")
             continue
 
-    return results
+    return FastJSONResponse(results)
 
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8002, reload=True)
+    serve("main:app", "flights", port=8002, reload=True)
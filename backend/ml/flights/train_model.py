@@ -1,3 +1,4 @@
+import argparse
 import pandas as pd
 import numpy as np
 import pickle
@@ -52,25 +53,25 @@ def normalize_city_name(city):
     return CITY_MAPPING.get(city_lower, str(city).strip().title())
 
 
-def load_and_clean_data():
+def load_and_clean_data(
+    domestic_path=DOMESTIC_DATA_PATH, international_path=INTERNATIONAL_DATA_PATH
+):
     print("Loading data...")
 
     # Load domestic flights
-    if not os.path.exists(DOMESTIC_DATA_PATH):
-        raise FileNotFoundError(f"Domestic data file not found at {DOMESTIC_DATA_PATH}")
+    if not os.path.exists(domestic_path):
+        raise FileNotFoundError(f"Domestic data file not found at {domestic_path}")
 
-    df_domestic = pd.read_csv(DOMESTIC_DATA_PATH)
+    df_domestic = pd.read_csv(domestic_path)
     print(f"Loaded {len(df_domestic)} domestic flights")
 
     # Load international flights
     df_international = None
-    if os.path.exists(INTERNATIONAL_DATA_PATH):
-        df_international = pd.read_csv(INTERNATIONAL_DATA_PATH)
+    if os.path.exists(international_path):
+        df_international = pd.read_csv(international_path)
         print(f"Loaded {len(df_international)} international flights")
     else:
-        print(
-            f"Warning: International data file not found at {INTERNATIONAL_DATA_PATH}"
-        )
+        print(f"Warning: International data file not found at {international_path}")
 
     # Process domestic data
     df_domestic.columns = [col.strip().title() for col in df_domestic.columns]
@@ -336,6 +337,11 @@ def train_models(df):
 
 
 if __name__ == "__main__":
-    df = load_and_clean_data()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--domestic", default=DOMESTIC_DATA_PATH)
+    parser.add_argument("--international", default=INTERNATIONAL_DATA_PATH)
+    args = parser.parse_args()
+
+    df = load_and_clean_data(args.domestic, args.international)
     df = feature_engineering(df)
     train_models(df)
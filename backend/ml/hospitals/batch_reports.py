@@ -0,0 +1,225 @@
+"""
+Offline bulk processing of referral reports: extract -> map -> rank.
+
+    python batch_reports.py <reports_dir> --out <output_dir> [--workers N]
+
+Walks <reports_dir> for .pdf/.txt files and runs every report through the
+same DiseaseExtractor / map_disease_to_specialty / HospitalRanker pipeline as
+/predict-all, on a process pool whose workers load the artifacts once. Each
+task is a chunk of reports; a worker extracts them all, then ranks the chunk's
+distinct (disease, specialty) pairs in one batch.
+
+Results are written to <output_dir> as numbered part files (Parquet when
+pyarrow is installed, CSV otherwise), one row per report. A part is written to
+a temporary name and renamed into place, then its reports are appended to
+<output_dir>/checkpoint.txt, so an interrupted run can simply be restarted:
+reports already listed in the checkpoint are skipped. A crash between the
+rename and the checkpoint write leaves the newest part unrecorded, so resuming
+also takes that part's reports as done instead of writing them twice.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import pandas as pd
+
+# Shared helpers (metrics, ...) live one level up in backend/ml/common
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import pyarrow  # noqa: F401  (optional, enables Parquet output)
+except ImportError:
+    pyarrow = None
+
+REPORT_EXTENSIONS = (".pdf", ".txt")
+CHECKPOINT = "checkpoint.txt"
+COLUMNS = ["report", "disease", "confidence", "specialty", "top_hospitals", "error"]
+
+# Per-worker pipeline, created once by _init_worker
+_extractor = None
+_ranker = None
+
+
+def iter_reports(root: str):
+    """Report paths relative to `root`, in a stable (sorted) order."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(REPORT_EXTENSIONS):
+                yield os.path.relpath(os.path.join(dirpath, name), root)
+
+
+def load_checkpoint(out_dir: str) -> set:
+    path = os.path.join(out_dir, CHECKPOINT)
+    if not os.path.exists(path):
+        return set()
+    with open(path, "rb+") as f:
+        content = f.read()
+        # A crash mid-write can leave a torn last line; drop it
+        end = content.rfind(b"\n") + 1
+        if end < len(content):
+            f.truncate(end)
+    lines = content[:end].decode("utf-8").splitlines()
+    return {line for line in lines if line.strip()}
+
+
+def _part_files(out_dir: str) -> list:
+    return sorted(n for n in os.listdir(out_dir) if n.startswith("part-"))
+
+
+def _reports_in_part(out_dir: str, name: str) -> set:
+    path = os.path.join(out_dir, name)
+    if name.endswith(".parquet"):
+        frame = pd.read_parquet(path, columns=["report"])
+    else:
+        frame = pd.read_csv(path, usecols=["report"], dtype=str)
+    return set(frame["report"])
+
+
+def _init_worker():
+    global _extractor, _ranker
+    from disease_extractor import DiseaseExtractor
+    from hospital_ranker import HospitalRanker
+
+    _extractor = DiseaseExtractor()
+    _ranker = HospitalRanker()
+
+
+def _read_report(path: str) -> str:
+    with open(path, "rb") as f:
+        if path.lower().endswith(".pdf"):
+            return _extractor.extract_text_from_pdf(f)
+        return f.read().decode("utf-8", errors="replace")
+
+
+def process_chunk(args) -> list:
+    """Runs one chunk of reports through the pipeline inside a worker."""
+    from disease_mapping import map_disease_to_specialty
+
+    root, reports, top_k = args
+    rows = []
+    for report in reports:
+        row = dict.fromkeys(COLUMNS)
+        row["report"] = report
+        try:
+            text = _read_report(os.path.join(root, report))
+            extraction = _extractor.extract_disease(text)
+            row["disease"] = extraction["disease"]
+            row["confidence"] = extraction["confidence"]
+            row["specialty"] = map_disease_to_specialty(row["disease"])
+        except Exception as e:
+            row["error"] = f"{type(e).__name__}: {e}"
+        rows.append(row)
+
+    ranked = [r for r in rows if r["error"] is None]
+    queries = [(r["disease"], r["specialty"]) for r in ranked]
+    for row, hospitals in zip(ranked, _ranker.rank_many(queries, top_k)):
+        row["top_hospitals"] = json.dumps(hospitals, ensure_ascii=False)
+    return rows
+
+
+def write_part(out_dir: str, part: int, rows: list, fmt: str) -> str:
+    frame = pd.DataFrame(rows, columns=COLUMNS)
+    name = f"part-{part:05d}.{fmt}"
+    tmp = os.path.join(out_dir, f".{name}.tmp")
+    if fmt == "parquet":
+        frame.to_parquet(tmp, index=False)
+    else:
+        frame.to_csv(tmp, index=False)
+    os.replace(tmp, os.path.join(out_dir, name))
+    return name
+
+
+def _commit_part(out_dir: str, part: int, rows: list, fmt: str, checkpoint):
+    """Writes a part file, then records its reports durably in the checkpoint."""
+    write_part(out_dir, part, rows, fmt)
+    checkpoint.writelines(r["report"] + "\n" for r in rows)
+    checkpoint.flush()
+    os.fsync(checkpoint.fileno())
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def run(
+    reports_dir: str,
+    out_dir: str,
+    workers: int,
+    chunk_size: int = 32,
+    part_size: int = 2000,
+    top_k: int = 5,
+    fmt: str = None,
+):
+    fmt = fmt or ("parquet" if pyarrow is not None else "csv")
+    os.makedirs(out_dir, exist_ok=True)
+    done = load_checkpoint(out_dir)
+    parts = _part_files(out_dir)
+    # Parts are checkpointed one at a time, so only the newest can be missing
+    unrecorded = _reports_in_part(out_dir, parts[-1]) - done if parts else set()
+    if unrecorded:
+        with open(os.path.join(out_dir, CHECKPOINT), "a", encoding="utf-8") as f:
+            f.writelines(report + "\n" for report in sorted(unrecorded))
+            f.flush()
+            os.fsync(f.fileno())
+        done |= unrecorded
+    todo = [r for r in iter_reports(reports_dir) if r not in done]
+    part = len(parts)
+    print(f"{len(done)} reports already done, {len(todo)} to process")
+    if not todo:
+        return
+
+    start = time.perf_counter()
+    processed = 0
+    buffer = []
+    tasks = [(reports_dir, chunk, top_k) for chunk in _chunks(todo, chunk_size)]
+    with multiprocessing.Pool(workers, initializer=_init_worker) as pool, open(
+        os.path.join(out_dir, CHECKPOINT), "a", encoding="utf-8"
+    ) as checkpoint:
+        for rows in pool.imap_unordered(process_chunk, tasks):
+            buffer.extend(rows)
+            if len(buffer) < part_size:
+                continue
+            _commit_part(out_dir, part, buffer, fmt, checkpoint)
+            part += 1
+            processed += len(buffer)
+            buffer = []
+            rate = processed / (time.perf_counter() - start)
+            print(f"{processed}/{len(todo)} reports ({rate:.0f}/s)")
+        if buffer:
+            _commit_part(out_dir, part, buffer, fmt, checkpoint)
+            processed += len(buffer)
+    elapsed = time.perf_counter() - start
+    print(f"Processed {processed} reports in {elapsed:.1f}s -> {out_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("reports_dir", help="directory of .pdf/.txt reports")
+    parser.add_argument("--out", required=True, help="output directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=32, help="reports per task")
+    parser.add_argument(
+        "--part-size", type=int, default=2000, help="reports per output part file"
+    )
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--format", choices=["parquet", "csv"], default=None)
+    args = parser.parse_args()
+    run(
+        args.reports_dir,
+        args.out,
+        args.workers,
+        chunk_size=args.chunk_size,
+        part_size=args.part_size,
+        top_k=args.top_k,
+        fmt=args.format,
+    )
+
+
+if __name__ == "__main__":
+    main()
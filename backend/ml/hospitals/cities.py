@@ -0,0 +1,20 @@
+"""City name normalization shared by the city listings and the ranker."""
+
+# City name variations mapping
+CITY_ALIASES = {
+    "bangalore": "bengaluru",
+    "bengaluru": "bengaluru",
+    "bombay": "mumbai",
+    "mumbai": "mumbai",
+    "delhi": "new delhi",
+    "new delhi": "new delhi",
+    "madras": "chennai",
+    "chennai": "chennai",
+    "calcutta": "kolkata",
+    "kolkata": "kolkata",
+}
+
+
+def normalize_city(city: str) -> str:
+    city_lower = str(city).lower().strip()
+    return CITY_ALIASES.get(city_lower, city_lower)
@@ -3,19 +3,25 @@ import io
 import pypdf
 from typing import Optional, Tuple
 from disease_mapping import DISEASE_SPECIALTY_MAP
+from common.metrics import stage_timer
 
 
 class DiseaseExtractor:
     def __init__(self):
         self.known_diseases = list(DISEASE_SPECIALTY_MAP.keys())
 
-    def extract_text_from_pdf(self, file_content: bytes) -> str:
-        pdf_reader = pypdf.PdfReader(io.BytesIO(file_content))
+    @stage_timer("extract_text_from_pdf")
+    def extract_text_from_pdf(self, file_content) -> str:
+        """Text of a PDF given as bytes or a seekable binary file."""
+        if isinstance(file_content, (bytes, bytearray)):
+            file_content = io.BytesIO(file_content)
+        pdf_reader = pypdf.PdfReader(file_content)
         text = ""
         for page in pdf_reader.pages:
             text += page.extract_text() + "\n"
         return text
 
+    @stage_timer("extract_disease")
     def extract_disease(self, text: str) -> dict:
         """
         Extracts disease with a confidence score.
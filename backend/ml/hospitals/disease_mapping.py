@@ -1,4 +1,5 @@
 import difflib
+from common.metrics import stage_timer
 
 DISEASE_SPECIALTY_MAP = {
     # Cardiology
@@ -67,6 +68,7 @@ DISEASE_SPECIALTY_MAP = {
 }
 
 
+@stage_timer("map_disease_to_specialty")
 def map_disease_to_specialty(disease_name: str) -> str:
     """
     Maps a disease name to a specialty using strict match or fuzzy logic.
@@ -1,97 +1,331 @@
+import hashlib
 import pickle
 import os
 import pandas as pd
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 import numpy as np
+from cities import normalize_city
+from common.metrics import Counter, Histogram, stage_timer
+from common.records import RecordTable
+from common.singleflight import SingleFlight
+
+# Score = rating * 50% + review count * 30% + text similarity * 20% by default.
+# Override with e.g. HEALTRIP_HOSPITAL_WEIGHTS="rating=0.6,reviews=0.2,similarity=0.2"
+DEFAULT_WEIGHTS = {"rating": 0.5, "reviews": 0.3, "similarity": 0.2}
+# Candidates scored per step of the threshold walk
+BLOCK_SIZE = 64
+# Rankings precomputed by train_model.py for the known diseases
+RANKINGS_FILE = "hospital_rankings.pkl"
+MATERIALIZED_TOP_N = 20
+
+SCORED_FRACTION = Histogram(
+    "healtrip_hospital_rank_scored_fraction",
+    "Fraction of a specialty's candidates whose similarity was computed.",
+    buckets=(0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0),
+)
+RANKINGS = Counter(
+    "healtrip_hospital_rankings",
+    "Hospital rankings by source (materialized table or live scoring).",
+    ("source",),
+)
+
+
+def weights_from_env() -> dict:
+    weights = dict(DEFAULT_WEIGHTS)
+    for item in filter(None, os.getenv("HEALTRIP_HOSPITAL_WEIGHTS", "").split(",")):
+        name, _, value = item.partition("=")
+        if name.strip() not in weights:
+            raise ValueError(f"Unknown ranking weight: {name}")
+        weights[name.strip()] = float(value)
+    return weights
+
+
+class _Specialty:
+    """
+    A specialty's candidates in descending order of static score (ties by
+    row), plus the per-term maximum of their TF-IDF weights, which bounds the
+    similarity any of them can reach for a given query.
+    """
+
+    __slots__ = ("rows", "static", "max_terms")
+
+    def __init__(self, rows, static, max_terms):
+        self.rows = rows
+        self.static = static
+        self.max_terms = max_terms
 
 
 class HospitalRanker:
-    def __init__(self):
+    def __init__(self, weights: dict = None, load_table: bool = True):
+        """
+        `load_table=False` skips the materialized rankings, e.g. while
+        training builds new ones.
+        """
         base_dir = os.path.dirname(os.path.abspath(__file__))
         models_dir = base_dir  # Artifacts are in root now
+        self.weights = weights or weights_from_env()
 
-        # Load artifacts
+        # Load artifacts. Their content hash ties materialized rankings to them.
+        fingerprint = hashlib.sha256()
         with open(os.path.join(models_dir, "disease_vectorizer.pkl"), "rb") as f:
-            self.vectorizer = pickle.load(f)
+            content = f.read()
+            fingerprint.update(content)
+            self.vectorizer = pickle.loads(content)
 
         with open(os.path.join(models_dir, "hospital_data.pkl"), "rb") as f:
-            self.df, self.tfidf_matrix = pickle.load(f)
+            content = f.read()
+            fingerprint.update(content)
+            df, tfidf_matrix = pickle.loads(content)
+        self.set_data(df, tfidf_matrix)
+        self.fingerprint = fingerprint.hexdigest()
+        self._flights = SingleFlight("top_hospitals")
+        if load_table:
+            self.load_materialized(os.path.join(models_dir, RANKINGS_FILE))
+
+    def set_data(self, df: pd.DataFrame, tfidf_matrix):
+        """Installs a hospital table and its TF-IDF rows (one per df row)."""
+        self.df = df.reset_index(drop=True)
+        self.tfidf_matrix = tfidf_matrix
+        # Response fields per hospital, prepared once instead of per request
+        self.records = RecordTable(
+            self.df,
+            ["Hospital_Group", "Rating_5_Scale", "City", "Review_Summary"],
+            # Using Hospital_Group as Name based on CSV structure
+            keys=["name", "rating", "city", "summary"],
+        )
+        self.city_keys = self.df["City"].map(normalize_city).to_numpy(dtype=object)
+        self.specialties = self._index_specialties()
+        # Rankings computed for other data no longer apply
+        self.fingerprint = None
+        self.materialized = {}
+        self.materialized_top_n = 0
 
-    def get_top_hospitals(self, disease: str, specialty: str, top_k: int = 5) -> list:
+    def _index_specialties(self) -> dict:
+        """
+        Static part of the score, per specialty: rating (out of 5) and review
+        count (vs the global max).
+        """
+        rating_score = self.df["Rating_5_Scale"].to_numpy(dtype=float) / 5.0
+        # Global max keeps the scale consistent; avoid division by zero
+        max_reviews = self.df["Review_Count"].max()
+        if max_reviews == 0:
+            max_reviews = 1
+        review_score = self.df["Review_Count"].to_numpy() / max_reviews
+        static = (self.weights["rating"] * rating_score) + (
+            self.weights["reviews"] * review_score
+        )
+        unit_rows = normalize(self.tfidf_matrix)
+
+        specialties = {}
+        keys = self.df["Specialty"].astype(str).str.lower()
+        for specialty, rows in keys.groupby(keys, sort=False).indices.items():
+            rows = np.sort(rows)
+            order = rows[np.argsort(-static[rows], kind="stable")]
+            specialties[specialty] = _Specialty(
+                order, static[order], unit_rows[order].max(axis=0).T.tocsr()
+            )
+        return specialties
+
+    def _table_key(self, disease: str, specialty: str, city: str = None) -> tuple:
+        # The vectorizer lowercases, so diseases differing in case rank alike
+        if getattr(self.vectorizer, "lowercase", False):
+            disease = disease.lower()
+        return (disease, specialty.lower(), normalize_city(city) if city else None)
+
+    def materialize(self, queries, top_n: int = MATERIALIZED_TOP_N) -> dict:
+        """
+        Top `top_n` rankings for (disease, specialty) pairs, overall and for
+        every city with candidates in the specialty, as saved by train_model.py.
+        """
+        rankings = {}
+        for disease, specialty in queries:
+            candidates = self.specialties.get(specialty.lower())
+            if candidates is None:
+                continue
+            cities = [None] + sorted(set(self.city_keys[candidates.rows]))
+            for city in cities:
+                rows, scores = self._rank_rows(disease, specialty, top_n, city=city)
+                key = self._table_key(disease, specialty, city)
+                rankings[key] = (rows.tolist(), scores.tolist())
+        return {
+            "fingerprint": self.fingerprint,
+            "weights": self.weights,
+            "top_n": top_n,
+            "rankings": rankings,
+        }
+
+    def load_materialized(self, path: str):
+        """Serves the rankings in `path` if they were built for these artifacts."""
+        if not os.path.exists(path):
+            print(f"No materialized rankings at {path}; ranking live")
+            return
+        with open(path, "rb") as f:
+            table = pickle.load(f)
+        if table["fingerprint"] != self.fingerprint or table["weights"] != self.weights:
+            print("Materialized rankings do not match the artifacts/weights; ignored")
+            return
+        self.materialized = {
+            key: self._records(np.asarray(rows, dtype=np.intp), np.asarray(scores))
+            for key, (rows, scores) in table["rankings"].items()
+        }
+        self.materialized_top_n = table["top_n"]
+        print(f"Loaded {len(self.materialized)} materialized rankings")
+
+    def _lookup(self, disease: str, specialty: str, top_k: int, city: str = None):
+        if top_k > self.materialized_top_n:
+            return None
+        ranking = self.materialized.get(self._table_key(disease, specialty, city))
+        if ranking is None:
+            return None
+        RANKINGS.labels("table").inc()
+        return ranking[:top_k]
+
+    def get_top_hospitals(
+        self, disease: str, specialty: str, top_k: int = 5, city: str = None
+    ) -> list:
+        """
+        Known diseases are served from the materialized table; anything else
+        is ranked live. `city` restricts the ranking to one city.
+        """
+        ranking = self._lookup(disease, specialty, top_k, city)
+        if ranking is not None:
+            return ranking
+        RANKINGS.labels("live").inc()
+        # Identical concurrent rankings (e.g. a popular disease) run only once
+        return self._flights.do(
+            (disease, specialty, top_k, city),
+            self._rank,
+            disease,
+            specialty,
+            top_k,
+            city=city,
+        )
+
+    def _best(self, rows, scores, top_k: int):
+        """Best `top_k` rows and scores; equal scores keep table order."""
+        with stage_timer("sort_values"):
+            best = np.lexsort((rows, -scores))[:top_k]
+        return rows[best], scores[best]
+
+    def _records(self, rows, scores) -> list:
+        match_scores = [round(x, 2) for x in scores.tolist()]
+        return self.records.take(rows, match_score=match_scores)
+
+    def _top(self, rows, scores, top_k: int) -> list:
+        return self._records(*self._best(rows, scores, top_k))
+
+    def _rank(
+        self,
+        disease: str,
+        specialty: str,
+        top_k: int,
+        exhaustive: bool = False,
+        city: str = None,
+    ) -> list:
+        return self._records(
+            *self._rank_rows(disease, specialty, top_k, exhaustive, city)
+        )
+
+    def _rank_rows(
+        self,
+        disease: str,
+        specialty: str,
+        top_k: int,
+        exhaustive: bool = False,
+        city: str = None,
+    ):
         """
         Rank hospitals based on:
         - Filter by Specialty
         - 50% Rating
         - 30% Review Count
         - 20% Text Similarity (Disease vs Summary)
-        """
-        # 1. Filter by Specialty
-        specialty_mask = self.df["Specialty"].str.lower() == specialty.lower()
-
-        # If no hospitals found for strict specialty, fall back to all (or deal with it differently)
-        # For now, if no match, we return empty list
-        if not specialty_mask.any():
-            return []
-
-        # Indices of the filtered hospitals
-        candidate_indices = self.df.index[specialty_mask].tolist()
-        candidate_df = self.df.loc[candidate_indices].copy()
-
-        # 2. Calculate Component Scores
-
-        # A. Rating Score (Normalized 0-1) - Max is 5
-        # Ensure it's numeric
-        ratings = candidate_df["Rating_5_Scale"].values
-        rating_score = ratings / 5.0
-
-        # B. Review Count Score (Normalized 0-1)
-        reviews = candidate_df["Review_Count"].values
-        # Avoid division by zero
-        max_reviews = self.df[
-            "Review_Count"
-        ].max()  # Global max to keep scale consistent
-        if max_reviews == 0:
-            max_reviews = 1
-        review_score = reviews / max_reviews
 
-        # C. Text Similarity Score
-        # Vectorize input disease
-        disease_vec = self.vectorizer.transform([disease])
+        Threshold algorithm: candidates are visited in descending static score
+        and their similarity is computed block by block. Once the k-th best
+        score so far beats the best any unvisited candidate could reach (its
+        static score plus the similarity bound), the rest is skipped. The
+        result is the same as scoring every candidate (`exhaustive=True`).
+        """
+        no_result = np.empty(0, dtype=np.intp), np.empty(0)
+        candidates = self.specialties.get(specialty.lower())
+        # If no hospitals found for strict specialty we return an empty list
+        if candidates is None or top_k <= 0:
+            return no_result
+        order, static = candidates.rows, candidates.static
+        if city:
+            in_city = self.city_keys[order] == normalize_city(city)
+            order, static = order[in_city], static[in_city]
+            if not len(order):
+                return no_result
 
-        # Get similarities for specific candidates only
-        # We need to slice the global tfidf_matrix
-        candidate_tfidf = self.tfidf_matrix[candidate_indices]
+        with stage_timer("vectorizer_transform"):
+            disease_vec = self.vectorizer.transform([disease])
+        weight = self.weights["similarity"]
+        # Upper bound of the cosine similarity to any candidate; the margin
+        # absorbs rounding differences against cosine_similarity
+        unit_query = normalize(disease_vec)
+        bound = min(1.0, unit_query.dot(candidates.max_terms)[0, 0]) + 1e-9
+        best_unseen = static + weight * bound
 
-        # Calculate cosine similarity (returns shape [1, n_candidates])
-        # Flatten to 1D array
-        similarity_score = cosine_similarity(disease_vec, candidate_tfidf).flatten()
+        total = len(order)
+        scores = np.empty(total)
+        scored = 0
+        with stage_timer("cosine_similarity"):
+            while scored < total:
+                end = min(total, scored + max(BLOCK_SIZE, top_k))
+                rows = order[scored:end]
+                similarity = cosine_similarity(
+                    disease_vec, self.tfidf_matrix[rows]
+                ).ravel()
+                scores[scored:end] = static[scored:end] + (weight * similarity)
+                scored = end
+                if exhaustive or scored == total:
+                    continue
+                kth = np.partition(scores[:scored], scored - top_k)[scored - top_k]
+                if kth > best_unseen[scored]:
+                    break
+        SCORED_FRACTION.observe(scored / total)
+        return self._best(order[:scored], scores[:scored], top_k)
 
-        # 3. Weighted Sum
-        # 50% Rating + 30% Reviews + 20% Similarity
-        final_scores = (
-            (0.5 * rating_score) + (0.3 * review_score) + (0.2 * similarity_score)
-        )
+    def rank_many(self, queries, top_k: int = 5) -> list:
+        """
+        Batch form of get_top_hospitals for a list of (disease, specialty)
+        pairs, with the same result per pair. Each distinct pair is ranked
+        once; diseases are vectorized in one call and scored against each
+        specialty's candidates as one matrix product.
+        """
+        ranked = {}
+        unique = []
+        for query in dict.fromkeys(queries):
+            ranking = self._lookup(*query, top_k)
+            if ranking is None:
+                unique.append(query)
+            else:
+                ranked[query] = ranking
+        if not unique:
+            return [ranked[query] for query in queries]
+        RANKINGS.labels("live").inc(len(unique))
+        with stage_timer("vectorizer_transform"):
+            vectors = self.vectorizer.transform([disease for disease, _ in unique])
 
-        # Add score to candidate df for sorting
-        candidate_df["Final_Score"] = final_scores
-
-        # 4. Sort and Return
-        top_hospitals_df = candidate_df.sort_values(
-            by="Final_Score", ascending=False
-        ).head(top_k)
-
-        results = []
-        for _, row in top_hospitals_df.iterrows():
-            results.append(
-                {
-                    "name": row[
-                        "Hospital_Group"
-                    ],  # Using Hospital_Group as Name based on CSV structure
-                    "rating": row["Rating_5_Scale"],
-                    "city": row["City"],
-                    "summary": row["Review_Summary"],
-                    "match_score": round(row["Final_Score"], 2),
-                }
-            )
+        by_specialty = {}
+        for i, (_, specialty) in enumerate(unique):
+            by_specialty.setdefault(specialty.lower(), []).append(i)
 
-        return results
+        weight = self.weights["similarity"]
+        for specialty, positions in by_specialty.items():
+            candidates = self.specialties.get(specialty)
+            if candidates is None or top_k <= 0:
+                for i in positions:
+                    ranked[unique[i]] = []
+                continue
+            with stage_timer("cosine_similarity"):
+                similarity = cosine_similarity(
+                    vectors[positions], self.tfidf_matrix[candidates.rows]
+                )
+            for row, i in enumerate(positions):
+                scores = candidates.static + (weight * similarity[row])
+                ranked[unique[i]] = self._top(candidates.rows, scores, top_k)
+        return [ranked[query] for query in queries]
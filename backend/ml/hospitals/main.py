@@ -1,13 +1,29 @@
+import json
+import os
+import sys
+
+# Shared helpers (metrics, ...) live one level up in backend/ml/common
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.jobs import JobQueue, QueueFull
+from common.metrics import install_metrics
+from common.responses import FastJSONResponse, StaticJSON
+from common.result_cache import ResultCache, artifact_version, content_key
+from common.serving import serve
+from common.uploads import check_content_type, install_upload_limits
+from cities import normalize_city
 from disease_extractor import DiseaseExtractor
 from disease_mapping import map_disease_to_specialty
 from hospital_ranker import HospitalRanker
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List
-import uvicorn
+from typing import BinaryIO, List, Optional, Tuple, Union
 
 app = FastAPI(title="Medical Disease Extraction & Hospital Ranking")
+install_upload_limits(app, ["/extract-disease", "/predict-all", "/jobs/predict-all"])
 
 # Add CORS middleware
 app.add_middleware(
@@ -17,10 +33,67 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+install_metrics(app, "hospitals")
+
+
+def build_city_listings(df) -> dict:
+    """Pre-renders the top-20 hospitals by rating for every known city."""
+    listings = {}
+    if df is None:
+        return listings
+
+    normalized = df["City"].map(normalize_city)
+    for city, city_hospitals in df.groupby(normalized, sort=False):
+        city_hospitals = city_hospitals.sort_values("Rating_5_Scale", ascending=False)
+
+        results = []
+        for _, row in city_hospitals.head(20).iterrows():
+            # Safely get hospital name (try different possible column names)
+            name = row.get(
+                "Hospital_Group",
+                row.get("Hospital_Name", row.get("Name", "Unknown Hospital")),
+            )
+
+            results.append(
+                {
+                    "name": str(name),
+                    "rating": float(row["Rating_5_Scale"]),
+                    "city": str(row["City"]),
+                    "summary": str(row.get("Review_Summary", "")),
+                    "match_score": float(row["Rating_5_Scale"]) / 5.0,
+                }
+            )
+        listings[city] = StaticJSON(results)
+    return listings
+
 
 # Initialize services
 extractor = DiseaseExtractor()
 ranker = HospitalRanker()
+city_listings = build_city_listings(getattr(ranker, "df", None))
+EMPTY_LISTING = StaticJSON([])
+
+# Results per uploaded document, shared by all workers and kept across restarts.
+# The version covers the ranking artifacts, code and weights and the disease
+# dictionary.
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+result_cache = ResultCache.for_service(
+    SERVICE_DIR,
+    "reports",
+    artifact_version(
+        (
+            os.path.join(SERVICE_DIR, name)
+            for name in (
+                "disease_vectorizer.pkl",
+                "hospital_data.pkl",
+                "disease_extractor.py",
+                "disease_mapping.py",
+                "hospital_ranker.py",
+            )
+        ),
+        extra=json.dumps(ranker.weights, sort_keys=True),
+    ),
+)
 
 
 @app.get("/health")
@@ -49,146 +122,196 @@ class FullPredictionResponse(BaseModel):
     top_hospitals: List[HospitalResponse]
 
 
-@app.post("/extract-disease")
-async def extract_disease_endpoint(
-    text: Optional[str] = Form(None), file: Optional[UploadFile] = File(None)
-):
+REPORT_TYPES = ("application/pdf", "text/*", "application/octet-stream")
+
+
+async def read_report(
+    text: Optional[str], file: Optional[UploadFile]
+) -> Tuple[str, Union[bytes, BinaryIO]]:
+    """The submitted report as ("pdf" | "text", bytes or binary file)."""
     if not text and not file:
         raise HTTPException(
             status_code=400, detail="Either text or file must be provided"
         )
 
-    extracted_text = ""
     if file:
-        content = await file.read()
+        check_content_type(file, REPORT_TYPES)
         if file.content_type == "application/pdf":
+            # Parsed straight from Starlette's spooled temp file, not a copy
+            return "pdf", file.file
+        return "text", await file.read()
+    return "text", text.encode("utf-8")
+
+
+def analyze_document(kind: str, content, rank: bool) -> dict:
+    """
+    Extracted text, disease, confidence, specialty and (when `rank` is set)
+    top hospitals for a report. Results are cached by a hash of the submitted
+    bytes, so a repeated upload skips PDF parsing and extraction. Blocking
+    (parsing and the cache's disk I/O): async callers use run_in_threadpool.
+    """
+    key = content_key(kind, content)
+
+    result = result_cache.get(key)
+    if result is None:
+        if kind == "pdf":
             extracted_text = extractor.extract_text_from_pdf(content)
         else:
-            # Fallback for plain text files
+            # Plain text form field or text file
+            if not isinstance(content, bytes):
+                content = content.read()
             extracted_text = content.decode("utf-8")
-    else:
-        extracted_text = text
-
-    result = extractor.extract_disease(extracted_text)
-    # Add specialty info to response for completeness
-    specialty = map_disease_to_specialty(result["disease"])
-    result["specialty"] = specialty
+        extraction = extractor.extract_disease(extracted_text)
+        result = {
+            "text": extracted_text,
+            "disease": extraction["disease"],
+            "confidence": extraction["confidence"],
+            "specialty": map_disease_to_specialty(extraction["disease"]),
+            "top_hospitals": None,
+        }
+    elif not rank or result["top_hospitals"] is not None:
+        return result
 
+    # Ranking is filled in on the first /predict-all for a document
+    if rank:
+        result["top_hospitals"] = ranker.get_top_hospitals(
+            result["disease"], result["specialty"]
+        )
+    result_cache.put(key, result)
     return result
 
 
+async def analyze_report(
+    text: Optional[str], file: Optional[UploadFile], rank: bool
+) -> dict:
+    kind, content = await read_report(text, file)
+    # PDF parsing, hashing and the result cache block; keep them off the loop
+    return await run_in_threadpool(analyze_document, kind, content, rank)
+
+
+def prediction(result: dict) -> dict:
+    """The /predict-all response body for an analyze_document result."""
+    return {
+        "disease": result["disease"],
+        "specialty": result["specialty"],
+        "top_hospitals": result["top_hospitals"],
+    }
+
+
+@app.post("/extract-disease")
+async def extract_disease_endpoint(
+    text: Optional[str] = Form(None), file: Optional[UploadFile] = File(None)
+):
+    result = await analyze_report(text, file, rank=False)
+    return {
+        "disease": result["disease"],
+        "confidence": result["confidence"],
+        "specialty": result["specialty"],
+    }
+
+
 @app.get("/top-hospitals", response_model=List[HospitalResponse])
-def get_top_hospitals_endpoint(disease: str):
+def get_top_hospitals_endpoint(disease: str, city: Optional[str] = None):
     specialty = map_disease_to_specialty(disease)
-    top_hospitals = ranker.get_top_hospitals(disease, specialty)
-    return top_hospitals
+    top_hospitals = ranker.get_top_hospitals(disease, specialty, city=city)
+    # Ranker output is built from trusted artifacts; skip response validation
+    return FastJSONResponse(top_hospitals)
 
 
 @app.post("/predict-all", response_model=FullPredictionResponse)
 async def predict_all_endpoint(
-    text: Optional[str] = Form(None), file: Optional[UploadFile] = File(None)
+    text: Optional[str] = Form(None),
+    file: Optional[UploadFile] = File(None),
+    city: Optional[str] = Form(None),
 ):
-    # 1. Extract
-    if not text and not file:
-        raise HTTPException(
-            status_code=400, detail="Either text or file must be provided"
+    # Extract, map and rank (or reuse the cached result for this document)
+    result = await analyze_report(text, file, rank=not city)
+    if city:
+        # The cache holds the overall ranking; city rankings are table lookups
+        top_hospitals = await run_in_threadpool(
+            ranker.get_top_hospitals, result["disease"], result["specialty"], city=city
         )
+        result = dict(result, top_hospitals=top_hospitals)
+    return FastJSONResponse(prediction(result))
 
-    extracted_text = ""
-    if file:
-        content = await file.read()
-        if file.content_type == "application/pdf":
-            extracted_text = extractor.extract_text_from_pdf(content)
-        else:
-            extracted_text = content.decode("utf-8")
-    else:
-        extracted_text = text
 
-    extraction_result = extractor.extract_disease(extracted_text)
-    disease = extraction_result["disease"]
+# Asynchronous variant of /predict-all for large reports: submit, then poll
+# /jobs/{id} or follow /jobs/{id}/events until the job is done.
 
-    # 2. Map
-    specialty = map_disease_to_specialty(disease)
 
-    # 3. Rank
-    hospitals = ranker.get_top_hospitals(disease, specialty)
+def run_prediction_job(kind: str, path: str) -> dict:
+    with open(path, "rb") as f:
+        return prediction(analyze_document(kind, f, rank=True))
 
-    return FullPredictionResponse(
-        disease=disease, specialty=specialty, top_hospitals=hospitals
-    )
 
+prediction_jobs = JobQueue.for_service(SERVICE_DIR, "predict_all", run_prediction_job)
 
-@app.get("/hospitals-by-city", response_model=List[HospitalResponse])
-def get_hospitals_by_city(city: str = Query(..., description="City name")):
-    """Get all hospitals in a specific city"""
-    try:
-        # City name variations mapping
-        city_aliases = {
-            "bangalore": "bengaluru",
-            "bengaluru": "bengaluru",
-            "bombay": "mumbai",
-            "mumbai": "mumbai",
-            "delhi": "new delhi",
-            "new delhi": "new delhi",
-            "madras": "chennai",
-            "chennai": "chennai",
-            "calcutta": "kolkata",
-            "kolkata": "kolkata",
-        }
 
-        # Normalize city name
-        city_lower = city.lower().strip()
-        normalized_city = city_aliases.get(city_lower, city_lower)
+@app.on_event("startup")
+def start_jobs():
+    prediction_jobs.start()
+
 
-        # Check if ranker has data
-        if not hasattr(ranker, "df") or ranker.df is None:
-            return []
+@app.on_event("shutdown")
+def stop_jobs():
+    prediction_jobs.stop()
 
-        # Filter hospitals by normalized city name
-        city_mask = (
-            ranker.df["City"]
-            .str.lower()
-            .str.strip()
-            .apply(lambda x: city_aliases.get(x, x) == normalized_city)
+
+@app.post("/jobs/predict-all", status_code=202)
+async def submit_prediction_job(
+    text: Optional[str] = Form(None), file: Optional[UploadFile] = File(None)
+):
+    kind, content = await read_report(text, file)
+    try:
+        job_id = await run_in_threadpool(prediction_jobs.submit, kind, content)
+    except QueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many queued jobs, retry later",
+            headers={"Retry-After": "5"},
         )
-        city_hospitals = ranker.df[city_mask].copy()
+    return {
+        "id": job_id,
+        "status": "queued",
+        "status_url": f"/jobs/{job_id}",
+        "events_url": f"/jobs/{job_id}/events",
+    }
 
-        if city_hospitals.empty:
-            # Return empty if no match
-            return []
 
-        # Sort by rating
-        city_hospitals = city_hospitals.sort_values("Rating_5_Scale", ascending=False)
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Job status; `result` holds the /predict-all response once done."""
+    job = prediction_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return FastJSONResponse(job)
 
-        # Build results
-        results = []
-        for _, row in city_hospitals.head(20).iterrows():
-            # Safely get hospital name (try different possible column names)
-            name = row.get(
-                "Hospital_Group",
-                row.get("Hospital_Name", row.get("Name", "Unknown Hospital")),
-            )
 
-            results.append(
-                {
-                    "name": str(name),
-                    "rating": float(row["Rating_5_Scale"]),
-                    "city": str(row["City"]),
-                    "summary": str(row.get("Review_Summary", "")),
-                    "match_score": float(row["Rating_5_Scale"]) / 5.0,
-                }
-            )
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-Sent Events: one event per status change, ending when finished."""
+    if await run_in_threadpool(prediction_jobs.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
 
-        return results
+    async def stream():
+        async for job in prediction_jobs.events(job_id):
+            yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    except Exception as e:
-        print(f"ERROR in hospitals-by-city: {e}")
-        import traceback
 
-        traceback.print_exc()
-        # Return empty on error
-        return []
+@app.get("/hospitals-by-city", response_model=List[HospitalResponse])
+def get_hospitals_by_city(
+    request: Request, city: str = Query(..., description="City name")
+):
+    """Get all hospitals in a specific city"""
+    listing = city_listings.get(normalize_city(city), EMPTY_LISTING)
+    return listing.response(request)
 
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8001, reload=True)
+    serve("main:app", "hospitals", port=8001, reload=True)
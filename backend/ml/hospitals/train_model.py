@@ -1,9 +1,14 @@
+import argparse
 import pandas as pd
 import pickle
 import os
+import sys
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 
+# Shared helpers (metrics, ...) live one level up in backend/ml/common
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 # Paths
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -11,9 +16,9 @@ DATA_PATH = os.path.join(BASE_DIR, "data", "hospitals_1000.csv")
 MODELS_DIR = BASE_DIR
 
 
-def train_and_save():
-    print("Loading data...")
-    df = pd.read_csv(DATA_PATH)
+def train_and_save(data_path=DATA_PATH):
+    print(f"Loading data from {data_path}...")
+    df = pd.read_csv(data_path)
 
     # 1. Data Cleaning
     print("Cleaning data...")
@@ -54,8 +59,33 @@ def train_and_save():
         # Saving tuple of dataframe and the massive matrix
         pickle.dump((df, tfidf_matrix), f)
 
+    materialize_rankings()
     print("Training complete.")
 
 
+def materialize_rankings():
+    """
+    Precomputes the top hospitals (overall and per city) for every disease in
+    DISEASE_SPECIALTY_MAP, so the ranker serves them from a table. Extraction
+    returns these diseases title-cased; the table is case-insensitive.
+    """
+    from disease_mapping import DISEASE_SPECIALTY_MAP, map_disease_to_specialty
+    from hospital_ranker import RANKINGS_FILE, HospitalRanker
+
+    print("Materializing rankings for known diseases...")
+    # The existing table belongs to the previous artifacts; rank live
+    ranker = HospitalRanker(load_table=False)
+    queries = [
+        (disease, map_disease_to_specialty(disease))
+        for disease in DISEASE_SPECIALTY_MAP
+    ]
+    table = ranker.materialize(queries)
+    with open(os.path.join(MODELS_DIR, RANKINGS_FILE), "wb") as f:
+        pickle.dump(table, f)
+    print(f"Saved {len(table['rankings'])} rankings for {len(queries)} diseases")
+
+
 if __name__ == "__main__":
-    train_and_save()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default=DATA_PATH, help="hospitals CSV to train on")
+    train_and_save(parser.parse_args().data)
@@ -0,0 +1,142 @@
+"""
+Hotel amenities as a fixed vocabulary and per-hotel bitmasks.
+
+The raw `Feature_1..Feature_9` labels ("Free Wi-Fi", "Wi-Fi", "Paid parking",
+...) are mapped onto one bit per amenity, so a hotel's amenities are a single
+uint64 and a hard requirement such as "pool and spa" is one vectorized AND:
+
+    (masks & required) == required
+
+Labels outside the vocabulary (star classes, bedroom counts, negations such
+as "No elevator") set no bit.
+"""
+
+import re
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+# Bit i is AMENITIES[i]; append only, the order is stored in the masks
+AMENITIES = (
+    "wifi",
+    "air_conditioning",
+    "restaurant",
+    "parking",
+    "free_parking",
+    "breakfast",
+    "free_breakfast",
+    "room_service",
+    "pool",
+    "laundry",
+    "fitness_center",
+    "kitchen",
+    "spa",
+    "airport_shuttle",
+    "bar",
+    "kid_friendly",
+    "pet_friendly",
+    "hot_tub",
+    "accessible",
+    "fireplace",
+    "smoke_free",
+    "beach_access",
+    "cable_tv",
+    "business_center",
+    "elevator",
+    "crib",
+    "golf",
+    "balcony",
+    "heating",
+)
+BITS = {name: i for i, name in enumerate(AMENITIES)}
+
+# Normalized raw label -> amenities it provides
+LABELS = {
+    "free wifi": ("wifi",),
+    "wifi": ("wifi",),
+    "air conditioning": ("air_conditioning",),
+    "restaurant": ("restaurant",),
+    "free parking": ("parking", "free_parking"),
+    "paid parking": ("parking",),
+    "free breakfast": ("breakfast", "free_breakfast"),
+    "breakfast": ("breakfast",),
+    "room service": ("room_service",),
+    "pool": ("pool",),
+    "fullservice laundry": ("laundry",),
+    "fitness center": ("fitness_center",),
+    "kitchen": ("kitchen",),
+    "spa": ("spa",),
+    "airport shuttle": ("airport_shuttle",),
+    "bar": ("bar",),
+    "kidfriendly": ("kid_friendly",),
+    "petfriendly": ("pet_friendly",),
+    "hot tub": ("hot_tub",),
+    "accessible": ("accessible",),
+    "wheelchair accessible": ("accessible",),
+    "fireplace": ("fireplace",),
+    "smokefree": ("smoke_free",),
+    "beach access": ("beach_access",),
+    "cable tv": ("cable_tv",),
+    "business center": ("business_center",),
+    "elevator": ("elevator",),
+    "crib": ("crib",),
+    "golf": ("golf",),
+    "balcony": ("balcony",),
+    "heating": ("heating",),
+}
+
+
+def normalize_label(label) -> str:
+    return re.sub(r"[^a-z0-9 ]", "", str(label).lower()).strip()
+
+
+def _mask_of(names: Iterable[str]) -> int:
+    mask = 0
+    for name in names:
+        mask |= 1 << BITS[name]
+    return mask
+
+
+LABEL_MASKS = {label: _mask_of(names) for label, names in LABELS.items()}
+
+
+def amenity_masks(df: pd.DataFrame, columns=None) -> np.ndarray:
+    """uint64 amenity mask per row, from the raw feature columns."""
+    columns = columns or [f"Feature_{i}" for i in range(1, 10)]
+    masks = np.zeros(len(df), dtype=np.uint64)
+    for col in columns:
+        if col not in df:
+            continue
+        values = df[col].dropna()
+        # Map the distinct labels once, then broadcast to the rows
+        labels = values.astype(str).map(normalize_label)
+        bits = labels.map(LABEL_MASKS).dropna()
+        rows = df.index.get_indexer(bits.index)
+        masks[rows] |= bits.to_numpy(dtype=np.uint64)
+    return masks
+
+
+def required_mask(names: Iterable[str]) -> int:
+    """
+    Mask for amenity names such as "pool" or "Free Wi-Fi" (vocabulary names
+    or raw labels). Raises ValueError naming the unknown ones.
+    """
+    mask, unknown = 0, []
+    for name in names:
+        key = re.sub(r"[\s-]+", "_", str(name).strip().lower())
+        if key in BITS:
+            mask |= 1 << BITS[key]
+        elif normalize_label(name) in LABEL_MASKS:
+            mask |= LABEL_MASKS[normalize_label(name)]
+        else:
+            unknown.append(name)
+    if unknown:
+        raise ValueError(f"Unknown amenities: {', '.join(unknown)}")
+    return mask
+
+
+def has_all(masks: np.ndarray, required: int) -> np.ndarray:
+    """Boolean array: which masks contain every bit of `required`."""
+    required = np.uint64(required)
+    return (masks & required) == required
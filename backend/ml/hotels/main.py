@@ -1,12 +1,27 @@
 from fastapi import FastAPI, HTTPException, Query
+from typing import List
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import joblib
 import pandas as pd
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
-import uvicorn
 import os
+import sys
+
+# Shared helpers (metrics, ...) live one level up in backend/ml/common
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.batching import MicroBatcher
+from common.encoding import LabelMap, load_label_maps
+from common.metrics import install_metrics, stage_timer
+from common.price_table import PRICE_PREDICTIONS, PriceTable
+from common.records import RecordTable
+from common.responses import FastJSONResponse
+from common.serving import serve
+from common.singleflight import single_flight
+from amenities import AMENITIES, amenity_masks, has_all, required_mask
+from neighbors import NeighborTable
 
 app = FastAPI(title="HealTrip ML Service", version="1.0")
 
@@ -17,23 +32,73 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+install_metrics(app, "hotels")
+
+
+def load_amenity_masks(df: pd.DataFrame) -> np.ndarray:
+    """Masks saved by train_model.py, or derived from the features if absent/stale."""
+    path = os.path.join(MODEL_DIR, "amenity_masks.pkl")
+    if os.path.exists(path):
+        saved = joblib.load(path)
+        if saved["amenities"] == AMENITIES and len(saved["masks"]) == len(df):
+            return saved["masks"]
+    return amenity_masks(df)
+
+
+def load_neighbors(df: pd.DataFrame, tfidf_matrix) -> NeighborTable:
+    """Similar-hotel lists saved by train_model.py (scored live if absent/stale)."""
+    path = os.path.join(MODEL_DIR, "hotel_neighbors.pkl")
+    return NeighborTable(
+        tfidf_matrix,
+        df["Hotel_Rating"].to_numpy(),
+        df["Hotel_Price"].to_numpy(),
+        joblib.load(path) if os.path.exists(path) else None,
+    )
+
 
 # Load Artifacts
 print("Loading ML Artifacts...")
 MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
 
 try:
-    rf_model = joblib.load(os.path.join(MODEL_DIR, "hotel_price_model.pkl"))
-    le = joblib.load(os.path.join(MODEL_DIR, "location_encoder.pkl"))
+    # The lookup table answers like the forest, which is then not loaded at all
+    price_table = PriceTable.load(
+        os.path.join(MODEL_DIR, "hotel_price_table.pkl"),
+        os.path.join(MODEL_DIR, "hotel_price_model.pkl"),
+    )
+    price_model = price_table or joblib.load(
+        os.path.join(MODEL_DIR, "hotel_price_model.pkl")
+    )
+    label_maps_path = os.path.join(MODEL_DIR, "location_label_maps.json")
+    if os.path.exists(label_maps_path):
+        city_codes = load_label_maps(label_maps_path)["city"]
+    else:
+        # Artifacts trained before label maps were exported only have the encoder
+        city_codes = LabelMap.from_encoder(
+            "city", joblib.load(os.path.join(MODEL_DIR, "location_encoder.pkl"))
+        )
     tfidf = joblib.load(os.path.join(MODEL_DIR, "tfidf_vectorizer.pkl"))
     tfidf_matrix = joblib.load(os.path.join(MODEL_DIR, "tfidf_matrix.pkl"))
     df = joblib.load(os.path.join(MODEL_DIR, "hotel_data_processed.pkl"))
+    # JSON-ready rows (missing values as "") so responses skip pandas
+    records = RecordTable(df, na="")
+    amenity_bits = load_amenity_masks(df)
+    neighbor_table = load_neighbors(df, tfidf_matrix)
     print("Artifacts loaded successfully.")
 except Exception as e:
     print(f"Error loading artifacts: {e}")
     print("Ensure you ran train_model.py first!")
 
 
+def predict_prices(rows) -> np.ndarray:
+    with stage_timer("predict"):
+        return price_model.predict(np.array(rows))
+
+
+# Forest predicts from concurrent requests run as one call
+price_batcher = MicroBatcher("hotels_price", predict_prices)
+
+
 # Request Models
 class PricePredictionRequest(BaseModel):
     hotel_rating: float
@@ -52,10 +117,32 @@ def recommend_hotels(
     budget: float = Query(None, description="Max budget per night"),
     stars: float = Query(None, description="Minimum star rating"),
     query: str = Query(None, description="Free text query e.g. 'pool and spa'"),
+    must_have: List[str] = Query(
+        None, description="Required amenities, e.g. must_have=pool,spa (see /amenities)"
+    ),
 ):
     """
     Recommend hotels based on location, filters, and content similarity.
     """
+    required = 0
+    if must_have:
+        names = [name for value in must_have for name in value.split(",") if name]
+        try:
+            required = required_mask(names)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(_recommend_hotels(location, budget, stars, query, required))
+
+
+@app.get("/amenities")
+def list_amenities():
+    """Amenity names accepted by `must_have`."""
+    return {"amenities": list(AMENITIES)}
+
+
+# Identical concurrent queries (e.g. a campaign for one city) share one computation
+@single_flight("hotels_recommend")
+def _recommend_hotels(location: str, budget, stars, query, required: int = 0) -> dict:
     # City name normalization mapping
     city_mapping = {
         "bangalore": "bengaluru",
@@ -102,7 +189,10 @@ def recommend_hotels(
     if filtered_df.empty:
         return {"count": 0, "results": [], "message": f"No hotels found in {location}"}
 
-    # 2. Apply Budget & Star Filters
+    # 2. Apply Amenity, Budget & Star Filters
+    if required:
+        # One bitwise AND per hotel, before any similarity is computed
+        filtered_df = filtered_df[has_all(amenity_bits[filtered_df.index], required)]
     if budget:
         filtered_df = filtered_df[filtered_df["Hotel_Price"] <= budget]
     if stars:
@@ -112,13 +202,18 @@ def recommend_hotels(
         return {
             "count": 0,
             "results": [],
-            "message": "No hotels match your budget/star criteria.",
+            "message": (
+                "No hotels match your budget/star/amenity criteria."
+                if required
+                else "No hotels match your budget/star criteria."
+            ),
         }
 
     # 3. Content-Based Sorting (if query provided)
     if query:
         # Transform query to vector
-        query_vec = tfidf.transform([query + " " + normalized_location])
+        with stage_timer("vectorizer_transform"):
+            query_vec = tfidf.transform([query + " " + normalized_location])
 
         # Calculate similarity ONLY for the filtered subset
         # We need to rely on original indices to map back to tfidf_matrix
@@ -131,41 +226,74 @@ def recommend_hotels(
         # Slicing sparse matrix:
         subset_tfidf = tfidf_matrix[subset_indices]
 
-        cosine_sim = cosine_similarity(query_vec, subset_tfidf).flatten()
+        with stage_timer("cosine_similarity"):
+            cosine_sim = cosine_similarity(query_vec, subset_tfidf).flatten()
         filtered_df["similarity"] = cosine_sim
 
         # Sort by similarity
-        results = filtered_df.sort_values(by="similarity", ascending=False)
+        with stage_timer("sort_values"):
+            results = filtered_df.sort_values(by="similarity", ascending=False)
     else:
         # Default sort: Rating then Price
-        results = filtered_df.sort_values(
-            by=["Hotel_Rating", "Hotel_Price"], ascending=[False, True]
+        with stage_timer("sort_values"):
+            results = filtered_df.sort_values(
+                by=["Hotel_Rating", "Hotel_Price"], ascending=[False, True]
+            )
+
+    # Row positions of the top 20 (the catalog has a RangeIndex)
+    top = results.head(20)
+    # hotel_id is the catalog row, as used by /hotels/{hotel_id}/similar
+    if query:
+        top_results = records.take(
+            top.index,
+            similarity=top["similarity"].to_numpy(),
+            hotel_id=top.index.to_numpy(),
         )
-
-    # Convert to list of dicts
-    top_results = results.head(20).fillna("").to_dict(orient="records")
+    else:
+        top_results = records.take(top.index, hotel_id=top.index.to_numpy())
 
     return {"count": len(top_results), "city": location, "results": top_results}
 
 
+@app.get("/hotels/{hotel_id}/similar")
+def similar_hotels(hotel_id: int, k: int = Query(10, ge=1, le=100)):
+    """
+    Hotels most like the given one (metadata, rating and price), best first.
+    """
+    if not 0 <= hotel_id < len(df):
+        raise HTTPException(status_code=404, detail="Unknown hotel")
+    rows, scores = neighbor_table.get(hotel_id, k)
+    results = records.take(
+        rows, similarity=[round(x, 4) for x in scores.tolist()], hotel_id=rows
+    )
+    return FastJSONResponse(
+        {
+            "hotel_id": hotel_id,
+            "name": df["Hotel_Name"].iat[hotel_id],
+            "count": len(results),
+            "results": results,
+        }
+    )
+
+
 @app.post("/predict-price")
 def predict_price(req: PricePredictionRequest):
     """
     Predict hotel price based on features.
     """
     try:
-        # Encode City
-        try:
-            loc_encoded = le.transform([req.city.lower().strip()])[0]
-        except ValueError:
-            # Handle unknown city - use median or mode city code
-            loc_encoded = le.transform([le.classes_[0]])[0]
+        # Encode City (unknown cities fall back to the first city's code)
+        loc_encoded = city_codes.encode(req.city)
 
         # Prepare Feature Vector
         # Order: ['Hotel_Rating', 'amenities_count', 'Location_Encoded']
-        features = np.array([[req.hotel_rating, req.amenities_count, loc_encoded]])
+        row = [req.hotel_rating, req.amenities_count, loc_encoded]
 
-        predicted_price = rf_model.predict(features)[0]
+        if price_table is not None:
+            predicted_price = predict_prices([row])[0]
+        else:
+            predicted_price = price_batcher(row)
+        PRICE_PREDICTIONS.labels("hotels", "table" if price_table else "model").inc()
 
         return {
             "predicted_price": round(predicted_price, 2),
@@ -177,4 +305,4 @@ def predict_price(req: PricePredictionRequest):
 
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    serve("main:app", "hotels", port=8000, reload=True)
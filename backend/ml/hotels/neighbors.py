@@ -0,0 +1,129 @@
+"""
+Item-to-item "similar hotels", precomputed by train_model.py.
+
+Similarity between two hotels blends their metadata TF-IDF cosine with how
+close their rating and (log) price are:
+
+    (1 - NUMERIC_WEIGHT) * cosine + NUMERIC_WEIGHT * (1 - mean scaled gap)
+
+The full N x N similarity matrix does not fit in memory for large catalogs
+(flights training ran out of memory building one), so `build_neighbors`
+scores a block of rows against the catalog at a time, keeps each row's top k
+and stores them CSR-style: hotel i's neighbours are
+indices[indptr[i]:indptr[i + 1]], best first, with matching scores.
+Serving a hotel's neighbours is then a slice.
+"""
+
+import threading
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+
+DEFAULT_K = 20
+NUMERIC_WEIGHT = 0.2
+# Memory budget for one block of the similarity computation
+BLOCK_BYTES = 256 << 20
+# TF-IDF matrices up to this size are multiplied densely (BLAS), which is
+# several times faster than sparse products for small vocabularies
+DENSE_BYTES = 256 << 20
+
+
+def _unit_range(values) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float32)
+    span = float(values.max() - values.min()) if len(values) else 0.0
+    return (values - values.min()) / (span or 1.0)
+
+
+class HotelSpace:
+    def __init__(self, tfidf_matrix, ratings, prices, numeric_weight=NUMERIC_WEIGHT):
+        text = normalize(tfidf_matrix).astype(np.float32).tocsr()
+        if text.shape[0] * text.shape[1] * 4 <= DENSE_BYTES:
+            self.text = text.toarray()
+            self.text_t = self.text.T
+        else:
+            self.text = text
+            self.text_t = text.T.tocsr()
+        self.rating = _unit_range(ratings)
+        self.price = _unit_range(np.log1p(np.maximum(prices, 0)))
+        self.numeric_weight = numeric_weight
+
+    def __len__(self) -> int:
+        return self.text.shape[0]
+
+    def scores(self, rows: np.ndarray) -> np.ndarray:
+        """Dense (len(rows), N) similarities; a hotel's own column is -inf."""
+        w = self.numeric_weight
+        scores = self.text[rows] @ self.text_t
+        if sp.issparse(scores):
+            scores = scores.toarray()
+        scores *= 1 - w
+        gap = np.abs(self.rating[rows, None] - self.rating[None, :])
+        gap += np.abs(self.price[rows, None] - self.price[None, :])
+        scores += w * (1 - gap / 2)
+        scores[np.arange(len(rows)), rows] = -np.inf
+        return scores
+
+    def neighbors(self, rows: np.ndarray, k: int):
+        """Top-k neighbour ids and scores per row, best first (ties by id)."""
+        scores = self.scores(rows)
+        k = min(k, len(self) - 1)
+        if k <= 0:
+            empty = np.empty((len(rows), 0))
+            return empty.astype(np.int32), empty.astype(np.float32)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.lexsort((top, -top_scores), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return top.astype(np.int32), np.take_along_axis(top_scores, order, axis=1)
+
+
+def build_neighbors(space: HotelSpace, k: int = DEFAULT_K, block_bytes=BLOCK_BYTES):
+    """Top-k neighbours of every hotel, computed block by block."""
+    n = len(space)
+    # The scores block and its temporaries are a few (rows x n) float arrays
+    block = max(1, block_bytes // (max(n, 1) * 4 * 4))
+    indices, scores = [], []
+    for start in range(0, n, block):
+        top, top_scores = space.neighbors(np.arange(start, min(n, start + block)), k)
+        indices.append(top)
+        scores.append(top_scores)
+    indices = np.vstack(indices) if indices else np.empty((0, 0), np.int32)
+    scores = np.vstack(scores) if scores else np.empty((0, 0), np.float32)
+    width = indices.shape[1]
+    return {
+        "k": k,
+        "indptr": np.arange(n + 1, dtype=np.int64) * width,
+        "indices": indices.ravel().astype(np.int32),
+        "scores": scores.ravel().astype(np.float32),
+    }
+
+
+class NeighborTable:
+    """
+    Serves precomputed neighbours. Rows or k beyond the table are scored live;
+    the space for that is only built on first use.
+    """
+
+    def __init__(self, tfidf_matrix, ratings, prices, table: dict = None):
+        self._inputs = (tfidf_matrix, ratings, prices)
+        self._space = None
+        self._lock = threading.Lock()
+        n = tfidf_matrix.shape[0]
+        self.table = table if table and len(table["indptr"]) == n + 1 else None
+
+    @property
+    def space(self) -> HotelSpace:
+        with self._lock:
+            if self._space is None:
+                self._space = HotelSpace(*self._inputs)
+            return self._space
+
+    def get(self, row: int, k: int):
+        table = self.table
+        if table is not None and k <= table["k"]:
+            start = table["indptr"][row]
+            end = min(table["indptr"][row + 1], start + k)
+            return table["indices"][start:end], table["scores"][start:end]
+        top, scores = self.space.neighbors(np.array([row]), k)
+        return top[0], scores[0].astype(np.float32)
@@ -7,9 +7,27 @@ from sklearn.preprocessing import LabelEncoder
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import re
+import argparse
+import os
+import sys
+
+# Shared helpers live one level up in backend/ml/common
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.encoding import save_label_maps
+from common.price_table import PriceTable
+from amenities import AMENITIES, amenity_masks
+from neighbors import HotelSpace, build_neighbors
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--data",
+    default="data/google_hotel_data_clean_v2.csv",
+    help="hotels CSV to train on",
+)
 
 # 1. LOAD DATA
-DATA_PATH = "data/google_hotel_data_clean_v2.csv"
+DATA_PATH = parser.parse_args().data
 print(f"Loading data from {DATA_PATH}...")
 df = pd.read_csv(DATA_PATH)
 
@@ -46,6 +64,13 @@ df["Hotel_Price"] = pd.to_numeric(df["Hotel_Price"], errors="coerce").fillna(
     df["Hotel_Price"].median()
 )
 
+# Amenities as bitmasks over a fixed vocabulary, for hard must-have filters
+amenity_bits = amenity_masks(df)
+print(
+    f"Amenity masks: {len(AMENITIES)} amenities, "
+    f"{int((amenity_bits == 0).sum())} hotels without any"
+)
+
 # 3. RECOMMENDATION ENGINE (TF-IDF)
 print("Building recommendation engine...")
 # Create a 'soup' of metadata for content-based filtering
@@ -61,6 +86,12 @@ df["metadata_soup"] = (
 tfidf = TfidfVectorizer(stop_words="english")
 tfidf_matrix = tfidf.fit_transform(df["metadata_soup"])
 
+# Similar hotels: top neighbours of every hotel, computed in blocks
+print("Computing similar hotels...")
+neighbors = build_neighbors(
+    HotelSpace(tfidf_matrix, df["Hotel_Rating"], df["Hotel_Price"])
+)
+
 # 4. PRICE PREDICTION MODEL
 print("Training price prediction model...")
 X = df[["Hotel_Rating", "amenities_count", "Location_Encoded"]]
@@ -79,9 +110,16 @@ print(f"Model R^2 Score: {score:.4f}")
 # 5. SAVE ARTIFACTS
 print("Saving artifacts...")
 joblib.dump(rf_model, "hotel_price_model.pkl")
+# Every (rating, amenities, city) interval precomputed, so serving needs no forest
+price_table = PriceTable.from_model(rf_model)
+if price_table is not None:
+    price_table.save("hotel_price_table.pkl", "hotel_price_model.pkl")
 joblib.dump(le, "location_encoder.pkl")
+save_label_maps("location_label_maps.json", {"city": le})
 joblib.dump(tfidf, "tfidf_vectorizer.pkl")
 joblib.dump(tfidf_matrix, "tfidf_matrix.pkl")
 joblib.dump(df, "hotel_data_processed.pkl")
+joblib.dump({"amenities": AMENITIES, "masks": amenity_bits}, "amenity_masks.pkl")
+joblib.dump(neighbors, "hotel_neighbors.pkl")
 
 print("Done! Artifacts saved in backend/ml/")
@@ -1,35 +1,32 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-import pandas as pd
-import numpy as np
-import pickle
+from typing import List
 import os
-from sklearn.metrics.pairwise import cosine_similarity
+from common.recommender import CatalogSchema, get_engine
+from common.responses import FastJSONResponse
 
 router = APIRouter()
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODELS_DIR = os.path.join(BASE_DIR, "../models")
 
-models = {}
-data = {}
+SCHEMA = CatalogSchema(
+    key="mental",
+    label="Mental Health",
+    name_col="Session_Name",
+    price_col="Fee",
+    filter_cols=("City", "Session_Type"),
+)
+engine = get_engine(SCHEMA, MODELS_DIR)
 
 
 def load_models():
-    print("Loading Mental Health Models...")
-    try:
-        with open(os.path.join(MODELS_DIR, "mental_vectorizer.pkl"), "rb") as f:
-            models["vec"] = pickle.load(f)
-        with open(os.path.join(MODELS_DIR, "mental_tfidf_matrix.pkl"), "rb") as f:
-            models["mat"] = pickle.load(f)
-        with open(os.path.join(MODELS_DIR, "mental_price_model.pkl"), "rb") as f:
-            models["price"] = pickle.load(f)
-        with open(os.path.join(MODELS_DIR, "encoders.pkl"), "rb") as f:
-            models["encoders"] = pickle.load(f)
-        data["mental"] = pd.read_pickle(os.path.join(MODELS_DIR, "mental_df.pkl"))
-        print("Mental Health Models loaded.")
-    except Exception as e:
-        print(f"Error loading mental models: {e}")
+    engine.load()
+
+
+def require_loaded():
+    if not engine.loaded:
+        raise HTTPException(503, "Not loaded")
 
 
 class MentalFeeRequest(BaseModel):
@@ -39,72 +36,92 @@ class MentalFeeRequest(BaseModel):
     topics_count: int
 
 
-def safe_transform(le, val):
-    try:
-        if val in le.classes_:
-            return le.transform([val])[0]
-        return 0
-    except:
-        return 0
+class ClusterBatchRequest(BaseModel):
+    session_titles: List[str]
+
+
+class MentalTierRequest(BaseModel):
+    fee: float
+    amenities_count: int
+    topics_count: int
 
 
 @router.on_event("startup")
 async def startup():
-    load_models()
+    # Already loaded when a pre-forking parent preloaded the artifacts
+    if not engine.loaded:
+        load_models()
 
 
 @router.get("/sessions/mental")
-def get_mental():
-    if "mental" not in data:
-        raise HTTPException(503, "Not loaded")
-    return data["mental"].replace({np.nan: None}).head(50).to_dict(orient="records")
+def get_mental(request: Request):
+    require_loaded()
+    return engine.listing.response(request)
 
 
 @router.get("/recommend/mental")
-def rec_mental(city: str, type: str, budget: float = None):
-    if "mental" not in data:
-        raise HTTPException(503, "Not loaded")
-    q = f"{city} {type}"
-    vec = models["vec"].transform([q])
-    sim = cosine_similarity(vec, models["mat"]).flatten()
-    df = data["mental"].copy()
-    df["sim"] = sim
-    if budget:
-        df = df[df["Fee"] <= budget]
-    return (
-        df.sort_values(by=["sim", "Fee"], ascending=[False, True])
-        .head(10)
-        .replace({np.nan: None})
-        .to_dict(orient="records")
+def rec_mental(
+    city: str,
+    type: str,
+    budget: float = None,
+    session_type: str = None,
+    in_city: bool = False,
+):
+    require_loaded()
+    records = engine.recommend(
+        f"{city} {type}",
+        max_price=budget or None,
+        City=city if in_city else None,
+        Session_Type=session_type,
     )
+    return FastJSONResponse(records)
 
 
 @router.post("/predict-price/mental")
 def pred_mental(req: MentalFeeRequest):
-    if "price" not in models:
-        raise HTTPException(503, "Not loaded")
-    enc = models["encoders"]["mental_encoders"]
-    fee = models["price"].predict(
-        [
-            [
-                safe_transform(enc["city"], req.city),
-                safe_transform(enc["type"], req.session_type),
-                req.amenities_count,
-                req.topics_count,
-            ]
-        ]
-    )[0]
+    require_loaded()
+    row = [
+        engine.encode("city", req.city),
+        engine.encode("type", req.session_type),
+        req.amenities_count,
+        req.topics_count,
+    ]
+    fee = engine.predict_price_row(row)
     return {"predicted_fee": round(fee, 2)}
 
 
 @router.get("/cluster-info/mental")
 def get_mental_cluster(session_title: str):
-    if "mental" not in data:
-        raise HTTPException(503, "Not loaded")
-    match = data["mental"][
-        data["mental"]["Session_Name"].str.contains(session_title, case=False, na=False)
-    ]
-    if match.empty:
+    require_loaded()
+    match = engine.cluster_of([session_title])[0]
+    if match is None:
         raise HTTPException(404, "Not found")
-    item = match.iloc[0]
-    return {"session": item["Session_Name"], "cluster": item["Cluster_Name"]}
+    return {"session": match["name"], "cluster": match["cluster"]}
+
+
+@router.post("/cluster-info/mental/batch")
+def get_mental_clusters(req: ClusterBatchRequest):
+    require_loaded()
+    matches = engine.cluster_of(req.session_titles)
+    return FastJSONResponse(
+        [
+            {
+                "query": title,
+                "session": match and match["name"],
+                "cluster": match and match["cluster"],
+            }
+            for title, match in zip(req.session_titles, matches)
+        ]
+    )
+
+
+@router.post("/cluster-assign/mental")
+def assign_mental_tiers(sessions: List[MentalTierRequest]):
+    """Assigns a tier to unseen sessions using the trained KMeans centroids."""
+    require_loaded()
+    if not sessions:
+        return []
+    tiers = engine.assign_tiers(
+        [[s.fee, s.amenities_count, s.topics_count] for s in sessions]
+    )
+    return [{"cluster": tier} for tier in tiers]
@@ -1,7 +1,14 @@
-import uvicorn
+import os
+import sys
+
+# Shared helpers (metrics, ...) live one level up in backend/ml/common
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.metrics import install_metrics
+from common.serving import serve
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import router as mental_router
+from api.routes import load_models, router as mental_router
 
 app = FastAPI(title="HealTrip Mental Health Engine")
 
@@ -12,6 +19,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+install_metrics(app, "mental")
 
 app.include_router(mental_router, prefix="/api")
 
@@ -22,4 +30,4 @@ def health_check():
 
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8004, reload=True)
+    serve("main:app", "mental", port=8004, reload=True, preload=load_models)
@@ -1,13 +1,27 @@
+import argparse
 import pandas as pd
 import numpy as np
 import pickle
 import os
-import random
+import sys
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 
+# Shared helpers live in backend/ml/common
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from common.encoding import save_label_maps
+from common.price_table import PriceTable
+from common.stable_random import (
+    choice_index,
+    sample_without_replacement,
+    stable_uniforms,
+)
+
 # Define paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "../data")
@@ -16,9 +30,9 @@ MODELS_DIR = os.path.join(BASE_DIR, "../models")
 os.makedirs(MODELS_DIR, exist_ok=True)
 
 
-def load_data():
+def load_data(path=None):
     print("Loading Mental Health data...")
-    path = os.path.join(DATA_DIR, "mental_health_sessions_india_500.csv")
+    path = path or os.path.join(DATA_DIR, "mental_health_sessions_india_500.csv")
     if not os.path.exists(path):
         raise FileNotFoundError(f"Missing data file: {path}")
     return pd.read_csv(path)
@@ -44,22 +58,21 @@ def synthesize_mental_features(df):
         "Insurance Accepted",
     ]
 
-    def get_features(row):
-        seed = hash(row["Session_Name"]) % 10000
-        random.seed(seed)
-        sType = random.choice(types)
-        num_topics = random.randint(1, 3)
-        topics = ",".join(random.sample(topics_list, num_topics))
-        num_amenities = random.randint(1, 4)
-        amenities = ",".join(random.sample(amenities_list, num_amenities))
-        fee = random.randint(5, 50) * 100
-        return pd.Series([sType, topics, amenities, fee])
-
     if "Session_Type" not in df.columns:
         print("Synthesizing Mental Health Features...")
-        df[["Session_Type", "Topics_Covered", "Amenities", "Fee"]] = df.apply(
-            get_features, axis=1
+        # Draws depend only on the session name, so reruns give identical data
+        n_topics = len(topics_list)
+        u = stable_uniforms(df["Session_Name"], 4 + n_topics + len(amenities_list))
+        num_topics = 1 + choice_index(u[:, 1], 3)
+        num_amenities = 1 + choice_index(u[:, 2], 4)
+        df["Session_Type"] = np.asarray(types)[choice_index(u[:, 0], len(types))]
+        df["Topics_Covered"] = sample_without_replacement(
+            u[:, 4 : 4 + n_topics], topics_list, num_topics
+        )
+        df["Amenities"] = sample_without_replacement(
+            u[:, 4 + n_topics :], amenities_list, num_amenities
         )
+        df["Fee"] = (5 + choice_index(u[:, 3], 46)) * 100
     return df
 
 
@@ -86,8 +99,8 @@ def preprocess_mental(df):
     return df
 
 
-def train_and_save():
-    df = load_data()
+def train_and_save(data_path=None):
+    df = load_data(data_path)
     df = preprocess_mental(df)
 
     # 1. Recommendation
@@ -114,6 +127,13 @@ def train_and_save():
 
     with open(os.path.join(MODELS_DIR, "mental_price_model.pkl"), "wb") as f:
         pickle.dump(model_fee, f)
+    # Every input combination precomputed, so serving needs no forest
+    price_table = PriceTable.from_model(model_fee)
+    if price_table is not None:
+        price_table.save(
+            os.path.join(MODELS_DIR, "mental_price_table.pkl"),
+            os.path.join(MODELS_DIR, "mental_price_model.pkl"),
+        )
 
     # 3. Clustering
     print("Training Clustering Model...")
@@ -139,10 +159,19 @@ def train_and_save():
     encoders = {"mental_encoders": {"city": le_city, "type": le_type}}
     with open(os.path.join(MODELS_DIR, "encoders.pkl"), "wb") as f:
         pickle.dump(encoders, f)
+    # Plain-dict copy the API encodes request values with
+    save_label_maps(
+        os.path.join(MODELS_DIR, "mental_label_maps.json"),
+        {"city": le_city, "type": le_type},
+    )
 
     df.to_pickle(os.path.join(MODELS_DIR, "mental_df.pkl"))
     print("Mental Health Models Trained & Saved.")
 
 
 if __name__ == "__main__":
-    train_and_save()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--data", help="mental CSV to train on (default: shipped dataset)"
+    )
+    train_and_save(parser.parse_args().data)
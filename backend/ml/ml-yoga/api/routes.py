@@ -1,35 +1,32 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-import pandas as pd
-import numpy as np
-import pickle
+from typing import List
 import os
-from sklearn.metrics.pairwise import cosine_similarity
+from common.recommender import CatalogSchema, get_engine
+from common.responses import FastJSONResponse
 
 router = APIRouter()
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODELS_DIR = os.path.join(BASE_DIR, "../models")
 
-models = {}
-data = {}
+SCHEMA = CatalogSchema(
+    key="yoga",
+    label="Yoga",
+    name_col="Center_Name",
+    price_col="Price",
+    filter_cols=("City", "Yoga_Style"),
+)
+engine = get_engine(SCHEMA, MODELS_DIR)
 
 
 def load_models():
-    print("Loading Yoga Models...")
-    try:
-        with open(os.path.join(MODELS_DIR, "yoga_vectorizer.pkl"), "rb") as f:
-            models["vec"] = pickle.load(f)
-        with open(os.path.join(MODELS_DIR, "yoga_tfidf_matrix.pkl"), "rb") as f:
-            models["mat"] = pickle.load(f)
-        with open(os.path.join(MODELS_DIR, "yoga_price_model.pkl"), "rb") as f:
-            models["price"] = pickle.load(f)
-        with open(os.path.join(MODELS_DIR, "encoders.pkl"), "rb") as f:
-            models["encoders"] = pickle.load(f)
-        data["yoga"] = pd.read_pickle(os.path.join(MODELS_DIR, "yoga_df.pkl"))
-        print("Yoga Models loaded.")
-    except Exception as e:
-        print(f"Error loading yoga models: {e}")
+    engine.load()
+
+
+def require_loaded():
+    if not engine.loaded:
+        raise HTTPException(503, "Not loaded")
 
 
 class YogaPriceRequest(BaseModel):
@@ -38,71 +35,88 @@ class YogaPriceRequest(BaseModel):
     amenities_count: int
 
 
-def safe_transform(le, val):
-    try:
-        if val in le.classes_:
-            return le.transform([val])[0]
-        return 0
-    except:
-        return 0
+class ClusterBatchRequest(BaseModel):
+    session_titles: List[str]
+
+
+class YogaTierRequest(BaseModel):
+    price: float
+    amenities_count: int
 
 
 @router.on_event("startup")
 async def startup():
-    load_models()
+    # Already loaded when a pre-forking parent preloaded the artifacts
+    if not engine.loaded:
+        load_models()
 
 
 @router.get("/sessions/yoga")
-def get_yoga():
-    if "yoga" not in data:
-        raise HTTPException(503, "Not loaded")
-    return data["yoga"].replace({np.nan: None}).head(50).to_dict(orient="records")
+def get_yoga(request: Request):
+    require_loaded()
+    return engine.listing.response(request)
 
 
 @router.get("/recommend/yoga")
-def rec_yoga(city: str, focus: str, budget: float = None):
-    if "yoga" not in data:
-        raise HTTPException(503, "Not loaded")
-    q = f"{city} {focus}"
-    vec = models["vec"].transform([q])
-    sim = cosine_similarity(vec, models["mat"]).flatten()
-    df = data["yoga"].copy()
-    df["sim"] = sim
-    if budget:
-        df = df[df["Price"] <= budget]
-    return (
-        df.sort_values(by=["sim", "Price"], ascending=[False, True])
-        .head(10)
-        .replace({np.nan: None})
-        .to_dict(orient="records")
+def rec_yoga(
+    city: str,
+    focus: str,
+    budget: float = None,
+    style: str = None,
+    in_city: bool = False,
+):
+    require_loaded()
+    records = engine.recommend(
+        f"{city} {focus}",
+        max_price=budget or None,
+        City=city if in_city else None,
+        Yoga_Style=style,
     )
+    return FastJSONResponse(records)
 
 
 @router.post("/predict-price/yoga")
 def pred_yoga(req: YogaPriceRequest):
-    if "price" not in models:
-        raise HTTPException(503, "Not loaded")
-    enc = models["encoders"]["yoga_encoders"]
-    price = models["price"].predict(
-        [
-            [
-                safe_transform(enc["city"], req.city),
-                safe_transform(enc["style"], req.yoga_style),
-                req.amenities_count,
-            ]
-        ]
-    )[0]
+    require_loaded()
+    row = [
+        engine.encode("city", req.city),
+        engine.encode("style", req.yoga_style),
+        req.amenities_count,
+    ]
+    price = engine.predict_price_row(row)
     return {"predicted_price": round(price, 2)}
 
 
 @router.get("/cluster-info/yoga")
 def get_yoga_cluster(session_title: str):
-    if "yoga" not in data:
-        raise HTTPException(503, "Not loaded")
-    match = data["yoga"][
-        data["yoga"]["Center_Name"].str.contains(session_title, case=False, na=False)
-    ]
-    if match.empty:
+    require_loaded()
+    match = engine.cluster_of([session_title])[0]
+    if match is None:
         raise HTTPException(404, "Not found")
-    item = match.iloc[0]
-    return {"center": item["Center_Name"], "cluster": item["Cluster_Name"]}
+    return {"center": match["name"], "cluster": match["cluster"]}
+
+
+@router.post("/cluster-info/yoga/batch")
+def get_yoga_clusters(req: ClusterBatchRequest):
+    require_loaded()
+    matches = engine.cluster_of(req.session_titles)
+    return FastJSONResponse(
+        [
+            {
+                "query": title,
+                "center": match and match["name"],
+                "cluster": match and match["cluster"],
+            }
+            for title, match in zip(req.session_titles, matches)
+        ]
+    )
+
+
+@router.post("/cluster-assign/yoga")
+def assign_yoga_tiers(sessions: List[YogaTierRequest]):
+    """Assigns a tier to unseen sessions using the trained KMeans centroids."""
+    require_loaded()
+    if not sessions:
+        return []
+    tiers = engine.assign_tiers([[s.price, s.amenities_count] for s in sessions])
+    return [{"cluster": tier} for tier in tiers]
@@ -1,13 +1,27 @@
+import argparse
 import pandas as pd
 import numpy as np
 import pickle
 import os
-import random
+import sys
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 
+# Shared helpers live in backend/ml/common
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from common.encoding import save_label_maps
+from common.price_table import PriceTable
+from common.stable_random import (
+    choice_index,
+    sample_without_replacement,
+    stable_uniforms,
+)
+
 # Define paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "../data")
@@ -16,9 +30,9 @@ MODELS_DIR = os.path.join(BASE_DIR, "../models")
 os.makedirs(MODELS_DIR, exist_ok=True)
 
 
-def load_data():
+def load_data(path=None):
     print("Loading Yoga data...")
-    path = os.path.join(DATA_DIR, "yoga_wellness_india_500.csv")
+    path = path or os.path.join(DATA_DIR, "yoga_wellness_india_500.csv")
     if not os.path.exists(path):
         raise FileNotFoundError(f"Missing data file: {path}")
     return pd.read_csv(path)
@@ -46,21 +60,17 @@ def synthesize_yoga_features(df):
         "Pool",
     ]
 
-    def get_features(row):
-        seed = hash(row["Center_Name"]) % 10000
-        random.seed(seed)
-        style = random.choice(styles)
-        focus = random.choice(focuses)
-        num_amenities = random.randint(1, 5)
-        amenities = ",".join(random.sample(amenities_list, num_amenities))
-        price = random.randint(3, 20) * 100
-        return pd.Series([style, focus, amenities, price])
-
     if "Yoga_Style" not in df.columns:
         print("Synthesizing Yoga Features...")
-        df[["Yoga_Style", "Session_Focus", "Amenities", "Price"]] = df.apply(
-            get_features, axis=1
+        # Draws depend only on the centre name, so reruns give identical data
+        u = stable_uniforms(df["Center_Name"], 4 + len(amenities_list))
+        num_amenities = 1 + choice_index(u[:, 2], 5)
+        df["Yoga_Style"] = np.asarray(styles)[choice_index(u[:, 0], len(styles))]
+        df["Session_Focus"] = np.asarray(focuses)[choice_index(u[:, 1], len(focuses))]
+        df["Amenities"] = sample_without_replacement(
+            u[:, 4:], amenities_list, num_amenities
         )
+        df["Price"] = (3 + choice_index(u[:, 3], 18)) * 100
 
     return df
 
@@ -85,8 +95,8 @@ def preprocess_yoga(df):
     return df
 
 
-def train_and_save():
-    df = load_data()
+def train_and_save(data_path=None):
+    df = load_data(data_path)
     df = preprocess_yoga(df)
 
     # 1. Recommendation
@@ -113,6 +123,13 @@ def train_and_save():
 
     with open(os.path.join(MODELS_DIR, "yoga_price_model.pkl"), "wb") as f:
         pickle.dump(model_price, f)
+    # Every input combination precomputed, so serving needs no forest
+    price_table = PriceTable.from_model(model_price)
+    if price_table is not None:
+        price_table.save(
+            os.path.join(MODELS_DIR, "yoga_price_table.pkl"),
+            os.path.join(MODELS_DIR, "yoga_price_model.pkl"),
+        )
 
     # 3. Clustering
     print("Training Clustering Model...")
@@ -136,10 +153,19 @@ def train_and_save():
     encoders = {"yoga_encoders": {"city": le_city, "style": le_style}}
     with open(os.path.join(MODELS_DIR, "encoders.pkl"), "wb") as f:
         pickle.dump(encoders, f)
+    # Plain-dict copy the API encodes request values with
+    save_label_maps(
+        os.path.join(MODELS_DIR, "yoga_label_maps.json"),
+        {"city": le_city, "style": le_style},
+    )
 
     df.to_pickle(os.path.join(MODELS_DIR, "yoga_df.pkl"))
     print("Yoga Models Trained & Saved.")
 
 
 if __name__ == "__main__":
-    train_and_save()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--data", help="yoga CSV to train on (default: shipped dataset)"
+    )
+    train_and_save(parser.parse_args().data)
@@ -0,0 +1,86 @@
+from fastapi import FastAPI, File, Form, UploadFile
+from fastapi.middleware.cors import CORSMiddleware
+from typing import Optional
+import os
+import sys
+
+# Shared helpers (metrics, ...) live one level up in backend/ml/common
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.metrics import install_metrics
+from common.responses import FastJSONResponse
+from common.serving import serve
+from common.uploads import install_upload_limits
+from orchestrator import Orchestrator
+
+app = FastAPI(title="HealTrip Trip Quote Service")
+install_upload_limits(app, ["/trip-quote"])
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+install_metrics(app, "quotes")
+
+orchestrator = Orchestrator()
+# Backends to serve inside this process, e.g. HEALTRIP_QUOTES_LOCAL=visa,yoga,mental
+LOCAL_BACKENDS = [
+    name.strip()
+    for name in os.getenv("HEALTRIP_QUOTES_LOCAL", "").split(",")
+    if name.strip()
+]
+
+
+@app.on_event("startup")
+async def startup():
+    await orchestrator.start_local(LOCAL_BACKENDS)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await orchestrator.aclose()
+
+
+@app.get("/")
+def health_check():
+    return {"status": "ok", "service": "Trip Quotes"}
+
+
+@app.post("/trip-quote")
+async def trip_quote(
+    city: str = Form(..., description="Treatment city, e.g. Mumbai"),
+    origin: Optional[str] = Form(None, description="Flight origin city"),
+    country: Optional[str] = Form(None, description="Destination country for visa"),
+    visa_type: str = Form("Medical"),
+    hotel_budget: Optional[float] = Form(None),
+    wellness_focus: Optional[str] = Form(None, description="e.g. Meditation"),
+    text: Optional[str] = Form(None, description="Medical report text"),
+    file: Optional[UploadFile] = File(None),
+):
+    """
+    Combined quote: hospitals (from the report), flights, hotels, visa and
+    optional yoga/mental recommendations, fetched concurrently. Sections whose
+    backend failed or timed out are null; see `status` for details.
+    """
+    report_file = None
+    if file is not None:
+        # Streamed on from the spooled temp file instead of read into memory
+        report_file = (file.filename, file.file, file.content_type)
+    quote = await orchestrator.quote(
+        city,
+        origin=origin,
+        country=country,
+        visa_type=visa_type,
+        hotel_budget=hotel_budget,
+        wellness_focus=wellness_focus,
+        report_text=text,
+        report_file=report_file,
+    )
+    return FastJSONResponse(quote)
+
+
+if __name__ == "__main__":
+    serve("main:app", "quotes", port=8006, reload=True)
@@ -0,0 +1,215 @@
+"""
+Concurrent fan-out to the HealTrip ML services for a combined trip quote.
+
+Each backend is called at most once per quote, all of them at the same time,
+each under its own timeout. A backend that fails or times out only blanks its
+own section of the quote; the per-backend status says what happened.
+
+Backends are reached through one pooled keep-alive client per backend (see
+common/http_client.py), over a Unix socket when the backend serves one.
+Backends co-hosted in this process (`start_local`, HEALTRIP_QUOTES_LOCAL in
+quotes/main.py) are called in-process through their ASGI app instead, with
+no network hop.
+"""
+
+import asyncio
+import contextlib
+import importlib.util
+import os
+import sys
+import time
+from typing import Dict, Iterable, Optional
+
+import httpx
+
+from common.http_client import pooled_client
+from common.metrics import stage_timer
+
+# Base URL and timeout (seconds) per backend; override with
+# HEALTRIP_<NAME>_URL / HEALTRIP_<NAME>_TIMEOUT.
+BACKENDS = {
+    "hotels": ("http://127.0.0.1:8000", 3.0),
+    "hospitals": ("http://127.0.0.1:8001", 10.0),
+    "flights": ("http://127.0.0.1:8002", 3.0),
+    "visa": ("http://127.0.0.1:8003", 2.0),
+    "mental": ("http://127.0.0.1:8004", 3.0),
+    "yoga": ("http://127.0.0.1:8005", 3.0),
+}
+
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Service directories under backend/ml, for co-hosting
+SERVICE_DIRS = {
+    "hotels": "hotels",
+    "hospitals": "hospitals",
+    "flights": "flights",
+    "visa": os.path.join("visa", "backend"),
+    "mental": "ml-mental",
+    "yoga": "ml-yoga",
+}
+
+
+def backend_url(name: str) -> str:
+    return os.getenv(f"HEALTRIP_{name.upper()}_URL", BACKENDS[name][0])
+
+
+def backend_timeout(name: str) -> float:
+    return float(os.getenv(f"HEALTRIP_{name.upper()}_TIMEOUT", BACKENDS[name][1]))
+
+
+def load_service_app(name: str):
+    """
+    Imports backend `name`'s FastAPI app into this process. The service's own
+    modules are dropped from sys.modules afterwards (the app keeps them), so
+    services with same-named modules, such as yoga's and mental's `api`, can
+    be co-hosted.
+    """
+    service_dir = os.path.join(ML_DIR, SERVICE_DIRS[name])
+    before = set(sys.modules)
+    sys.path.insert(0, service_dir)
+    try:
+        spec = importlib.util.spec_from_file_location(
+            f"healtrip_{name}_main", os.path.join(service_dir, "main.py")
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(service_dir)
+        for module_name in set(sys.modules) - before:
+            path = getattr(sys.modules[module_name], "__file__", None) or ""
+            if path.startswith(service_dir + os.sep):
+                del sys.modules[module_name]
+    return module.app
+
+
+class Orchestrator:
+    def __init__(self):
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+        self._local_apps = {}
+        self._lifespans = contextlib.AsyncExitStack()
+
+    def register_local(self, name: str, app):
+        """Serve `name` from an ASGI app in this process instead of over HTTP."""
+        self._local_apps[name] = app
+
+    async def start_local(self, names: Iterable[str]):
+        """Imports the named backends' apps, runs their startup and registers them."""
+        for name in names:
+            if name not in SERVICE_DIRS:
+                raise ValueError(f"Unknown backend to co-host: {name}")
+            app = load_service_app(name)
+            # ASGITransport sends no lifespan events, so run startup/shutdown here
+            await self._lifespans.enter_async_context(app.router.lifespan_context(app))
+            self.register_local(name, app)
+            print(f"quotes: serving {name} in-process")
+
+    def client(self, name: str) -> httpx.AsyncClient:
+        client = self.clients.get(name)
+        if client is None:
+            app = self._local_apps.get(name)
+            client = pooled_client(
+                name,
+                "http://backend" if app is not None else backend_url(name),
+                timeout=backend_timeout(name),
+                transport=httpx.ASGITransport(app=app) if app is not None else None,
+            )
+            self.clients[name] = client
+        return client
+
+    async def aclose(self):
+        clients, self.clients = list(self.clients.values()), {}
+        for client in clients:
+            await client.aclose()
+        await self._lifespans.aclose()
+
+    async def call(self, name: str, method: str, path: str, **kwargs) -> dict:
+        """
+        One backend request under that backend's timeout. Returns
+        {"ok", "elapsed_ms", "data"} on success, {"ok", "elapsed_ms", "error"}
+        otherwise; never raises.
+        """
+        start = time.perf_counter()
+        status = {"ok": False}
+        try:
+            with stage_timer(f"quote_{name}"):
+                response = await asyncio.wait_for(
+                    self.client(name).request(method, path, **kwargs),
+                    timeout=backend_timeout(name),
+                )
+            if response.status_code >= 400:
+                status["error"] = f"HTTP {response.status_code}"
+            else:
+                status["ok"] = True
+                status["data"] = response.json()
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            status["error"] = "timeout"
+        except Exception as e:
+            status["error"] = f"{type(e).__name__}: {e}"
+        status["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return status
+
+    async def quote(
+        self,
+        city: str,
+        origin: Optional[str] = None,
+        country: Optional[str] = None,
+        visa_type: str = "Medical",
+        hotel_budget: Optional[float] = None,
+        wellness_focus: Optional[str] = None,
+        report_text: Optional[str] = None,
+        report_file: Optional[tuple] = None,
+    ) -> dict:
+        """
+        Fans out to every backend the inputs allow and merges the results.
+        `report_file` is a (filename, bytes or binary file, content_type) tuple.
+        """
+        calls = {}
+        if report_text or report_file:
+            calls["hospitals"] = self.call(
+                "hospitals",
+                "POST",
+                "/predict-all",
+                data={"text": report_text} if report_text else None,
+                files={"file": report_file} if report_file else None,
+            )
+        if origin:
+            calls["flights"] = self.call(
+                "flights",
+                "GET",
+                "/recommend-flights",
+                params={"origin": origin, "destination": city},
+            )
+        hotel_params = {"location": city}
+        if hotel_budget is not None:
+            hotel_params["budget"] = hotel_budget
+        calls["hotels"] = self.call("hotels", "GET", "/recommend", params=hotel_params)
+        if country:
+            calls["visa"] = self.call(
+                "visa",
+                "POST",
+                "/visa-requirements",
+                json={"country": country, "visa_type": visa_type},
+            )
+        if wellness_focus:
+            calls["yoga"] = self.call(
+                "yoga",
+                "GET",
+                "/api/recommend/yoga",
+                params={"city": city, "focus": wellness_focus},
+            )
+            calls["mental"] = self.call(
+                "mental",
+                "GET",
+                "/api/recommend/mental",
+                params={"city": city, "type": wellness_focus},
+            )
+
+        results = await asyncio.gather(*calls.values())
+        quote = {name: None for name in BACKENDS}
+        status = {}
+        for name, result in zip(calls, results):
+            quote[name] = result.pop("data", None)
+            status[name] = result
+        quote["status"] = status
+        quote["partial"] = not all(s["ok"] for s in status.values())
+        return quote
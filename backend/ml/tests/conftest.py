@@ -0,0 +1,13 @@
+"""
+Tests for the shared helpers in backend/ml/common and the services using them.
+
+Run from backend/ml with `python -m pytest tests`. Like the service entry
+points, tests import `common` with backend/ml on `sys.path`.
+"""
+
+import os
+import sys
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ML_DIR not in sys.path:
+    sys.path.insert(0, ML_DIR)
@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from common.batching import MicroBatcher
+
+
+class RecordingModel:
+    """Doubles each row and records every batch it was called with."""
+
+    def __init__(self, delay: float = 0.002, bad=None):
+        self.delay = delay
+        self.bad = bad
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def __call__(self, rows):
+        with self._lock:
+            self.batches.append(list(rows))
+        # Long enough for other callers to queue up behind a running batch
+        time.sleep(self.delay)
+        if self.bad in rows:
+            raise ValueError(f"bad row {self.bad}")
+        return [row * 2 for row in rows]
+
+
+def call_concurrently(batcher, rows):
+    """Calls batcher(row) from one thread per row; returns {row: result}."""
+    results = {}
+    start = threading.Barrier(len(rows))
+
+    def call(row):
+        start.wait()
+        try:
+            results[row] = batcher(row)
+        except Exception as e:
+            results[row] = e
+
+    threads = [threading.Thread(target=call, args=(row,)) for row in rows]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    assert not any(thread.is_alive() for thread in threads)
+    return results
+
+
+@pytest.mark.parametrize("max_batch", [1, 4, 64])
+def test_each_caller_gets_its_own_row_once(max_batch):
+    model = RecordingModel()
+    batcher = MicroBatcher("test", model, max_batch=max_batch, max_wait=0.001)
+    for i in range(5):
+        rows = list(range(i * 1000, i * 1000 + 200))
+        assert call_concurrently(batcher, rows) == {row: row * 2 for row in rows}
+
+    predicted = Counter(row for batch in model.batches for row in batch)
+    assert set(predicted.values()) == {1}
+    assert len(predicted) == 1000
+    assert all(0 < len(batch) <= max_batch for batch in model.batches)
+    if max_batch > 1:
+        assert max(len(batch) for batch in model.batches) > 1
+
+
+def test_failed_row_only_fails_its_caller():
+    model = RecordingModel(bad=7)
+    batcher = MicroBatcher("test", model, max_batch=16, max_wait=0.005)
+    results = call_concurrently(batcher, list(range(40)))
+    assert isinstance(results.pop(7), ValueError)
+    assert results == {row: row * 2 for row in range(40) if row != 7}
+
+
+def test_idle_caller_runs_at_once():
+    model = RecordingModel(delay=0)
+    batcher = MicroBatcher("test", model, max_batch=64, max_wait=10)
+    started = time.perf_counter()
+    assert batcher(21) == 42
+    assert time.perf_counter() - started < 1
+    assert model.batches == [[21]]
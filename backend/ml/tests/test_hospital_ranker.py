@@ -0,0 +1,149 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from conftest import ML_DIR
+
+sys.path.insert(0, os.path.join(ML_DIR, "hospitals"))
+
+import hospital_ranker  # noqa: E402
+from cities import normalize_city  # noqa: E402
+from common.singleflight import SingleFlight  # noqa: E402
+from hospital_ranker import HospitalRanker  # noqa: E402
+
+WORDS = (
+    "cardiac arrhythmia heart valve bypass stent diabetes insulin kidney "
+    "dialysis transplant liver cancer tumor chemotherapy spine knee hip "
+    "fracture asthma lung pediatric neonatal cataract retina"
+).split()
+# Aliases ("Bombay", "Delhi") and stray case/whitespace must match as one city
+CITIES = ["Mumbai", "Bombay", "New Delhi", "Delhi", " pune", "Chennai"]
+SPECIALTIES = ["Cardiology", "Oncology", "Orthopedics"]
+QUERIES = [
+    "heart valve",
+    "cardiac arrhythmia heart valve bypass",
+    "diabetes",
+    "kidney transplant dialysis",
+    "cancer tumor",
+    "knee hip fracture spine",
+    # No known terms: similarity is 0 everywhere, only static scores count
+    "influenza",
+]
+
+
+@pytest.fixture(scope="module")
+def ranker():
+    rng = np.random.default_rng(7)
+    n = 600
+    summaries = [" ".join(rng.choice(WORDS, rng.integers(2, 7))) for _ in range(n)]
+    df = pd.DataFrame(
+        {
+            "Hospital_Group": [f"Hospital {i}" for i in range(n)],
+            # Coarse ratings and review counts make many static scores tie
+            "Rating_5_Scale": rng.choice([3.5, 4.0, 4.5, 5.0], n),
+            "Review_Count": rng.choice([10, 50, 200, 1000], n),
+            "City": rng.choice(CITIES, n),
+            "Specialty": rng.choice(SPECIALTIES + ["cardiology"], n),
+            "Review_Summary": summaries,
+        }
+    )
+    # Exact duplicates tie on the full score as well
+    df.iloc[300:340] = df.iloc[0:40].to_numpy()
+    vectorizer = TfidfVectorizer(stop_words="english")
+    tfidf_matrix = vectorizer.fit_transform(df["Review_Summary"])
+
+    ranker = HospitalRanker.__new__(HospitalRanker)
+    ranker.weights = dict(hospital_ranker.DEFAULT_WEIGHTS)
+    ranker.vectorizer = vectorizer
+    ranker._flights = SingleFlight("test_top_hospitals")
+    ranker.set_data(df, tfidf_matrix)
+    return ranker
+
+
+def full_sort(ranker, disease, specialty, top_k, city=None):
+    """Scores every candidate and sorts by score, then row."""
+    df = ranker.df
+    mask = df["Specialty"].str.lower() == specialty.lower()
+    if city:
+        mask &= df["City"].map(normalize_city) == normalize_city(city)
+    rows = np.flatnonzero(mask.to_numpy())
+    if not len(rows):
+        return rows, np.empty(0)
+    weights = ranker.weights
+    static = weights["rating"] * (df["Rating_5_Scale"].to_numpy() / 5.0) + weights[
+        "reviews"
+    ] * (df["Review_Count"].to_numpy() / df["Review_Count"].max())
+    similarity = cosine_similarity(
+        ranker.vectorizer.transform([disease]), ranker.tfidf_matrix[rows]
+    ).ravel()
+    scores = static[rows] + weights["similarity"] * similarity
+    best = sorted(range(len(rows)), key=lambda i: (-scores[i], rows[i]))[:top_k]
+    return rows[best], scores[best]
+
+
+@pytest.fixture
+def scored_rows(monkeypatch):
+    """Counts candidates whose similarity _rank_rows computes."""
+    counts = []
+
+    def counting(query, rows):
+        counts.append(rows.shape[0])
+        return cosine_similarity(query, rows)
+
+    monkeypatch.setattr(hospital_ranker, "cosine_similarity", counting)
+    return counts
+
+
+@pytest.mark.parametrize("block_size", [4, 64])
+@pytest.mark.parametrize("city", [None, "Mumbai", "bombay ", "Delhi", "Pune", "Agra"])
+def test_rank_rows_matches_full_sort(ranker, monkeypatch, block_size, city):
+    monkeypatch.setattr(hospital_ranker, "BLOCK_SIZE", block_size)
+    for specialty in SPECIALTIES + ["Neurology"]:
+        for disease in QUERIES:
+            for top_k in (1, 3, 5, 20, 70, 1000):
+                rows, scores = ranker._rank_rows(disease, specialty, top_k, city=city)
+                expected_rows, expected_scores = full_sort(
+                    ranker, disease, specialty, top_k, city
+                )
+                assert rows.tolist() == expected_rows.tolist(), (
+                    disease,
+                    specialty,
+                    top_k,
+                    city,
+                )
+                np.testing.assert_allclose(scores, expected_scores, rtol=1e-12)
+
+
+def test_rank_rows_stops_early(ranker, monkeypatch, scored_rows):
+    monkeypatch.setattr(hospital_ranker, "BLOCK_SIZE", 4)
+    candidates = len(ranker.specialties["cardiology"].rows)
+    ranker._rank_rows("heart valve", "Cardiology", 3)
+    assert sum(scored_rows) < candidates
+    scored_rows.clear()
+    ranker._rank_rows("heart valve", "Cardiology", 3, exhaustive=True)
+    assert sum(scored_rows) == candidates
+
+
+def test_similarity_bound_is_capped_for_spread_out_terms(ranker):
+    """
+    The per-term maxima come from different candidates, so their product with
+    a multi-term query can exceed 1; the bound is then capped at 1.
+    """
+    candidates = ranker.specialties["cardiology"]
+    query = ranker.vectorizer.transform(["cardiac arrhythmia heart valve bypass"])
+    unit_query = query / np.sqrt(query.multiply(query).sum())
+    assert unit_query.dot(candidates.max_terms)[0, 0] > 1.0
+
+
+def test_ties_keep_table_order(ranker):
+    rows, scores = ranker._rank_rows("influenza", "Cardiology", 1000)
+    for (row, score), (next_row, next_score) in zip(
+        zip(rows, scores), zip(rows[1:], scores[1:])
+    ):
+        assert score > next_score or (score == next_score and row < next_row)
+    assert len(set(scores.tolist())) < len(scores)
@@ -0,0 +1,144 @@
+import os
+import subprocess
+import threading
+import time
+
+import pytest
+
+from common.jobs import JobQueue
+
+
+class Handler:
+    """Returns the input's bytes and a call number; records every call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, kind, path):
+        with open(path, "rb") as f:
+            content = f.read().decode()
+        self.calls.append(content)
+        return {"kind": kind, "content": content, "call": len(self.calls)}
+
+
+@pytest.fixture
+def handler():
+    return Handler()
+
+
+@pytest.fixture
+def queue(tmp_path, handler):
+    return JobQueue("test", str(tmp_path), handler, workers=2, ttl=3600)
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen(["true"])
+    process.wait()
+    return process.pid
+
+
+def set_running(queue, job_id, owner, started):
+    queue._connect().execute(
+        "UPDATE jobs SET status = 'running', owner = ?, started = ? WHERE id = ?",
+        (owner, started, job_id),
+    )
+
+
+def test_each_job_is_claimed_once_across_threads_and_processes(tmp_path, handler):
+    # Two queues on one directory stand in for two worker processes
+    queues = [JobQueue("test", str(tmp_path), handler) for _ in range(2)]
+    submitted = {queues[0].submit("text", f"job {i}".encode()) for i in range(200)}
+    claimed = []
+    start = threading.Barrier(8)
+
+    def claim_all(queue):
+        start.wait()
+        while True:
+            job = queue._claim()
+            if job is None:
+                return
+            claimed.append(job[0])
+
+    threads = [
+        threading.Thread(target=claim_all, args=(queues[i % 2],)) for i in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=60)
+
+    assert sorted(claimed) == sorted(submitted)
+    assert queues[1].depth() == 0
+    assert {queues[1].get(job_id)["status"] for job_id in submitted} == {"running"}
+
+
+def test_job_of_dead_process_is_requeued(queue):
+    job_id = queue.submit("text", b"report")
+    set_running(queue, job_id, dead_pid(), time.time())
+    queue._requeue_orphans()
+    assert queue.get(job_id)["status"] == "queued"
+    assert "started" not in queue.get(job_id)
+
+
+def test_job_past_its_lease_is_requeued(queue):
+    expired, fresh = queue.submit("text", b"a"), queue.submit("text", b"b")
+    # Owner alive (this process), e.g. a reused pid after a restart
+    set_running(queue, expired, os.getpid(), time.time() - queue.lease - 1)
+    set_running(queue, fresh, os.getpid(), time.time())
+    queue._requeue_orphans()
+    assert queue.get(expired)["status"] == "queued"
+    assert queue.get(fresh)["status"] == "running"
+
+
+def test_stale_finisher_is_ignored(queue, handler):
+    job_id = queue.submit("text", b"report")
+    first = queue._claim()
+    # The first claim outlives its lease and the job goes to another worker
+    stale_start = time.time() - queue.lease - 1
+    set_running(queue, job_id, os.getpid(), stale_start)
+    first = first[:3] + (stale_start,)
+    queue._requeue_orphans()
+    second = queue._claim()
+    assert second[0] == job_id and second[3] != stale_start
+
+    queue._run(*first)
+    assert queue.get(job_id)["status"] == "running"
+    queue._run(*second)
+    job = queue.get(job_id)
+    assert job["status"] == "done"
+    # The second run's result, not the stale one's
+    assert job["result"]["call"] == 2
+    assert job["started"] == second[3]
+
+
+def test_prune_drops_expired_jobs_and_their_inputs(queue):
+    old, recent = queue.submit("text", b"old"), queue.submit("text", b"recent")
+    db = queue._connect()
+    db.execute(
+        "UPDATE jobs SET status = 'done', finished = ?, result = '{}' WHERE id = ?",
+        (time.time() - queue.ttl - 1, old),
+    )
+    db.execute(
+        "UPDATE jobs SET status = 'failed', finished = ? WHERE id = ?",
+        (time.time(), recent),
+    )
+    queue._prune()
+    assert queue.get(old) is None
+    assert not os.path.exists(os.path.join(queue.inputs, old))
+    assert queue.get(recent)["status"] == "failed"
+    assert os.path.exists(os.path.join(queue.inputs, recent))
+
+
+def test_workers_run_submitted_jobs(queue):
+    queue.start()
+    try:
+        job_id = queue.submit("text", b"report")
+        deadline = time.monotonic() + 10
+        while queue.get(job_id)["status"] not in ("done", "failed"):
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+    finally:
+        queue.stop()
+    job = queue.get(job_id)
+    assert job["result"] == {"kind": "text", "content": "report", "call": 1}
+    assert not os.path.exists(os.path.join(queue.inputs, job_id))
@@ -0,0 +1,54 @@
+import importlib.util
+import os
+import re
+import sys
+
+from fastapi.testclient import TestClient
+
+from conftest import ML_DIR
+
+
+def load_quotes_app(monkeypatch, local: str):
+    """quotes/main.py imported under its own module name, co-hosting `local`."""
+    monkeypatch.setenv("HEALTRIP_QUOTES_LOCAL", local)
+    quotes_dir = os.path.join(ML_DIR, "quotes")
+    monkeypatch.syspath_prepend(quotes_dir)
+    monkeypatch.delitem(sys.modules, "orchestrator", raising=False)
+    spec = importlib.util.spec_from_file_location(
+        "healtrip_quotes_main", os.path.join(quotes_dir, "main.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app
+
+
+def request_series(text: str, route: str):
+    """`service` labels of the request counter series for `route`."""
+    pattern = (
+        r'^healtrip_http_requests_total\{service="([^"]*)",method="\w+",route="%s",'
+    )
+    return set(re.findall(pattern % re.escape(route), text, re.MULTILINE))
+
+
+def test_cohosted_backends_keep_their_own_service_label(monkeypatch):
+    app = load_quotes_app(monkeypatch, "visa")
+    # Other backends are not running; their sections just fail fast
+    for name in ("hotels", "hospitals", "flights", "mental", "yoga"):
+        monkeypatch.setenv(f"HEALTRIP_{name.upper()}_URL", "http://127.0.0.1:9")
+    with TestClient(app) as client:
+        response = client.post(
+            "/trip-quote", data={"city": "Mumbai", "country": "Germany"}
+        )
+        assert response.status_code == 200
+        assert response.json()["status"]["visa"]["ok"]
+        metrics = client.get("/metrics").text
+
+    assert request_series(metrics, "/trip-quote") == {"quotes"}
+    # The co-hosted visa app's requests are labelled as visa
+    assert request_series(metrics, "/visa-requirements") == {"visa"}
+    assert re.search(
+        r'^healtrip_http_request_duration_seconds_count\{service="quotes",'
+        r'method="POST",route="/trip-quote"\}',
+        metrics,
+        re.MULTILINE,
+    )
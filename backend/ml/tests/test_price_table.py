@@ -0,0 +1,152 @@
+import os
+import pickle
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from common.price_table import PriceTable, _representatives, _split_thresholds
+from conftest import ML_DIR
+
+# (price table, price model) written by each service's training script
+ARTIFACTS = {
+    "hotels": ("hotels/hotel_price_table.pkl", "hotels/hotel_price_model.pkl"),
+    "yoga": (
+        "ml-yoga/models/yoga_price_table.pkl",
+        "ml-yoga/models/yoga_price_model.pkl",
+    ),
+    "mental": (
+        "ml-mental/models/mental_price_table.pkl",
+        "ml-mental/models/mental_price_model.pkl",
+    ),
+}
+
+
+def probe_values(thresholds: np.ndarray) -> np.ndarray:
+    """
+    Per feature: every threshold as a float32, its float32 neighbours on both
+    sides, the representatives the table was built from, and values beyond
+    both ends.
+    """
+    at = thresholds.astype(np.float32)
+    values = np.concatenate(
+        [
+            at,
+            np.nextafter(at, np.float32(-np.inf)),
+            np.nextafter(at, np.float32(np.inf)),
+            _representatives(thresholds),
+            np.float32([-1e6, 0, 1e6]),
+        ]
+    )
+    return np.unique(values)
+
+
+def probe_rows(model, per_feature: int = 4000, seed: int = 0) -> np.ndarray:
+    """
+    Rows that sweep each feature through all its probe values, the other
+    features drawn from their own probe values.
+    """
+    rng = np.random.default_rng(seed)
+    probes = [probe_values(t) for t in _split_thresholds(model, model.n_features_in_)]
+    blocks = []
+    for feature, values in enumerate(probes):
+        sweep = np.resize(values, max(per_feature, len(values)))
+        block = np.column_stack([rng.choice(p, len(sweep)) for p in probes])
+        block[:, feature] = sweep
+        blocks.append(block)
+    return np.vstack(blocks).astype(np.float32)
+
+
+def assert_same_as_model(table: PriceTable, model, rows: np.ndarray):
+    columns = getattr(model, "feature_names_in_", None)
+    features = rows if columns is None else pd.DataFrame(rows, columns=columns)
+    np.testing.assert_array_equal(table.predict(rows), model.predict(features))
+
+
+@pytest.fixture(scope="module")
+def forest():
+    rng = np.random.default_rng(3)
+    n = 400
+    X = pd.DataFrame(
+        {
+            "city": rng.integers(0, 12, n).astype(float),
+            "amenities": rng.integers(0, 9, n).astype(float),
+            # Continuous values put thresholds between arbitrary floats
+            "rating": rng.uniform(1, 5, n).round(3),
+        }
+    )
+    y = 1000 * X["city"] + 150 * X["amenities"] + 400 * X["rating"] ** 2
+    y += rng.normal(0, 50, n)
+    return RandomForestRegressor(n_estimators=25, random_state=0).fit(X, y)
+
+
+def test_table_matches_forest_at_and_around_thresholds(forest):
+    table = PriceTable.from_model(forest)
+    assert table is not None
+    assert_same_as_model(table, forest, probe_rows(forest))
+
+
+def test_table_matches_forest_on_unseen_values(forest):
+    table = PriceTable.from_model(forest)
+    rng = np.random.default_rng(1)
+    rows = np.column_stack(
+        [
+            rng.uniform(-2, 14, 5000),
+            rng.uniform(-1, 10, 5000),
+            rng.uniform(0, 6, 5000),
+        ]
+    )
+    assert_same_as_model(table, forest, rows)
+
+
+def test_oversized_grid_keeps_the_model(forest):
+    assert PriceTable.from_model(forest, max_cells=10) is None
+
+
+@pytest.mark.parametrize("service", sorted(ARTIFACTS))
+def test_service_table_matches_its_model(service):
+    table_path, model_path = (os.path.join(ML_DIR, p) for p in ARTIFACTS[service])
+    if not (os.path.exists(table_path) and os.path.exists(model_path)):
+        pytest.skip(f"{service} price artifacts not trained")
+    table = PriceTable.load(table_path, model_path)
+    # A table that no longer matches its model must be rebuilt by training
+    assert table is not None, f"{table_path} is stale"
+    model = joblib.load(model_path)
+    assert_same_as_model(table, model, probe_rows(model))
+
+
+def test_stale_table_is_ignored(forest, tmp_path, capsys):
+    model_path = tmp_path / "price_model.pkl"
+    table_path = tmp_path / "price_table.pkl"
+    joblib.dump(forest, model_path)
+    PriceTable.from_model(forest).save(str(table_path), str(model_path))
+    assert PriceTable.load(str(table_path), str(model_path)) is not None
+
+    # Retrained model, old table
+    retrained = RandomForestRegressor(n_estimators=5, random_state=1)
+    retrained.fit(np.arange(20).reshape(10, 2), np.arange(10))
+    joblib.dump(retrained, model_path)
+    capsys.readouterr()
+    assert PriceTable.load(str(table_path), str(model_path)) is None
+    assert "Ignoring stale price table price_table.pkl" in capsys.readouterr().out
+
+
+def test_missing_table_loads_as_none(tmp_path):
+    assert PriceTable.load(str(tmp_path / "missing.pkl"), "model.pkl") is None
+
+
+def test_saved_table_records_the_model_digest(forest, tmp_path):
+    model_path = tmp_path / "price_model.pkl"
+    table_path = tmp_path / "price_table.pkl"
+    joblib.dump(forest, model_path)
+    PriceTable.from_model(forest).save(str(table_path), str(model_path))
+    with open(table_path, "rb") as f:
+        saved = pickle.load(f)
+    loaded = PriceTable.load(str(table_path), str(model_path))
+    assert loaded.model == saved["model"]
+    rows = probe_rows(forest, per_feature=500)
+    np.testing.assert_array_equal(
+        loaded.predict(rows), PriceTable.from_model(forest).predict(rows)
+    )
@@ -0,0 +1,44 @@
+import gc
+import signal
+
+import pytest
+
+from common import serving
+
+BROKEN_APP = """
+from fastapi import FastAPI
+
+app = FastAPI()
+
+
+@app.on_event("startup")
+def fail():
+    raise RuntimeError("artifact missing")
+"""
+
+
+@pytest.fixture
+def restore_signals():
+    handlers = {
+        sig: signal.getsignal(sig)
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP)
+    }
+    yield
+    for sig, handler in handlers.items():
+        signal.signal(sig, handler)
+    gc.unfreeze()
+
+
+def test_prefork_gives_up_when_workers_fail_at_startup(
+    tmp_path, monkeypatch, restore_signals
+):
+    (tmp_path / "broken_main.py").write_text(BROKEN_APP)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(serving, "RESTART_BACKOFF", 0.01)
+    monkeypatch.delenv("HEALTRIP_SOCKET_DIR", raising=False)
+    prefork = serving.Prefork("broken_main:app", "broken", 0, "127.0.0.1", 2)
+
+    with pytest.raises(SystemExit, match="failed 5 times in a row"):
+        prefork.run()
+    assert not prefork.children
+    assert max(prefork.failures.values()) == serving.MAX_FAILURES
@@ -0,0 +1,182 @@
+"""
+Resolves free-text country names to dataset keys.
+
+Lookups try, in order: the normalized name itself, the alias table (common
+short forms and former names), then a character trigram index that picks
+the country with the highest Dice similarity, so misspellings such as
+"Phillipines" still resolve. A fuzzy match must clearly beat every other
+country: "Nigera" (Niger or Nigeria?) and "Congo" stay unresolved rather
+than returning another country's requirements.
+"""
+
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+# Alternative name -> country name as written in the dataset
+ALIASES = {
+    "uk": "United Kingdom",
+    "u k": "United Kingdom",
+    "great britain": "United Kingdom",
+    "britain": "United Kingdom",
+    "england": "United Kingdom",
+    "scotland": "United Kingdom",
+    "wales": "United Kingdom",
+    "northern ireland": "United Kingdom",
+    "us": "United States",
+    "u s": "United States",
+    "usa": "United States",
+    "u s a": "United States",
+    "america": "United States",
+    "united states of america": "United States",
+    "uae": "United Arab Emirates",
+    "emirates": "United Arab Emirates",
+    "south korea": "Korea (South)",
+    "s korea": "Korea (South)",
+    "republic of korea": "Korea (South)",
+    "north korea": "Korea (North)",
+    "n korea": "Korea (North)",
+    "dprk": "Korea (North)",
+    "czechia": "Czech Republic",
+    "ivory coast": "Côte d'Ivoire",
+    "burma": "Myanmar",
+    "holland": "Netherlands",
+    "the netherlands": "Netherlands",
+    "drc": "Congo (Democratic Republic)",
+    "dr congo": "Congo (Democratic Republic)",
+    "democratic republic of the congo": "Congo (Democratic Republic)",
+    "congo kinshasa": "Congo (Democratic Republic)",
+    "republic of the congo": "Congo (Republic of)",
+    "congo brazzaville": "Congo (Republic of)",
+    "s sudan": "South Sudan",
+    "east timor": "Timor-Leste",
+    "swaziland": "Eswatini",
+    "cape verde": "Cabo Verde",
+    "macedonia": "North Macedonia",
+    "vatican": "Vatican City",
+    "holy see": "Vatican City",
+    "turkiye": "Turkey",
+    "russian federation": "Russia",
+    "viet nam": "Vietnam",
+    "lao pdr": "Laos",
+    "persia": "Iran",
+    "ksa": "Saudi Arabia",
+    "nz": "New Zealand",
+    "png": "Papua New Guinea",
+    "bosnia": "Bosnia and Herzegovina",
+    "trinidad": "Trinidad and Tobago",
+    "st kitts and nevis": "Saint Kitts and Nevis",
+    "st lucia": "Saint Lucia",
+    "st vincent and the grenadines": "Saint Vincent and the Grenadines",
+    "brunei darussalam": "Brunei",
+    "gambia the": "Gambia",
+    "the gambia": "Gambia",
+    "the bahamas": "Bahamas",
+}
+
+# Below this trigram similarity a query is treated as unknown
+MIN_SIMILARITY = 0.5
+# Short queries share few trigrams, so one typo swings the score further
+SHORT_QUERY = 6
+SHORT_MIN_SIMILARITY = 0.6
+# Required lead of the best country over the runner-up
+MIN_MARGIN = 0.15
+
+
+def normalize_country(name: str) -> str:
+    """Lowercase ASCII words: accents, punctuation and extra spaces removed."""
+    text = unicodedata.normalize("NFKD", str(name))
+    text = text.encode("ascii", "ignore").decode("ascii").lower()
+    text = text.replace("&", " and ")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+
+def _trigrams(text: str):
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class CountryResolver:
+    def __init__(
+        self,
+        countries: Dict[str, str],
+        aliases: Dict[str, str] = None,
+        min_similarity: float = MIN_SIMILARITY,
+        min_margin: float = MIN_MARGIN,
+    ):
+        """
+        `countries` maps dataset key -> country name as written in the dataset;
+        `aliases` maps alternative names to those dataset names.
+        """
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        by_name = {normalize_country(name): key for key, name in countries.items()}
+        self.exact = dict(by_name)
+        for alias, name in (aliases or {}).items():
+            key = by_name.get(normalize_country(name))
+            if key is not None:
+                self.exact.setdefault(normalize_country(alias), key)
+
+        # Fuzzy matching runs over dataset names and aliases alike
+        self._terms = list(self.exact.items())
+        self._sizes = []
+        self._postings = defaultdict(list)
+        # Word -> countries with a name or alias containing it
+        self._words = defaultdict(set)
+        for term_id, (term, key) in enumerate(self._terms):
+            grams = _trigrams(term)
+            self._sizes.append(len(grams))
+            for gram in grams:
+                self._postings[gram].append(term_id)
+            for word in term.split():
+                self._words[word].add(key)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Dataset key for `name`, or None if nothing is close enough."""
+        return self.match(name)[0]
+
+    def match(self, name: str) -> Tuple[Optional[str], bool]:
+        """(dataset key or None, whether it was found by fuzzy matching)."""
+        query = normalize_country(name)
+        if not query:
+            return None, False
+        key = self.exact.get(query)
+        if key is not None:
+            return key, False
+        key = self.closest(query)
+        return key, key is not None
+
+    def closest(self, query: str) -> Optional[str]:
+        """
+        Most similar dataset key by trigram Dice score, taking each country's
+        best name or alias. Returns None below the minimum similarity, when
+        the runner-up country is within `min_margin`, or when the query's
+        words all occur in several countries' names (e.g. "Korea", "Congo"),
+        rather than guessing.
+        """
+        words = query.split()
+        candidates = set.intersection(*(self._words.get(w, set()) for w in words))
+        if len(candidates) > 1:
+            return None
+        grams = _trigrams(query)
+        shared = defaultdict(int)
+        for gram in grams:
+            for term_id in self._postings.get(gram, ()):
+                shared[term_id] += 1
+        scores = defaultdict(float)
+        for term_id, count in shared.items():
+            score = 2.0 * count / (len(grams) + self._sizes[term_id])
+            key = self._terms[term_id][1]
+            scores[key] = max(scores[key], score)
+        if not scores:
+            return None
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        best_key, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        min_similarity = self.min_similarity
+        if len(query) <= SHORT_QUERY:
+            min_similarity = max(min_similarity, SHORT_MIN_SIMILARITY)
+        if best < min_similarity or best - runner_up < self.min_margin:
+            return None
+        return best_key
@@ -1,6 +1,8 @@
 import csv
 import os
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+from countries import ALIASES, CountryResolver
 
 # Path to the dataset - use relative path from current file
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -28,7 +30,26 @@ def load_visa_data() -> Dict[str, Dict[str, str]]:
 
 # Global cache
 _VISA_DATA_CACHE = load_visa_data()
+_RESOLVER = CountryResolver(
+    {key: row["Country"].strip() for key, row in _VISA_DATA_CACHE.items()}, ALIASES
+)
+
+
+def resolve_country(country_name: str) -> Optional[str]:
+    """Dataset key for a country name, alias or close misspelling."""
+    return _RESOLVER.resolve(country_name)
+
+
+def match_country(country_name: str) -> Tuple[Optional[str], bool]:
+    """Dataset key (or None) and whether it came from a fuzzy match."""
+    return _RESOLVER.match(country_name)
 
 
 def get_country_data(country_name: str) -> Optional[Dict[str, str]]:
-    return _VISA_DATA_CACHE.get(country_name.lower())
+    key = resolve_country(country_name)
+    return None if key is None else _VISA_DATA_CACHE[key]
+
+
+def list_countries() -> List[str]:
+    """Country names as written in the dataset, sorted."""
+    return sorted(row["Country"].strip() for row in _VISA_DATA_CACHE.values())
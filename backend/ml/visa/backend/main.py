@@ -1,7 +1,20 @@
-from fastapi import FastAPI
+import os
+import sys
+
+# Shared helpers (metrics, ...) live two levels up in backend/ml/common
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from common.metrics import install_metrics
+from common.responses import FastJSONResponse, StaticJSON
+from common.serving import serve
+from db import list_countries
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from models import VisaQuery, VisaResponse
-from service import process_visa_query
+from models import VisaBulkQuery, VisaQuery, VisaResponse
+from service import process_visa_bulk, process_visa_query
+from typing import List
 
 app = FastAPI(title="Visa Requirement Intelligence Engine")
 
@@ -13,6 +26,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+install_metrics(app, "visa")
+
+# The dataset is static for the lifetime of the process
+COUNTRIES = StaticJSON(list_countries())
 
 
 @app.post("/visa-requirements", response_model=VisaResponse)
@@ -23,12 +40,26 @@ def get_visa_requirements(query: VisaQuery):
     return process_visa_query(query)
 
 
+@app.post("/visa-requirements/bulk", response_model=List[VisaResponse])
+def get_visa_requirements_bulk(query: VisaBulkQuery):
+    """
+    Returns visa requirements for many countries in one call, in request order.
+    """
+    return FastJSONResponse(process_visa_bulk(query.countries, query.visa_type))
+
+
+@app.get("/countries")
+def get_countries(request: Request):
+    """
+    Returns the countries we have visa requirement data for.
+    """
+    return COUNTRIES.response(request)
+
+
 @app.get("/")
 def health_check():
     return {"status": "ok", "service": "Visa Engine"}
 
 
 if __name__ == "__main__":
-    import uvicorn
-
-    uvicorn.run("main:app", host="127.0.0.1", port=8003, reload=False)
+    serve("main:app", "visa", port=8003, host="127.0.0.1")
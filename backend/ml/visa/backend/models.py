@@ -18,3 +18,10 @@ class VisaResponse(BaseModel):
     eligibility_criteria: str
     processing_time: str
     special_notes: str
+    # The requested name when it was corrected to `country` by fuzzy matching
+    matched_from: Optional[str] = None
+
+
+class VisaBulkQuery(BaseModel):
+    countries: List[str]
+    visa_type: Optional[str] = "tourist"
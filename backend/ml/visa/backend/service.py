@@ -1,25 +1,14 @@
-from typing import List
-from db import get_country_data
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from db import _VISA_DATA_CACHE, match_country
 from models import VisaQuery, VisaResponse
 
+DEFAULT_VISA_TYPE = "tourist"
+NOT_AVAILABLE = "Data not available for this country in the dataset."
 
-def process_visa_query(query: VisaQuery) -> VisaResponse:
-    country_name = query.country.strip()
-    data = get_country_data(country_name)
-
-    if not data:
-        # Schema rule 2: "Data not available for this country in the dataset."
-        return VisaResponse(
-            country=country_name,
-            visa_type=query.visa_type or "Unknown",
-            required_documents=[],
-            financial_requirements="Data not available for this country in the dataset.",
-            eligibility_criteria="Data not available for this country in the dataset.",
-            processing_time="Data not available for this country in the dataset.",
-            special_notes="Data not available for this country in the dataset.",
-        )
-
-    # Map CSV fields to Response
+
+def build_record(data: Dict[str, str]) -> dict:
+    """Response fields for one CSV row, with the default visa type."""
     # CSV Columns: Country, Passport_Validity, Required_Documents, Additional_Notes
 
     # Required Documents parsing
@@ -31,13 +20,64 @@ def process_visa_query(query: VisaQuery) -> VisaResponse:
     if data.get("Passport_Validity"):
         notes += f" (Passport validity: {data.get('Passport_Validity')})"
 
-    return VisaResponse(
-        country=data.get("Country", country_name),
-        visa_type=query.visa_type,  # Echo back or default
-        required_documents=req_docs_list,
+    return {
+        "country": data["Country"].strip(),
+        "visa_type": DEFAULT_VISA_TYPE,
+        "required_documents": req_docs_list,
         # Missing columns in CSV -> "Data not available"
-        financial_requirements="Data not available in dataset.",
-        eligibility_criteria="Data not available in dataset.",
-        processing_time="Data not available in dataset.",
-        special_notes=notes or "None",
-    )
+        "financial_requirements": "Data not available in dataset.",
+        "eligibility_criteria": "Data not available in dataset.",
+        "processing_time": "Data not available in dataset.",
+        "special_notes": notes or "None",
+        "matched_from": None,
+    }
+
+
+# The dataset is static, so every country's answer is built once at import
+_RECORDS = {key: build_record(row) for key, row in _VISA_DATA_CACHE.items()}
+_RESPONSES = {key: VisaResponse(**record) for key, record in _RECORDS.items()}
+
+
+@lru_cache(maxsize=4096)
+def _resolve(country_name: str) -> Tuple[Optional[str], bool]:
+    return match_country(country_name)
+
+
+def _missing_record(country_name: str, visa_type: Optional[str]) -> dict:
+    # Schema rule 2: "Data not available for this country in the dataset."
+    return {
+        "country": country_name,
+        "visa_type": visa_type or "Unknown",
+        "required_documents": [],
+        "financial_requirements": NOT_AVAILABLE,
+        "eligibility_criteria": NOT_AVAILABLE,
+        "processing_time": NOT_AVAILABLE,
+        "special_notes": NOT_AVAILABLE,
+        "matched_from": None,
+    }
+
+
+def lookup_record(country_name: str, visa_type: Optional[str]) -> dict:
+    """Plain-dict response for one country (shared dicts are never mutated)."""
+    country_name = country_name.strip()
+    key, fuzzy = _resolve(country_name)
+    if key is None:
+        return _missing_record(country_name, visa_type)
+    record = _RECORDS[key]
+    if visa_type and visa_type != record["visa_type"]:
+        record = {**record, "visa_type": visa_type}
+    if fuzzy:
+        record = {**record, "matched_from": country_name}
+    return record
+
+
+def process_visa_query(query: VisaQuery) -> VisaResponse:
+    country_name = query.country.strip()
+    key, fuzzy = _resolve(country_name)
+    if key is not None and not fuzzy and query.visa_type in (None, DEFAULT_VISA_TYPE):
+        return _RESPONSES[key]
+    return VisaResponse(**lookup_record(country_name, query.visa_type))
+
+
+def process_visa_bulk(countries: List[str], visa_type: Optional[str]) -> List[dict]:
+    return [lookup_record(country, visa_type) for country in countries]
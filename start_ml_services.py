@@ -40,6 +40,12 @@ services = [
         "path": "backend/ml/ml-yoga",
         "port": 8005,
         "command": "python main.py"
+    },
+    {
+        "name": "Trip Quote Service",
+        "path": "backend/ml/quotes",
+        "port": 8006,
+        "command": "python main.py"
     }
 ]
 